@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_businessrole'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='permissions_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
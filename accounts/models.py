@@ -45,6 +45,9 @@ class User(AbstractUser):
 
 	role = models.CharField(max_length=20, choices=ROLE_CHOICES, default=ROLE_STAFF)
 	phone_number = models.CharField(max_length=30, blank=True)
+	# Bumped whenever the user's role, groups or department roles change, so
+	# cached permission profiles (core.permissions) keyed on it go stale.
+	permissions_version = models.PositiveIntegerField(default=0, editable=False)
 
 	class Meta:
 		indexes = [
@@ -1,9 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.db.models.signals import post_migrate
 from django.dispatch import receiver
 
+from core.permissions import clear_permission_profile, invalidate_permission_profiles, invalidate_user_permissions
+
+from .models import BusinessRole
+
 
 ROLE_GROUP_MAP = {
     'SUPER_ADMIN': 'Super Admin',
@@ -30,9 +34,50 @@ def assign_default_superuser_group(sender, **kwargs):
 
 @receiver(post_save, sender=get_user_model())
 def sync_user_group(sender, instance, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'role' not in update_fields:
+        # e.g. last_login updates; the role (and so the group) is unchanged.
+        return
+    clear_permission_profile(instance)
     group_name = ROLE_GROUP_MAP.get(instance.role)
     if not group_name:
         return
     group, _ = Group.objects.get_or_create(name=group_name)
     instance.groups.clear()
     instance.groups.add(group)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Forward: user.groups.<op>(); reverse: group.user_set.<op>(), pk_set holds user ids.
+    if action == 'pre_clear' and reverse:
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action in {'post_add', 'post_remove', 'post_clear'}:
+        if not reverse:
+            invalidate_user_permissions(instance)
+        elif action == 'post_clear':
+            invalidate_permission_profiles(getattr(instance, '_cleared_user_ids', []))
+        else:
+            invalidate_permission_profiles(pk_set or [])
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created and not kwargs.get('raw'):
+        invalidate_permission_profiles(instance.user_set.values('pk'))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    instance._member_ids = list(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_permission_profiles(getattr(instance, '_member_ids', []))
+
+
+@receiver(post_save, sender=BusinessRole)
+def business_role_saved(sender, instance, created, **kwargs):
+    if not created and not kwargs.get('raw'):
+        invalidate_permission_profiles(instance.employee_assignments.values('employee_id'))
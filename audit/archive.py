@@ -0,0 +1,119 @@
+"""Retention for ``AuditLog`` and ``Notification``.
+
+Rows older than the retention window are copied into gzip-compressed JSON
+Lines files, one per table and local day, under
+``<AUDIT_ARCHIVE_DIR>/<table>/<YYYY>/<MM>/<YYYY-MM-DD>.jsonl.gz``, and then
+deleted in chunks. The archive directory is refused inside ``MEDIA_ROOT``,
+which may be served publicly. Each chunk is appended as its own gzip member,
+so a day can be archived over several runs. A chunk is written before it is
+deleted, so an interrupted run can leave duplicates but never loses rows;
+readers skip repeated ids.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog, Notification
+
+
+ARCHIVE_CHUNK_SIZE = 5000
+
+ARCHIVED_FIELDS = {
+	'auditlog': (AuditLog, ('id', 'created_at', 'user_id', 'user__username', 'action', 'path', 'method', 'status_code')),
+	'notification': (Notification, ('id', 'created_at', 'recipient_id', 'audience', 'actor_id', 'message', 'path', 'level', 'is_read', 'event_count')),
+}
+
+
+def archive_root() -> Path:
+	root = Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', None) or Path(settings.BASE_DIR) / 'audit_archive')
+	if not root.is_absolute():
+		root = Path(settings.BASE_DIR) / root
+	root = root.resolve()
+	media_root = Path(settings.MEDIA_ROOT).resolve()
+	if root == media_root or media_root in root.parents:
+		raise ImproperlyConfigured(f'AUDIT_ARCHIVE_DIR ({root}) must not be inside MEDIA_ROOT; archived audit data would be publicly downloadable.')
+	return root
+
+
+def archive_path(table: str, day: date) -> Path:
+	return archive_root() / table / f'{day:%Y}' / f'{day:%m}' / f'{day:%Y-%m-%d}.jsonl.gz'
+
+
+def _row(values: dict) -> dict:
+	row = {('username' if key == 'user__username' else key): value for key, value in values.items()}
+	row['created_at'] = row['created_at'].isoformat()
+	return row
+
+
+def _append(table: str, rows_by_day: dict):
+	for day, rows in rows_by_day.items():
+		path = archive_path(table, day)
+		path.parent.mkdir(parents=True, exist_ok=True)
+		with open(path, 'ab') as raw:
+			with gzip.GzipFile(fileobj=raw, mode='ab') as handle:
+				for row in rows:
+					handle.write(json.dumps(row, separators=(',', ':')).encode('utf-8') + b'\n')
+			raw.flush()
+			os.fsync(raw.fileno())
+
+
+def archive_table(table: str, *, older_than_days: int, chunk_size=ARCHIVE_CHUNK_SIZE, dry_run=False) -> int:
+	"""Archive and delete rows of ``table`` created more than ``older_than_days`` ago.
+
+	Returns the number of rows archived (or that would be, with ``dry_run``).
+	"""
+	model, fields = ARCHIVED_FIELDS[table]
+	cutoff = timezone.now() - timedelta(days=older_than_days)
+	expired = model.objects.filter(created_at__lt=cutoff)
+	if dry_run:
+		return expired.count()
+
+	archived = 0
+	while True:
+		chunk = list(expired.order_by('id').values(*fields)[:chunk_size])
+		if not chunk:
+			return archived
+		rows_by_day = defaultdict(list)
+		for values in chunk:
+			rows_by_day[timezone.localdate(values['created_at'])].append(_row(values))
+		_append(table, rows_by_day)
+		with transaction.atomic():
+			model.objects.filter(id__in=[values['id'] for values in chunk]).delete()
+		archived += len(chunk)
+
+
+def iter_archived(table: str, start: date, end: date, *, search=None):
+	"""Yield archived rows of ``table`` created from ``start`` to ``end`` (local dates, inclusive).
+
+	``search`` keeps rows whose text fields contain it (case-insensitive).
+	"""
+	if table not in ARCHIVED_FIELDS:
+		raise KeyError(table)
+	needle = search.lower() if search else None
+	seen = set()
+	day = start
+	while day <= end:
+		path = archive_path(table, day)
+		if path.exists():
+			with gzip.open(path, 'rt', encoding='utf-8') as handle:
+				for line in handle:
+					row = json.loads(line)
+					if row['id'] in seen:
+						continue
+					seen.add(row['id'])
+					if needle and not any(needle in str(value).lower() for value in row.values() if isinstance(value, str)):
+						continue
+					row['created_at'] = parse_datetime(row['created_at'])
+					yield row
+		day += timedelta(days=1)
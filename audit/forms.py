@@ -0,0 +1,40 @@
+from datetime import datetime, time, timedelta
+
+from django import forms
+from django.utils.timezone import make_aware
+
+
+class AuditLogFilterForm(forms.Form):
+    user = forms.CharField(required=False, label='Username')
+    method = forms.ChoiceField(
+        required=False,
+        choices=[('', 'Any method'), ('POST', 'POST'), ('PUT', 'PUT'), ('PATCH', 'PATCH'), ('DELETE', 'DELETE'), ('IMAP', 'IMAP')],
+    )
+    path = forms.CharField(required=False, label='Path starts with')
+    since = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    until = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            css = 'form-select form-select-sm' if name == 'method' else 'form-control form-control-sm'
+            field.widget.attrs.setdefault('class', css)
+
+    def filter(self, queryset):
+        """Apply the valid filters to an ``AuditLog`` queryset."""
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data['user']:
+            queryset = queryset.filter(user__username=data['user'].strip())
+        if data['method']:
+            queryset = queryset.filter(method=data['method'])
+        if data['path']:
+            queryset = queryset.filter(path__startswith=data['path'].strip())
+        # Compare the column with local-midnight bounds so the created_at
+        # indexes stay usable; a __date lookup wraps the column in a cast.
+        if data['since']:
+            queryset = queryset.filter(created_at__gte=make_aware(datetime.combine(data['since'], time.min)))
+        if data['until']:
+            queryset = queryset.filter(created_at__lt=make_aware(datetime.combine(data['until'] + timedelta(days=1), time.min)))
+        return queryset
@@ -1,4 +1,4 @@
-from audit.models import AuditLog
+from audit.writer import record_audit
 
 
 class AuditLogMiddleware:
@@ -13,8 +13,8 @@ class AuditLogMiddleware:
             return response
         if request.method in {'POST', 'PUT', 'PATCH', 'DELETE'}:
             action = f'{request.method} {request.path}'
-            AuditLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            record_audit(
+                user=request.user,
                 action=action,
                 path=request.path,
                 method=request.method,
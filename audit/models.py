@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class AuditLog(models.Model):
@@ -8,13 +9,18 @@ class AuditLog(models.Model):
 	path = models.CharField(max_length=255)
 	method = models.CharField(max_length=10)
 	status_code = models.PositiveSmallIntegerField(default=200)
-	created_at = models.DateTimeField(auto_now_add=True)
+	# Set when the entry is recorded, not when a buffered batch is written.
+	created_at = models.DateTimeField(default=timezone.now, editable=False)
 
 	class Meta:
 		ordering = ['-created_at']
 		indexes = [
 			models.Index(fields=['created_at']),
 			models.Index(fields=['action']),
+			# Filters of AuditLogListView, each followed by the keyset ordering.
+			models.Index(fields=['user', 'created_at', 'id'], name='audit_log_user_created_idx'),
+			models.Index(fields=['method', 'created_at', 'id'], name='audit_log_method_created_idx'),
+			models.Index(fields=['path', 'created_at'], name='audit_log_path_created_idx'),
 		]
 
 	def __str__(self):
@@ -32,11 +38,24 @@ class Notification(models.Model):
 		(LEVEL_DANGER, 'Danger'),
 	]
 
+	AUDIENCE_USER = 'USER'
+	AUDIENCE_ADMINS = 'ADMINS'
+
+	AUDIENCE_CHOICES = [
+		(AUDIENCE_USER, 'Single user'),
+		(AUDIENCE_ADMINS, 'All admins'),
+	]
+
+	# Empty for broadcasts: one ADMINS row is shared by every admin, whose read
+	# state lives in NotificationReadState and NotificationRead instead of is_read.
 	recipient = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.CASCADE,
+		null=True,
+		blank=True,
 		related_name='notifications',
 	)
+	audience = models.CharField(max_length=10, choices=AUDIENCE_CHOICES, default=AUDIENCE_USER)
 	actor = models.ForeignKey(
 		settings.AUTH_USER_MODEL,
 		on_delete=models.SET_NULL,
@@ -48,6 +67,10 @@ class Notification(models.Model):
 	path = models.CharField(max_length=255, blank=True)
 	level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default=LEVEL_INFO)
 	is_read = models.BooleanField(default=False)
+	# Repeats of the same kind of event from one actor are merged into one row;
+	# see audit.notifications.notify_admins.
+	coalesce_key = models.CharField(max_length=50, blank=True)
+	event_count = models.PositiveIntegerField(default=1)
 	created_at = models.DateTimeField(auto_now_add=True)
 
 	class Meta:
@@ -55,7 +78,43 @@ class Notification(models.Model):
 		indexes = [
 			models.Index(fields=['recipient', 'is_read', 'created_at']),
 			models.Index(fields=['created_at']),
+			models.Index(fields=['recipient', 'created_at', 'id'], name='audit_notif_rcpt_created_idx'),
+			# Unread broadcasts are the ids above the reader's cursor.
+			models.Index(fields=['audience', 'id'], name='audit_notif_audience_id_idx'),
+			models.Index(fields=['actor', 'coalesce_key', 'created_at'], name='audit_notif_coalesce_idx'),
 		]
 
 	def __str__(self):
 		return self.message
+
+
+class NotificationReadState(models.Model):
+	"""A user's read cursor: every broadcast up to ``last_read_id`` counts as read."""
+
+	user = models.OneToOneField(
+		settings.AUTH_USER_MODEL,
+		on_delete=models.CASCADE,
+		primary_key=True,
+		related_name='notification_read_state',
+	)
+	last_read_id = models.PositiveBigIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self):
+		return f'{self.user} read through #{self.last_read_id}'
+
+
+class NotificationRead(models.Model):
+	"""A broadcast above the user's cursor that was marked read on its own."""
+
+	notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='reads')
+	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_reads')
+	read_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['user', 'notification'], name='audit_notif_read_unique'),
+		]
+
+	def __str__(self):
+		return f'{self.user} read #{self.notification_id}'
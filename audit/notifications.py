@@ -0,0 +1,155 @@
+"""Admin notifications, stored once per event and read per user.
+
+``notify_admins`` writes a single ``Notification`` with the ADMINS audience,
+however many admins there are. Each admin's read state is a cursor
+(``NotificationReadState.last_read_id``): broadcasts at or below it are read.
+Broadcasts marked read one at a time above the cursor go in the small
+``NotificationRead`` set, which "mark all read" prunes as it moves the cursor.
+Notifications addressed to one ``recipient`` keep their own ``is_read`` flag.
+
+Admins do not see broadcasts they caused, or ones from before they joined.
+
+Busy sources such as Kanban drags pass a ``coalesce_key``: repeats from the
+same actor within ``NOTIFICATION_COALESCE_SECONDS`` of the first one update
+that row in place ("5 tasks moved by jane") instead of adding rows. Once any
+admin has read the open row, the next repeat starts a fresh one so later
+events are flagged as unread again.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Case, Exists, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Notification, NotificationRead, NotificationReadState
+
+
+ADMIN_ROLES = {'SUPER_ADMIN', 'HR_MANAGER'}
+
+
+def receives_admin_notifications(user) -> bool:
+	return bool(
+		user
+		and getattr(user, 'is_authenticated', False)
+		and (user.is_superuser or getattr(user, 'role', None) in ADMIN_ROLES)
+	)
+
+
+def _read_by_an_admin(notification: Notification) -> bool:
+	"""Whether any admin has read this broadcast, by cursor or one at a time."""
+	admin = Q(user__is_superuser=True) | Q(user__role__in=ADMIN_ROLES)
+	return Notification.objects.filter(pk=notification.pk).filter(
+		Exists(NotificationReadState.objects.filter(admin, last_read_id__gte=OuterRef('pk')))
+		| Exists(NotificationRead.objects.filter(admin, notification=OuterRef('pk')))
+	).exists()
+
+
+def notify_admins(*, actor, message: str, path: str = '', level=Notification.LEVEL_INFO, coalesce_key: str = '', summary: str = '') -> Notification:
+	"""Record one broadcast for every admin (except ``actor``) with a single insert.
+
+	With ``coalesce_key``, a repeat is merged into the open row for the same
+	actor and key, and its message becomes ``summary`` formatted with
+	``count`` and ``actor``. A row an admin has already read is left alone.
+	"""
+	window = getattr(settings, 'NOTIFICATION_COALESCE_SECONDS', 300)
+	if coalesce_key and window > 0:
+		with transaction.atomic():
+			latest = (
+				Notification.objects.select_for_update()
+				.filter(
+					audience=Notification.AUDIENCE_ADMINS,
+					actor=actor,
+					coalesce_key=coalesce_key,
+					created_at__gte=timezone.now() - timedelta(seconds=window),
+				)
+				.order_by('-created_at', '-id')
+				.first()
+			)
+			if latest is not None and not _read_by_an_admin(latest):
+				latest.event_count += 1
+				if summary:
+					message = summary.format(count=latest.event_count, actor=getattr(actor, 'username', None) or 'system')
+				latest.message = (message or '')[:255]
+				latest.path = (path or '')[:255]
+				latest.save(update_fields=['event_count', 'message', 'path'])
+				return latest
+	return Notification.objects.create(
+		audience=Notification.AUDIENCE_ADMINS,
+		actor=actor,
+		message=(message or '')[:255],
+		path=(path or '')[:255],
+		level=level,
+		coalesce_key=coalesce_key,
+	)
+
+
+def _read_cursor(user):
+	return Coalesce(
+		Subquery(NotificationReadState.objects.filter(user=user).values('last_read_id')[:1]),
+		Value(0),
+	)
+
+
+def _broadcasts_q(user) -> Q:
+	return Q(audience=Notification.AUDIENCE_ADMINS, created_at__gte=user.date_joined) & ~Q(actor=user)
+
+
+def _marked_read(user):
+	return Exists(NotificationRead.objects.filter(user=user, notification=OuterRef('pk')))
+
+
+def _unread_broadcasts_q(user) -> Q:
+	return _broadcasts_q(user) & Q(id__gt=_read_cursor(user)) & ~_marked_read(user)
+
+
+def notifications_for(user):
+	"""Notifications visible to ``user``, each annotated with ``seen``."""
+	visible = Q(recipient=user)
+	if receives_admin_notifications(user):
+		visible |= _broadcasts_q(user)
+	broadcast_seen = ExpressionWrapper(Q(id__lte=_read_cursor(user)) | _marked_read(user), output_field=BooleanField())
+	return Notification.objects.filter(visible).annotate(
+		seen=Case(
+			When(audience=Notification.AUDIENCE_ADMINS, then=broadcast_seen),
+			default=F('is_read'),
+			output_field=BooleanField(),
+		),
+	)
+
+
+def unread_count(user) -> int:
+	"""Unread notifications for ``user``, counted with one query."""
+	if not user or not getattr(user, 'is_authenticated', False):
+		return 0
+	unread = Q(recipient=user, is_read=False)
+	if receives_admin_notifications(user):
+		unread |= _unread_broadcasts_q(user)
+	return Notification.objects.filter(unread).count()
+
+
+def mark_read(user, notification: Notification):
+	if notification.audience != Notification.AUDIENCE_ADMINS:
+		if not notification.is_read:
+			notification.is_read = True
+			notification.save(update_fields=['is_read'])
+		return
+	cursor = NotificationReadState.objects.filter(user=user).values_list('last_read_id', flat=True).first() or 0
+	if notification.pk > cursor:
+		NotificationRead.objects.get_or_create(user=user, notification=notification)
+
+
+def mark_all_read(user):
+	with transaction.atomic():
+		Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+		latest = Notification.objects.filter(audience=Notification.AUDIENCE_ADMINS).aggregate(latest=Max('id'))['latest']
+		if latest is None:
+			return
+		state, _created = NotificationReadState.objects.select_for_update().get_or_create(user=user)
+		if latest > state.last_read_id:
+			state.last_read_id = latest
+			state.save(update_fields=['last_read_id', 'updated_at'])
+		NotificationRead.objects.filter(user=user, notification_id__lte=state.last_read_id).delete()
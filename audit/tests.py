@@ -1,8 +1,26 @@
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import connection
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from tasks.models import Task
 
-from audit.models import AuditLog, Notification
+from audit.archive import archive_path, archive_table, iter_archived
+from audit.models import AuditLog, Notification, NotificationRead, NotificationReadState
+from audit.notifications import mark_all_read, mark_read, notify_admins, notifications_for, unread_count
+from audit.writer import MAX_ATTEMPTS, AuditLogWriter, audit_writer, record_audit
 
 
 class AuditMiddlewareNotificationScopeTests(TestCase):
@@ -16,3 +34,399 @@ class AuditMiddlewareNotificationScopeTests(TestCase):
 
 		self.assertEqual(Notification.objects.count(), 0)
 		self.assertEqual(AuditLog.objects.filter(method='POST', path=url).count(), 1)
+
+
+class AuditLogWriterTests(TestCase):
+	def setUp(self):
+		self.now = 0.0
+		self.writer = AuditLogWriter(batch_size=3, flush_seconds=10, clock=lambda: self.now, use_timer=False)
+		self.user = get_user_model().objects.create_user(username='auditor', password='pass12345')
+
+	def _record(self, index):
+		return record_audit(user=self.user, action=f'POST /thing/{index}/', path=f'/thing/{index}/', method='POST', writer=self.writer)
+
+	def test_flushes_when_batch_is_full(self):
+		self._record(1)
+		self._record(2)
+		self.assertEqual(AuditLog.objects.count(), 0)
+		with CaptureQueriesContext(connection) as queries:
+			self._record(3)
+		self.assertEqual([q['sql'].split()[0] for q in queries.captured_queries if 'audit_auditlog' in q['sql']], ['INSERT'])
+		self.assertEqual(AuditLog.objects.filter(user=self.user).count(), 3)
+		self.assertEqual(len(self.writer), 0)
+
+	def test_flushes_when_oldest_entry_is_due(self):
+		first = self._record(1)
+		self.now = 11
+		self._record(2)
+		self.assertEqual(AuditLog.objects.count(), 2)
+		stored = AuditLog.objects.get(path='/thing/1/')
+		self.assertEqual(stored.created_at, first.created_at)
+
+	def test_explicit_flush_writes_remaining_entries(self):
+		self._record(1)
+		self.assertEqual(self.writer.flush(), 1)
+		self.assertEqual(self.writer.flush(), 0)
+		self.assertEqual(AuditLog.objects.count(), 1)
+
+	def test_long_values_are_clipped(self):
+		record_audit(action='POST ' + 'x' * 300, path='/' + 'y' * 300, method='PROPPATCH-LONG', writer=self.writer)
+		self.writer.flush()
+		entry = AuditLog.objects.get()
+		self.assertEqual(len(entry.action), 100)
+		self.assertEqual(len(entry.path), 255)
+		self.assertIsNone(entry.user_id)
+
+	@override_settings(AUDIT_LOG_BUFFERED=True, AUDIT_LOG_BATCH_SIZE=50)
+	def test_middleware_buffers_when_enabled(self):
+		url = reverse('core:public_access')
+		self.client.post(url, data={'code': 'bad-code', 'next': '/'})
+		self.assertEqual(AuditLog.objects.filter(path=url).count(), 0)
+		audit_writer.flush()
+		self.assertEqual(AuditLog.objects.filter(path=url).count(), 1)
+
+
+class AuditLogWriterFailureTests(TransactionTestCase):
+	def setUp(self):
+		self.writer = AuditLogWriter(batch_size=10, flush_seconds=60, use_timer=False)
+		User = get_user_model()
+		self.users = [User.objects.create_user(username=f'writer{index}', password='pass12345') for index in range(6)]
+
+	def _record_all(self):
+		for user in self.users:
+			record_audit(user=user, action=f'POST /{user.username}/', path=f'/{user.username}/', method='POST', writer=self.writer)
+
+	def test_deleted_user_does_not_drop_the_batch(self):
+		self._record_all()
+		self.users[2].delete()
+		self.assertEqual(self.writer.flush(), 6)
+		self.assertEqual(AuditLog.objects.count(), 6)
+		self.assertIsNone(AuditLog.objects.get(path='/writer2/').user_id)
+		self.assertEqual(AuditLog.objects.filter(user__isnull=False).count(), 5)
+
+	def test_locked_database_requeues_entries(self):
+		self._record_all()
+		locked = OperationalError('database is locked')
+		with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=locked), mock.patch.object(AuditLog, 'save', side_effect=locked):
+			self.assertEqual(self.writer.flush(), 0)
+		self.assertEqual(len(self.writer), 6)
+		self.assertEqual(self.writer.flush(), 6)
+		self.assertEqual(AuditLog.objects.count(), 6)
+
+	def test_entries_are_dropped_after_max_attempts(self):
+		self._record_all()
+		locked = OperationalError('database is locked')
+		with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=locked), mock.patch.object(AuditLog, 'save', side_effect=locked):
+			for _attempt in range(MAX_ATTEMPTS):
+				self.writer.flush()
+		self.assertEqual(len(self.writer), 0)
+		self.assertEqual(AuditLog.objects.count(), 0)
+
+
+class AuditArchiveTests(TestCase):
+	def setUp(self):
+		self.archive_dir = tempfile.TemporaryDirectory()
+		self.addCleanup(self.archive_dir.cleanup)
+		override = override_settings(AUDIT_ARCHIVE_DIR=self.archive_dir.name)
+		override.enable()
+		self.addCleanup(override.disable)
+		self.user = get_user_model().objects.create_user(username='archivist', password='pass12345', role='HR_MANAGER')
+		self.now = timezone.now()
+
+	def _log(self, days_ago, path):
+		return AuditLog.objects.create(user=self.user, action=f'POST {path}', path=path, method='POST', created_at=self.now - timedelta(days=days_ago))
+
+	def test_archives_and_deletes_expired_rows_in_chunks(self):
+		old = [self._log(200, f'/old/{index}/') for index in range(5)]
+		self._log(10, '/recent/')
+		notice = Notification.objects.create(recipient=self.user, message='Old notice')
+		Notification.objects.filter(pk=notice.pk).update(created_at=self.now - timedelta(days=100))
+
+		out = StringIO()
+		call_command('archive_audit', '--days', '180', '--notification-days', '90', '--chunk-size', '2', stdout=out)
+		self.assertIn('Archived 5 auditlog rows', out.getvalue())
+		self.assertIn('Archived 1 notification rows', out.getvalue())
+		self.assertEqual(list(AuditLog.objects.values_list('path', flat=True)), ['/recent/'])
+		self.assertFalse(Notification.objects.exists())
+
+		day = timezone.localdate(old[0].created_at)
+		self.assertTrue(archive_path('auditlog', day).exists())
+		rows = list(iter_archived('auditlog', day - timedelta(days=1), day + timedelta(days=1)))
+		self.assertEqual(sorted(row['path'] for row in rows), [f'/old/{index}/' for index in range(5)])
+		self.assertEqual(rows[0]['username'], 'archivist')
+		self.assertEqual(rows[0]['created_at'], old[0].created_at)
+
+	def test_rerun_appends_and_query_skips_duplicates(self):
+		first = self._log(200, '/first/')
+		archive_table('auditlog', older_than_days=180)
+		day = timezone.localdate(first.created_at)
+		# Simulate a run interrupted after writing but before deleting.
+		self._log(200, '/second/')
+		second = list(AuditLog.objects.values('id', 'created_at', 'user_id', 'user__username', 'action', 'path', 'method', 'status_code'))
+		archive_table('auditlog', older_than_days=180)
+		with gzip.open(archive_path('auditlog', day), 'at') as handle:
+			handle.write(json.dumps({**second[0], 'created_at': second[0]['created_at'].isoformat(), 'username': 'archivist'}) + '\n')
+
+		rows = list(iter_archived('auditlog', day, day))
+		self.assertEqual(sorted(row['path'] for row in rows), ['/first/', '/second/'])
+		self.assertEqual([row['path'] for row in iter_archived('auditlog', day, day, search='SECOND')], ['/second/'])
+
+	def test_refuses_archive_dir_inside_media_root(self):
+		self._log(200, '/secret/')
+		with override_settings(MEDIA_ROOT=self.archive_dir.name, AUDIT_ARCHIVE_DIR=f'{self.archive_dir.name}/audit_archive'):
+			with self.assertRaises(CommandError):
+				call_command('archive_audit', stdout=StringIO())
+		self.assertEqual(AuditLog.objects.count(), 1)
+
+	def test_zero_retention_is_rejected(self):
+		self._log(1, '/recent/')
+		self._log(400, '/old/')
+		for option in ('--days', '--notification-days'):
+			with self.assertRaises(CommandError):
+				call_command('archive_audit', option, '0', stdout=StringIO())
+		# Nothing is archived before the bad value is reported.
+		self.assertEqual(AuditLog.objects.count(), 2)
+
+	def test_dry_run_and_query_command(self):
+		entry = self._log(200, '/kept/')
+		out = StringIO()
+		call_command('archive_audit', '--dry-run', stdout=out)
+		self.assertIn('Would archive 1 auditlog rows', out.getvalue())
+		self.assertEqual(AuditLog.objects.count(), 1)
+
+		call_command('archive_audit', stdout=StringIO())
+		day = timezone.localdate(entry.created_at).isoformat()
+		out = StringIO()
+		call_command('archive_audit', '--query', 'auditlog', '--since', day, stdout=out)
+		self.assertEqual(json.loads(out.getvalue())['path'], '/kept/')
+
+
+class KeysetPaginationTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='pager', password='pass12345', role='HR_MANAGER')
+		self.other = User.objects.create_user(username='other', password='pass12345')
+		stamp = timezone.now() - timedelta(days=1)
+		# Shared timestamps make the id tie-breaker matter.
+		AuditLog.objects.bulk_create(
+			[
+				AuditLog(
+					user=self.admin if index % 2 else self.other,
+					action=f'POST /item/{index}/',
+					path=f'/item/{index}/' if index % 3 else f'/payroll/{index}/',
+					method='POST' if index % 4 else 'DELETE',
+					created_at=stamp + timedelta(minutes=index // 5),
+				)
+				for index in range(60)
+			]
+		)
+		self.client.force_login(self.admin)
+		self.url = reverse('audit:log_list')
+
+	def _expected(self, queryset=None):
+		return list((queryset or AuditLog.objects.all()).order_by('-created_at', '-id').values_list('id', flat=True))
+
+	def test_walks_every_row_once_without_counting(self):
+		seen = []
+		query = ''
+		pages = []
+		while True:
+			with CaptureQueriesContext(connection) as queries:
+				response = self.client.get(f'{self.url}?{query}', secure=True)
+			self.assertEqual(response.status_code, 200)
+			self.assertFalse(any('COUNT(' in q['sql'].upper() and 'audit_auditlog' in q['sql'] for q in queries.captured_queries))
+			page = response.context['page_obj']
+			pages.append((query, [log.id for log in page]))
+			seen.extend(log.id for log in page)
+			if not page.has_next():
+				break
+			query = page.next_query
+		self.assertEqual(seen, self._expected())
+		self.assertEqual(len(pages), 3)
+
+		# Stepping back from the last page returns the middle page.
+		last = self.client.get(f'{self.url}?{pages[-1][0]}', secure=True).context['page_obj']
+		previous = self.client.get(f'{self.url}?{last.previous_query}', secure=True).context['page_obj']
+		self.assertEqual([log.id for log in previous], pages[1][1])
+		self.assertTrue(previous.has_previous())
+		first = self.client.get(f'{self.url}?{previous.previous_query}', secure=True).context['page_obj']
+		self.assertEqual([log.id for log in first], pages[0][1])
+		self.assertFalse(first.has_previous())
+
+	def test_filters_carry_into_cursor_links(self):
+		response = self.client.get(self.url, {'user': 'pager', 'path': '/item/'}, secure=True)
+		expected = self._expected(AuditLog.objects.filter(user=self.admin, path__startswith='/item/'))
+		self.assertEqual([log.id for log in response.context['page_obj']], expected)
+
+		response = self.client.get(self.url, {'method': 'POST'}, secure=True)
+		expected = self._expected(AuditLog.objects.filter(method='POST'))
+		page = response.context['page_obj']
+		self.assertIn('method=POST', page.next_query)
+		rest = self.client.get(f'{self.url}?{page.next_query}', secure=True).context['page_obj']
+		self.assertEqual([log.id for log in page] + [log.id for log in rest], expected)
+
+	def test_invalid_cursor_is_404(self):
+		response = self.client.get(self.url, {'after': 'not-a-cursor'}, secure=True)
+		self.assertEqual(response.status_code, 404)
+
+	def test_date_range_uses_local_day_bounds_on_the_column(self):
+		AuditLog.objects.all().delete()
+		midnight = timezone.make_aware(datetime(2026, 3, 10))
+		inside = [
+			AuditLog.objects.create(action='first', path='/a/', method='POST', created_at=midnight),
+			AuditLog.objects.create(action='last', path='/a/', method='POST', created_at=midnight + timedelta(days=1, microseconds=-1)),
+		]
+		AuditLog.objects.create(action='before', path='/a/', method='POST', created_at=midnight - timedelta(microseconds=1))
+		AuditLog.objects.create(action='after', path='/a/', method='POST', created_at=midnight + timedelta(days=1))
+
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(self.url, {'since': '2026-03-10', 'until': '2026-03-10'}, secure=True)
+		self.assertEqual([log.id for log in response.context['page_obj']], [log.id for log in reversed(inside)])
+		listing = [q['sql'] for q in queries.captured_queries if 'FROM "audit_auditlog"' in q['sql']]
+		self.assertTrue(listing)
+		self.assertFalse(any('cast_date' in sql for sql in listing))
+
+	def test_notifications_are_keyset_paginated(self):
+		Notification.objects.bulk_create([Notification(recipient=self.admin, message=f'Notice {index}') for index in range(35)])
+		response = self.client.get(reverse('audit:notifications'), secure=True)
+		page = response.context['page_obj']
+		self.assertEqual(len(page), 30)
+		self.assertTrue(page.has_next())
+		rest = self.client.get(f"{reverse('audit:notifications')}?{page.next_query}", secure=True).context['page_obj']
+		self.assertEqual(len(rest), 5)
+		self.assertFalse(rest.has_next())
+
+
+class BroadcastNotificationTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.admins = [User.objects.create_user(username=f'admin{index}', password='pass12345', role='HR_MANAGER') for index in range(3)]
+		self.root = User.objects.create_superuser(username='root', password='pass12345', email='root@example.com')
+		self.staff = User.objects.create_user(username='staff', password='pass12345', role='STAFF')
+
+	def test_one_row_per_event_whatever_the_number_of_admins(self):
+		with self.assertNumQueries(1):
+			notify_admins(actor=self.admins[0], message='Something happened', path='/x/')
+		self.assertEqual(Notification.objects.count(), 1)
+		self.assertEqual([unread_count(admin) for admin in self.admins], [0, 1, 1])
+		self.assertEqual(unread_count(self.root), 1)
+		self.assertEqual(unread_count(self.staff), 0)
+
+	def test_kanban_move_writes_a_single_notification(self):
+		task = Task.objects.create(title='Card', deadline=timezone.localdate(), created_by=self.staff)
+		self.client.force_login(self.staff)
+		response = self.client.post(reverse('tasks:move', args=[task.pk]), data={'status': Task.STATUS_DONE}, secure=True)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(Notification.objects.count(), 1)
+		self.assertTrue(all(unread_count(admin) == 1 for admin in self.admins))
+
+	def test_unread_count_is_a_single_query(self):
+		notify_admins(actor=None, message='One')
+		Notification.objects.create(recipient=self.admins[1], message='Direct')
+		with self.assertNumQueries(1):
+			self.assertEqual(unread_count(self.admins[1]), 2)
+
+	def test_mark_read_and_mark_all_read(self):
+		first = notify_admins(actor=None, message='First')
+		second = notify_admins(actor=None, message='Second')
+		direct = Notification.objects.create(recipient=self.admins[0], message='Direct')
+		self.client.force_login(self.admins[0])
+
+		self.client.post(reverse('audit:notifications_mark_read', args=[first.pk]), secure=True)
+		self.assertEqual(unread_count(self.admins[0]), 2)
+		self.assertEqual(unread_count(self.admins[1]), 2)
+		seen = dict(notifications_for(self.admins[0]).values_list('id', 'seen'))
+		self.assertEqual(seen, {first.pk: True, second.pk: False, direct.pk: False})
+
+		self.client.post(reverse('audit:notifications_mark_all_read'), secure=True)
+		self.assertEqual(unread_count(self.admins[0]), 0)
+		self.assertEqual(NotificationReadState.objects.get(user=self.admins[0]).last_read_id, second.pk)
+		self.assertFalse(NotificationRead.objects.filter(user=self.admins[0]).exists())
+
+		third = notify_admins(actor=None, message='Third')
+		response = self.client.get(reverse('audit:notifications'), secure=True)
+		self.assertEqual(response.context['unread_count'], 1)
+		self.assertEqual([n.pk for n in response.context['notifications'] if not n.seen], [third.pk])
+
+	def test_admins_do_not_see_broadcasts_from_before_they_joined(self):
+		notify_admins(actor=None, message='Old news')
+		Notification.objects.update(created_at=timezone.now() - timedelta(days=1))
+		late = get_user_model().objects.create_user(username='late', password='pass12345', role='SUPER_ADMIN')
+		self.assertEqual(unread_count(late), 0)
+		self.assertFalse(notifications_for(late).exists())
+
+	def test_other_users_cannot_mark_broadcasts(self):
+		notice = notify_admins(actor=None, message='Hidden')
+		self.client.force_login(self.staff)
+		response = self.client.post(reverse('audit:notifications_mark_read', args=[notice.pk]), secure=True)
+		self.assertEqual(response.status_code, 403)
+
+
+class NotificationCoalescingTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='boss', password='pass12345', role='HR_MANAGER')
+		self.jane = User.objects.create_user(username='jane', password='pass12345', role='STAFF')
+		self.tasks = [Task.objects.create(title=f'Card {index}', created_by=self.jane) for index in range(3)]
+		self.client.force_login(self.jane)
+
+	def _move(self, task, status=Task.STATUS_DONE):
+		response = self.client.post(reverse('tasks:move', args=[task.pk]), data={'status': status}, secure=True)
+		self.assertEqual(response.status_code, 200)
+
+	def test_repeated_moves_update_one_notification(self):
+		for task in self.tasks:
+			self._move(task)
+		notification = Notification.objects.get()
+		self.assertEqual(notification.event_count, 3)
+		self.assertEqual(notification.message, '3 tasks moved by jane')
+		self.assertEqual(notification.path, reverse('tasks:board'))
+		self.assertEqual(unread_count(self.admin), 1)
+
+	def test_kinds_and_actors_are_kept_apart(self):
+		self._move(self.tasks[0])
+		self.client.post(
+			reverse('tasks:reorder'),
+			data=json.dumps({'status': Task.STATUS_TODO, 'ordered_ids': [self.tasks[1].pk, self.tasks[2].pk]}),
+			content_type='application/json',
+			secure=True,
+		)
+		other = get_user_model().objects.create_user(username='joe', password='pass12345', role='STAFF')
+		self.client.force_login(other)
+		self._move(self.tasks[1], Task.STATUS_IN_PROGRESS)
+		self.assertEqual(
+			sorted(Notification.objects.values_list('coalesce_key', 'actor__username', 'event_count')),
+			[('task-move', 'jane', 1), ('task-move', 'joe', 1), ('task-reorder', 'jane', 1)],
+		)
+
+	def test_window_expiry_starts_a_new_notification(self):
+		self._move(self.tasks[0])
+		Notification.objects.update(created_at=timezone.now() - timedelta(minutes=10))
+		self._move(self.tasks[1])
+		self.assertEqual(list(Notification.objects.order_by('id').values_list('event_count', flat=True)), [1, 1])
+
+	def test_read_row_is_not_merged_into(self):
+		self._move(self.tasks[0])
+		mark_all_read(self.admin)
+		self._move(self.tasks[1])
+		self.assertEqual(list(Notification.objects.order_by('id').values_list('event_count', flat=True)), [1, 1])
+		self.assertEqual(unread_count(self.admin), 1)
+
+		# A row marked read on its own is left alone too.
+		mark_read(self.admin, Notification.objects.latest('id'))
+		self._move(self.tasks[2])
+		self.assertEqual(Notification.objects.count(), 3)
+		self.assertEqual(unread_count(self.admin), 1)
+
+	def test_non_admin_read_state_does_not_split_rows(self):
+		mark_all_read(self.jane)
+		self._move(self.tasks[0])
+		mark_all_read(self.jane)
+		self._move(self.tasks[1])
+		self.assertEqual(Notification.objects.get().event_count, 2)
+
+	@override_settings(NOTIFICATION_COALESCE_SECONDS=0)
+	def test_coalescing_can_be_disabled(self):
+		for task in self.tasks:
+			self._move(task)
+		self.assertEqual(Notification.objects.count(), 3)
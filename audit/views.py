@@ -5,35 +5,47 @@ from django.shortcuts import get_object_or_404, redirect
 from django.views.decorators.http import require_POST
 from django.views.generic import ListView
 
+from core.pagination import KeysetPaginationMixin
+
+from .forms import AuditLogFilterForm
 from .models import AuditLog
 from .models import Notification
+from .notifications import mark_all_read, mark_read, notifications_for, receives_admin_notifications, unread_count
 
 
 class AdminOnlyMixin(UserPassesTestMixin):
 	def test_func(self):
-		user = self.request.user
-		return user.is_superuser or user.role in {'SUPER_ADMIN', 'HR_MANAGER'}
+		return receives_admin_notifications(self.request.user)
 
 
-class AuditLogListView(LoginRequiredMixin, AdminOnlyMixin, ListView):
+class AuditLogListView(LoginRequiredMixin, AdminOnlyMixin, KeysetPaginationMixin, ListView):
 	model = AuditLog
 	template_name = 'audit/log_list.html'
 	context_object_name = 'logs'
 	paginate_by = 25
 
+	def get_queryset(self):
+		self.filter_form = AuditLogFilterForm(self.request.GET or None)
+		return self.filter_form.filter(AuditLog.objects.select_related('user'))
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		context['filter_form'] = self.filter_form
+		return context
+
 
-class NotificationListView(LoginRequiredMixin, AdminOnlyMixin, ListView):
+class NotificationListView(LoginRequiredMixin, AdminOnlyMixin, KeysetPaginationMixin, ListView):
 	model = Notification
 	template_name = 'audit/notifications.html'
 	context_object_name = 'notifications'
 	paginate_by = 30
 
 	def get_queryset(self):
-		return Notification.objects.filter(recipient=self.request.user)
+		return notifications_for(self.request.user).select_related('actor')
 
 	def get_context_data(self, **kwargs):
 		context = super().get_context_data(**kwargs)
-		context['unread_count'] = Notification.objects.filter(recipient=self.request.user, is_read=False).count()
+		context['unread_count'] = unread_count(self.request.user)
 		return context
 
 
@@ -41,13 +53,10 @@ class NotificationListView(LoginRequiredMixin, AdminOnlyMixin, ListView):
 @require_POST
 def mark_notification_read(request, pk):
 	user = request.user
-	if not (user.is_superuser or getattr(user, 'role', None) in {'SUPER_ADMIN', 'HR_MANAGER'}):
+	if not receives_admin_notifications(user):
 		return HttpResponseForbidden('Forbidden')
 
-	n = get_object_or_404(Notification, pk=pk, recipient=user)
-	if not n.is_read:
-		n.is_read = True
-		n.save(update_fields=['is_read'])
+	mark_read(user, get_object_or_404(notifications_for(user), pk=pk))
 	return redirect('audit:notifications')
 
 
@@ -55,8 +64,8 @@ def mark_notification_read(request, pk):
 @require_POST
 def mark_all_notifications_read(request):
 	user = request.user
-	if not (user.is_superuser or getattr(user, 'role', None) in {'SUPER_ADMIN', 'HR_MANAGER'}):
+	if not receives_admin_notifications(user):
 		return HttpResponseForbidden('Forbidden')
 
-	Notification.objects.filter(recipient=user, is_read=False).update(is_read=True)
+	mark_all_read(user)
 	return redirect('audit:notifications')
@@ -0,0 +1,174 @@
+"""Buffered writer for ``AuditLog`` entries.
+
+Each process queues entries in memory and writes them with one
+``bulk_create`` when ``AUDIT_LOG_BATCH_SIZE`` entries are waiting, when the
+oldest has waited ``AUDIT_LOG_FLUSH_SECONDS`` (checked on the next write and
+by a timer for idle processes), and at interpreter exit. With
+``AUDIT_LOG_BUFFERED`` off (the default under tests) every entry is saved
+immediately.
+
+When a batch insert fails, its entries are saved one at a time (an entry
+whose user was deleted meanwhile is kept without the user). Entries that
+still fail, e.g. while SQLite is locked, go back in the queue for up to
+``MAX_ATTEMPTS`` flushes before they are logged and dropped.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+
+logger = logging.getLogger(__name__)
+
+# Flushes an entry may take part in before it is logged and dropped.
+MAX_ATTEMPTS = 3
+
+_FIELD_LENGTHS = {
+	field.name: field.max_length
+	for field in AuditLog._meta.concrete_fields
+	if getattr(field, 'max_length', None)
+}
+
+
+def _save_entry(entry):
+	# A rolled-back batch may already have assigned ids.
+	entry.pk = None
+	try:
+		with transaction.atomic():
+			entry.save(force_insert=True)
+	except IntegrityError:
+		if entry.user_id is None:
+			raise
+		# The user was deleted after the entry was queued; keep the entry.
+		entry.user_id = None
+		with transaction.atomic():
+			entry.save(force_insert=True)
+
+
+class AuditLogWriter:
+	def __init__(self, *, batch_size=None, flush_seconds=None, clock=time.monotonic, use_timer=True):
+		self._batch_size = batch_size
+		self._flush_seconds = flush_seconds
+		self._clock = clock
+		self._use_timer = use_timer
+		self._lock = threading.Lock()
+		self._pending = []
+		self._first_at = None
+		self._timer = None
+
+	@property
+	def batch_size(self):
+		return self._batch_size or getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 50)
+
+	@property
+	def flush_seconds(self):
+		if self._flush_seconds is not None:
+			return self._flush_seconds
+		return getattr(settings, 'AUDIT_LOG_FLUSH_SECONDS', 5)
+
+	def __len__(self):
+		return len(self._pending)
+
+	def add(self, entry):
+		with self._lock:
+			now = self._clock()
+			self._pending.append(entry)
+			if self._first_at is None:
+				self._first_at = now
+				self._start_timer()
+			due = len(self._pending) >= self.batch_size or now - self._first_at >= self.flush_seconds
+		if due:
+			self.flush()
+
+	def flush(self) -> int:
+		"""Write every queued entry; returns how many were written."""
+		with self._lock:
+			entries, self._pending = self._pending, []
+			self._first_at = None
+			if self._timer is not None:
+				self._timer.cancel()
+				self._timer = None
+		if not entries:
+			return 0
+		try:
+			with transaction.atomic():
+				AuditLog.objects.bulk_create(entries, batch_size=self.batch_size)
+			return len(entries)
+		except Exception:
+			logger.warning('Batch insert of %s audit log entries failed; saving them one by one.', len(entries), exc_info=True)
+		written = 0
+		failed = []
+		for entry in entries:
+			try:
+				_save_entry(entry)
+				written += 1
+			except Exception:
+				failed.append(entry)
+		if failed:
+			self._requeue(failed)
+		return written
+
+	def _requeue(self, entries):
+		"""Put entries that could not be saved back in the queue, up to ``MAX_ATTEMPTS`` times."""
+		retry = []
+		for entry in entries:
+			entry._audit_attempts = getattr(entry, '_audit_attempts', 1) + 1
+			if entry._audit_attempts > MAX_ATTEMPTS:
+				logger.error('Dropping audit log entry after %s attempts: %s %s (user %s).', MAX_ATTEMPTS, entry.method, entry.path, entry.user_id)
+			else:
+				retry.append(entry)
+		if not retry:
+			return
+		with self._lock:
+			self._pending[:0] = retry
+			if self._first_at is None:
+				self._first_at = self._clock()
+				self._start_timer()
+
+	def _start_timer(self):
+		if not self._use_timer:
+			return
+		self._timer = threading.Timer(self.flush_seconds, self._flush_from_timer)
+		self._timer.daemon = True
+		self._timer.start()
+
+	def _flush_from_timer(self):
+		try:
+			self.flush()
+		finally:
+			# The timer thread got its own connection; don't leak it.
+			connection.close()
+
+
+audit_writer = AuditLogWriter()
+atexit.register(audit_writer.flush)
+
+
+def record_audit(*, action, path, method, status_code=200, user=None, writer=None):
+	"""Record one ``AuditLog`` entry, buffered unless ``AUDIT_LOG_BUFFERED`` is off.
+
+	Values are clipped to the column sizes so one long path cannot fail a
+	whole batch.
+	"""
+	user_id = getattr(user, 'pk', None) if user is not None and getattr(user, 'is_authenticated', True) else None
+	entry = AuditLog(
+		user_id=user_id,
+		action=action[:_FIELD_LENGTHS['action']],
+		path=path[:_FIELD_LENGTHS['path']],
+		method=method[:_FIELD_LENGTHS['method']],
+		status_code=status_code,
+		created_at=timezone.now(),
+	)
+	if writer is None and not getattr(settings, 'AUDIT_LOG_BUFFERED', False):
+		entry.save()
+		return entry
+	(audit_writer if writer is None else writer).add(entry)
+	return entry
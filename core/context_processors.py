@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Any
 
 from .models import BrandingSettings
-from .permissions import user_is_hr_admin, user_is_super_admin, user_is_supervisor_plus
+from .permissions import get_permission_profile
 
 
 def org_context(request) -> dict[str, Any]:
@@ -12,24 +12,18 @@ def org_context(request) -> dict[str, Any]:
 	if not user or not getattr(user, 'is_authenticated', False):
 		return {'my_department': None, 'branding': branding, 'unread_notifications_count': 0}
 
-	is_super_admin = False
-	is_hr_admin = False
-	is_supervisor_plus = False
-	try:
-		is_super_admin = user_is_super_admin(user)
-		is_hr_admin = user_is_hr_admin(user)
-		is_supervisor_plus = user_is_supervisor_plus(user)
-	except Exception:
-		is_super_admin = bool(getattr(user, 'is_superuser', False) or getattr(user, 'role', None) == 'SUPER_ADMIN')
-		is_hr_admin = bool(getattr(user, 'is_superuser', False) or getattr(user, 'role', None) in {'SUPER_ADMIN', 'HR_MANAGER'})
-		is_supervisor_plus = bool(getattr(user, 'is_superuser', False) or getattr(user, 'role', None) in {'SUPER_ADMIN', 'HR_MANAGER', 'SUPERVISOR'})
+	# Resolved once and memoized on request.user for the rest of the request.
+	permissions = get_permission_profile(user)
+	is_super_admin = permissions.is_super_admin
+	is_hr_admin = permissions.is_hr_admin
+	is_supervisor_plus = permissions.is_supervisor_plus
 
 	# Notifications: admin-only badge count
 	unread_notifications_count = 0
 	try:
 		if is_hr_admin:
-			from audit.models import Notification
-			unread_notifications_count = Notification.objects.filter(recipient=user, is_read=False).count()
+			from audit.notifications import unread_count
+			unread_notifications_count = unread_count(user)
 	except Exception:
 		unread_notifications_count = 0
 
@@ -6,25 +6,19 @@ from email.parser import BytesParser
 from email.utils import getaddresses, parsedate_to_datetime
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from django.db.models import Q
 from django.urls import reverse
 
-from audit.models import AuditLog, Notification
+from audit.notifications import notify_admins
+from audit.writer import record_audit
 from core.models import InboxState, InboundEmail, InboundEmailAttachment
 
 
 _UIDVALIDITY_RE = re.compile(r"UIDVALIDITY\s+(\d+)")
 
 
-def _admin_recipients():
-    User = get_user_model()
-    return list(User.objects.filter(Q(is_superuser=True) | Q(role__in={'SUPER_ADMIN', 'HR_MANAGER'})).only('id'))
-
-
 def _decode_mime_words(value: str) -> str:
     if not value:
         return ""
@@ -248,7 +242,7 @@ class Command(BaseCommand):
                     inbox_path = '/tools/inbox/'
 
                 try:
-                    AuditLog.objects.create(
+                    record_audit(
                         user=None,
                         action=f'EMAIL FETCH: {fetched} ({mailbox})'[:100],
                         path=inbox_path,
@@ -259,20 +253,11 @@ class Command(BaseCommand):
                     pass
 
                 try:
-                    admins = _admin_recipients()
-                    if admins:
-                        Notification.objects.bulk_create(
-                            [
-                                Notification(
-                                    recipient=a,
-                                    actor=None,
-                                    message=f'New inbound email(s): {fetched} fetched in {mailbox}'[:255],
-                                    path=inbox_path,
-                                    level=Notification.LEVEL_INFO,
-                                )
-                                for a in admins
-                            ]
-                        )
+                    notify_admins(
+                        actor=None,
+                        message=f'New inbound email(s): {fetched} fetched in {mailbox}',
+                        path=inbox_path,
+                    )
                 except Exception:
                     pass
 
@@ -34,9 +34,9 @@ class PublicAccessCodeMiddleware:
         if user and user.is_authenticated:
             return self.get_response(request)
 
-        # Avoid interfering with static/media/admin endpoints.
+        # Avoid interfering with static/media/admin endpoints and the theme stylesheet.
         path = request.path or ''
-        if path.startswith('/static/') or path.startswith('/media/') or path.startswith('/admin/'):
+        if path.startswith(('/static/', '/media/', '/admin/', '/theme/')):
             return self.get_response(request)
 
         # Allow the access code entry page itself.
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+def compile_existing_theme(apps, schema_editor):
+    from core.theme import compile_theme_css, theme_css_hash
+
+    BrandingSettings = apps.get_model('core', 'BrandingSettings')
+    branding = BrandingSettings.objects.using(schema_editor.connection.alias).filter(pk=1).first()
+    if branding is None:
+        return
+    # The template only reads colour fields, which the historical model has.
+    # The file itself is written by the theme view on its first request.
+    css_hash = theme_css_hash(compile_theme_css(branding))
+    BrandingSettings.objects.using(schema_editor.connection.alias).filter(pk=1).update(theme_css_hash=css_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_brandingsettings_sidebar_active_link_color'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brandingsettings',
+            name='theme_css_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.RunPython(compile_existing_theme, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connection, models, transaction
+
+from .theme import compile_theme_css, theme_css_hash, write_theme_css
 
 
 def inbox_attachment_upload_to(instance, filename):
@@ -75,19 +77,63 @@ class BrandingSettings(models.Model):
 	public_access_code_hash = models.CharField(max_length=255, blank=True)
 	public_access_code_version = models.PositiveIntegerField(default=1)
 
+	# Content hash of the compiled theme stylesheet (core.theme), set on save.
+	theme_css_hash = models.CharField(max_length=16, blank=True, editable=False)
+
 	updated_at = models.DateTimeField(auto_now=True)
 
+	# Each process keeps its own copy of the row and reloads it when the
+	# row's ``updated_at`` in the database no longer matches. Checking the
+	# database (not the cache, which is per process) means a save in one
+	# worker, such as a revoked access code, reaches every other worker on
+	# its next request.
+	_solo_cache = None  # (updated_at, field names, values)
+
 	class Meta:
 		verbose_name = 'Branding Settings'
 		verbose_name_plural = 'Branding Settings'
 
 	def save(self, *args, **kwargs):
 		self.pk = 1
+		css = compile_theme_css(self)
+		self.theme_css_hash = theme_css_hash(css)
 		super().save(*args, **kwargs)
+		BrandingSettings._solo_cache = None
+		css_hash = self.theme_css_hash
+		transaction.on_commit(lambda: write_theme_css(css, css_hash))
+
+	def delete(self, *args, **kwargs):
+		result = super().delete(*args, **kwargs)
+		BrandingSettings._solo_cache = None
+		return result
 
 	@classmethod
 	def get_solo(cls):
+		"""The settings row, served from the process cache while its ``updated_at`` is current.
+
+		A cached copy costs one single-column primary key lookup instead of
+		loading the whole row. Each call returns a fresh instance, so views
+		may edit it freely. Inside a transaction the row is always read from
+		the database, so an uncommitted (or rolled back) change is never cached.
+		"""
+		cached = cls._solo_cache
+		if connection.in_atomic_block:
+			cached = None
+		elif cached is not None and cls.objects.filter(pk=1).values_list('updated_at', flat=True).first() != cached[0]:
+			cached = None
+		if cached is not None:
+			return cls.from_db('default', cached[1], cached[2])
+
 		obj, _ = cls.objects.get_or_create(pk=1)
+		if not connection.in_atomic_block:
+			version = obj.updated_at
+			fields = cls._meta.concrete_fields
+			cls._solo_cache = (
+				version,
+				[field.attname for field in fields],
+				# get_prep_value turns file fields back into their stored names.
+				[field.get_prep_value(getattr(obj, field.attname)) for field in fields],
+			)
 		return obj
 
 	def __str__(self):
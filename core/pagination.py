@@ -0,0 +1,141 @@
+"""Keyset (cursor) pagination for list views.
+
+A page is selected with a WHERE on the ordering columns instead of an
+OFFSET, and no total count is taken, so the thousandth page costs the same
+as the first. The cursor carries the ordering values of the row at the edge
+of the current page. Ordering columns must be non-null and end with a
+unique column (normally ``id``).
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+def _encode(values) -> str:
+	payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+	raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+	return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode(cursor: str, fields):
+	try:
+		raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+		values = json.loads(raw)
+		if not isinstance(values, list) or len(values) != len(fields):
+			raise ValueError
+		return [field.to_python(value) for field, value in zip(fields, values)]
+	except (ValueError, TypeError, ValidationError, binascii.Error):
+		raise Http404('Invalid page cursor.')
+
+
+class KeysetPage:
+	"""The slice of rows for one page plus cursors for its neighbours."""
+
+	def __init__(self, object_list, *, next_cursor, previous_cursor, params, after_param, before_param):
+		self.object_list = object_list
+		self.next_cursor = next_cursor
+		self.previous_cursor = previous_cursor
+		self._params = params
+		self._after_param = after_param
+		self._before_param = before_param
+
+	def __iter__(self):
+		return iter(self.object_list)
+
+	def __len__(self):
+		return len(self.object_list)
+
+	def has_next(self):
+		return self.next_cursor is not None
+
+	def has_previous(self):
+		return self.previous_cursor is not None
+
+	def has_other_pages(self):
+		return self.has_next() or self.has_previous()
+
+	def _query(self, param, cursor):
+		params = self._params.copy()
+		params.pop(self._after_param, None)
+		params.pop(self._before_param, None)
+		params[param] = cursor
+		return params.urlencode()
+
+	@property
+	def next_query(self):
+		return self._query(self._after_param, self.next_cursor) if self.next_cursor else ''
+
+	@property
+	def previous_query(self):
+		return self._query(self._before_param, self.previous_cursor) if self.previous_cursor else ''
+
+
+class KeysetPaginationMixin:
+	"""Replace ``ListView``'s OFFSET paginator with keyset pagination.
+
+	``keyset_ordering`` lists the ordering columns (``-`` for descending);
+	``?after=<cursor>`` pages forward and ``?before=<cursor>`` back. The
+	template gets ``page_obj`` as a ``KeysetPage`` and ``paginator`` as None;
+	``common/_keyset_pagination.html`` renders the links.
+	"""
+
+	keyset_ordering = ('-created_at', '-id')
+	cursor_after_param = 'after'
+	cursor_before_param = 'before'
+
+	def _keyset_fields(self, model):
+		return [(name.lstrip('-'), name.startswith('-'), model._meta.get_field(name.lstrip('-'))) for name in self.keyset_ordering]
+
+	@staticmethod
+	def _beyond(keyset, values, *, forward):
+		"""Q for rows strictly past ``values`` in (forward) ordering direction."""
+		clauses = []
+		for index, (name, descending, _field) in enumerate(keyset):
+			lookup = 'lt' if descending == forward else 'gt'
+			equal = {keyset[position][0]: values[position] for position in range(index)}
+			clauses.append(Q(**equal, **{f'{name}__{lookup}': values[index]}))
+		return reduce(or_, clauses)
+
+	def paginate_queryset(self, queryset, page_size):
+		keyset = self._keyset_fields(queryset.model)
+		fields = [field for _name, _descending, field in keyset]
+		ordering = [f'-{name}' if descending else name for name, descending, _field in keyset]
+		reverse = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+		params = self.request.GET
+		after = params.get(self.cursor_after_param)
+		before = params.get(self.cursor_before_param)
+		if before and not after:
+			rows = list(queryset.filter(self._beyond(keyset, _decode(before, fields), forward=False)).order_by(*reverse)[:page_size + 1])
+			more_before = len(rows) > page_size
+			rows = rows[:page_size][::-1]
+			has_next, has_previous = bool(rows), more_before
+		else:
+			if after:
+				queryset = queryset.filter(self._beyond(keyset, _decode(after, fields), forward=True))
+			rows = list(queryset.order_by(*ordering)[:page_size + 1])
+			has_next = len(rows) > page_size
+			rows = rows[:page_size]
+			has_previous = bool(after) and bool(rows)
+
+		def cursor(obj):
+			return _encode([getattr(obj, field.attname) for field in fields])
+
+		page = KeysetPage(
+			rows,
+			next_cursor=cursor(rows[-1]) if has_next else None,
+			previous_cursor=cursor(rows[0]) if has_previous else None,
+			params=params,
+			after_param=self.cursor_after_param,
+			before_param=self.cursor_before_param,
+		)
+		return None, page, page.object_list, page.has_other_pages()
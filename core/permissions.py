@@ -1,47 +1,147 @@
-from django.contrib.auth.mixins import UserPassesTestMixin
+from dataclasses import dataclass
+
 from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.cache import cache
+from django.db.models import CharField, F, Value
 
 
-def user_is_super_admin(user) -> bool:
+SUPER_ADMIN_ROLES = {'SUPER_ADMIN'}
+HR_ADMIN_ROLES = {'SUPER_ADMIN', 'HR_MANAGER'}
+SUPERVISOR_PLUS_ROLES = {'SUPER_ADMIN', 'HR_MANAGER', 'SUPERVISOR'}
+
+SUPER_ADMIN_GROUPS = {'Super Admin'}
+HR_ADMIN_GROUPS = {'Super Admin', 'HR Manager'}
+SUPERVISOR_PLUS_GROUPS = {'Super Admin', 'HR Manager', 'Supervisor'}
+
+SUPER_ADMIN_CODES = {'super-admin'}
+HR_ADMIN_CODES = {'super-admin', 'hr-manager'}
+SUPERVISOR_PLUS_CODES = {'super-admin', 'hr-manager', 'supervisor'}
+
+# Attribute on the user object holding its resolved profile. ``request.user``
+# is loaded once per request, so the memo lives exactly as long as the request.
+_PROFILE_ATTR = '_permission_profile'
+
+# Shared cache entries are keyed by user id and ``User.permissions_version``.
+# The version is read with the user row on every request, so bumping it
+# invalidates the entry in every process, even with the local-memory cache.
+# ``date_joined`` guards against a reused id (restored or rolled-back
+# databases). Bump the prefix when the role sets above change.
+_CACHE_PREFIX = 'permissions:v1'
+
+
+@dataclass(frozen=True)
+class PermissionProfile:
+    is_super_admin: bool = False
+    is_hr_admin: bool = False
+    is_supervisor_plus: bool = False
+
+
+ANONYMOUS_PROFILE = PermissionProfile()
+FULL_PROFILE = PermissionProfile(is_super_admin=True, is_hr_admin=True, is_supervisor_plus=True)
+
+
+def resolve_permission_profile(user) -> PermissionProfile:
+    """Work out every role check for ``user`` with at most one query.
+
+    A user qualifies through their ``role``, a Django group, or an active
+    department role (``EmployeeDepartmentRole``) with a matching code.
+    """
     if not user or not getattr(user, 'is_authenticated', False):
-        return False
-    if getattr(user, 'is_superuser', False) or getattr(user, 'role', None) == 'SUPER_ADMIN':
-        return True
-    try:
-        if user.groups.filter(name__in={'Super Admin'}).exists():
-            return True
-    except Exception:
-        pass
+        return ANONYMOUS_PROFILE
+    role = getattr(user, 'role', None)
+    if getattr(user, 'is_superuser', False) or role in SUPER_ADMIN_ROLES:
+        return FULL_PROFILE
+
     EmployeeDepartmentRole = apps.get_model('employees', 'EmployeeDepartmentRole')
-    return EmployeeDepartmentRole.objects.filter(employee=user, is_active=True, role__code__in={'super-admin'}).exists()
+    label = CharField()
+    groups = user.groups.values_list('name', Value('group', output_field=label))
+    codes = EmployeeDepartmentRole.objects.filter(employee=user, is_active=True).values_list('role__code', Value('code', output_field=label))
+    group_names = set()
+    role_codes = set()
+    for value, kind in groups.union(codes):
+        (group_names if kind == 'group' else role_codes).add(value)
 
+    def qualifies(roles, group_set, code_set):
+        return role in roles or bool(group_names & group_set) or bool(role_codes & code_set)
 
-def user_is_hr_admin(user) -> bool:
+    return PermissionProfile(
+        is_super_admin=qualifies(SUPER_ADMIN_ROLES, SUPER_ADMIN_GROUPS, SUPER_ADMIN_CODES),
+        is_hr_admin=qualifies(HR_ADMIN_ROLES, HR_ADMIN_GROUPS, HR_ADMIN_CODES),
+        is_supervisor_plus=qualifies(SUPERVISOR_PLUS_ROLES, SUPERVISOR_PLUS_GROUPS, SUPERVISOR_PLUS_CODES),
+    )
+
+
+def _cache_key(user):
+    joined = getattr(user, 'date_joined', None)
+    joined = joined.timestamp() if joined else 0
+    return f'{_CACHE_PREFIX}:{user.pk}:{getattr(user, "permissions_version", 0)}:{joined}'
+
+
+def _cached_permission_profile(user) -> PermissionProfile:
+    if getattr(user, 'is_superuser', False) or getattr(user, 'role', None) in SUPER_ADMIN_ROLES:
+        return FULL_PROFILE
+    key = _cache_key(user)
+    flags = cache.get(key)
+    if flags is not None:
+        return PermissionProfile(*flags)
+    profile = resolve_permission_profile(user)
+    cache.set(
+        key,
+        (profile.is_super_admin, profile.is_hr_admin, profile.is_supervisor_plus),
+        getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 3600),
+    )
+    return profile
+
+
+def get_permission_profile(user) -> PermissionProfile:
+    """The user's ``PermissionProfile``, memoized on the user object and in the shared cache."""
     if not user or not getattr(user, 'is_authenticated', False):
-        return False
-    if getattr(user, 'is_superuser', False) or getattr(user, 'role', None) in {'SUPER_ADMIN', 'HR_MANAGER'}:
-        return True
-    try:
-        if user.groups.filter(name__in={'Super Admin', 'HR Manager'}).exists():
-            return True
-    except Exception:
-        pass
-    EmployeeDepartmentRole = apps.get_model('employees', 'EmployeeDepartmentRole')
-    return EmployeeDepartmentRole.objects.filter(employee=user, is_active=True, role__code__in={'super-admin', 'hr-manager'}).exists()
+        return ANONYMOUS_PROFILE
+    profile = getattr(user, _PROFILE_ATTR, None)
+    if profile is None:
+        profile = _cached_permission_profile(user)
+        setattr(user, _PROFILE_ATTR, profile)
+    return profile
+
+
+def clear_permission_profile(user):
+    """Forget a memoized profile, e.g. after the user's role or groups change."""
+    if user is not None and getattr(user, _PROFILE_ATTR, None) is not None:
+        setattr(user, _PROFILE_ATTR, None)
+
+
+def invalidate_permission_profiles(user_ids):
+    """Bump ``permissions_version`` for ``user_ids`` (ids or a values queryset).
+
+    Cached profiles under the old version are simply never read again and
+    expire on their own.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    User.objects.filter(pk__in=user_ids).update(permissions_version=F('permissions_version') + 1)
+
+
+def invalidate_user_permissions(user):
+    """Invalidate ``user``'s cached profile and keep the in-memory instance in step."""
+    if user is None or user.pk is None:
+        return
+    invalidate_permission_profiles([user.pk])
+    if hasattr(user, 'permissions_version'):
+        user.permissions_version += 1
+    clear_permission_profile(user)
+
+
+def user_is_super_admin(user) -> bool:
+    return get_permission_profile(user).is_super_admin
+
+
+def user_is_hr_admin(user) -> bool:
+    return get_permission_profile(user).is_hr_admin
 
 
 def user_is_supervisor_plus(user) -> bool:
-    if not user or not getattr(user, 'is_authenticated', False):
-        return False
-    if getattr(user, 'is_superuser', False) or getattr(user, 'role', None) in {'SUPER_ADMIN', 'HR_MANAGER', 'SUPERVISOR'}:
-        return True
-    try:
-        if user.groups.filter(name__in={'Super Admin', 'HR Manager', 'Supervisor'}).exists():
-            return True
-    except Exception:
-        pass
-    EmployeeDepartmentRole = apps.get_model('employees', 'EmployeeDepartmentRole')
-    return EmployeeDepartmentRole.objects.filter(employee=user, is_active=True, role__code__in={'super-admin', 'hr-manager', 'supervisor'}).exists()
+    return get_permission_profile(user).is_supervisor_plus
 
 
 class HRAdminRequiredMixin(UserPassesTestMixin):
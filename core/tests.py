@@ -1,3 +1,280 @@
-from django.test import TestCase
+import tempfile
+from importlib import import_module
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password, make_password
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser, Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import BusinessRole, User
+from employees.models import Department, EmployeeDepartmentRole
+
+from .context_processors import org_context
+from .models import BrandingSettings
+from .theme import compile_theme_css, read_theme_css, theme_css_hash
+from .permissions import (
+	clear_permission_profile,
+	get_permission_profile,
+	user_is_hr_admin,
+	user_is_super_admin,
+	user_is_supervisor_plus,
+)
+
+
+class PermissionProfileTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.staff = User.objects.create_user(username='perm-staff', password='pw', role=User.ROLE_STAFF)
+		self.department = Department.objects.create(name='Permissions Dept')
+
+	def _fresh(self, user):
+		return User.objects.get(pk=user.pk)
+
+	def test_staff_profile_resolves_in_one_query_and_is_memoized(self):
+		user = self._fresh(self.staff)
+		with self.assertNumQueries(1):
+			profile = get_permission_profile(user)
+		self.assertFalse(profile.is_super_admin or profile.is_hr_admin or profile.is_supervisor_plus)
+		with self.assertNumQueries(0):
+			user_is_super_admin(user)
+			user_is_hr_admin(user)
+			user_is_supervisor_plus(user)
+
+	def test_superuser_and_anonymous_need_no_queries(self):
+		admin = User.objects.create_superuser(username='perm-root', password='pw')
+		clear_permission_profile(admin)
+		with self.assertNumQueries(0):
+			self.assertTrue(user_is_super_admin(admin))
+			self.assertFalse(user_is_supervisor_plus(AnonymousUser()))
+
+	def test_group_grant(self):
+		self.staff.groups.add(Group.objects.get_or_create(name='HR Manager')[0])
+		profile = get_permission_profile(self._fresh(self.staff))
+		self.assertTrue(profile.is_hr_admin)
+		self.assertTrue(profile.is_supervisor_plus)
+		self.assertFalse(profile.is_super_admin)
+
+	def test_department_role_grant(self):
+		role = BusinessRole.objects.create(code='supervisor', name='Supervisor')
+		assignment = EmployeeDepartmentRole.objects.create(employee=self.staff, department=self.department, role=role)
+		profile = get_permission_profile(self._fresh(self.staff))
+		self.assertTrue(profile.is_supervisor_plus)
+		self.assertFalse(profile.is_hr_admin)
+
+		assignment.is_active = False
+		assignment.save()
+		self.assertFalse(get_permission_profile(self._fresh(self.staff)).is_supervisor_plus)
+
+	def test_role_change_clears_memoized_profile(self):
+		user = self._fresh(self.staff)
+		self.assertFalse(user_is_hr_admin(user))
+		user.role = User.ROLE_HR_MANAGER
+		user.save()
+		self.assertTrue(user_is_hr_admin(user))
+
+	def test_context_processor_reuses_request_profile(self):
+		request = RequestFactory().get('/')
+		request.user = self._fresh(self.staff)
+		get_permission_profile(request.user)
+		context = org_context(request)
+		self.assertFalse(context['is_hr_admin'])
+		with self.assertNumQueries(0):
+			user_is_supervisor_plus(request.user)
+
+	def test_page_render_resolves_roles_once(self):
+		self.client.force_login(self.staff)
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(reverse('reports:weekly_list'), secure=True)
+		self.assertEqual(response.status_code, 200)
+		role_queries = [query for query in queries.captured_queries if 'accounts_user_groups' in query['sql']]
+		self.assertEqual(len(role_queries), 1)
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'permission-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PermissionCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='cache-staff', password='pw', role=User.ROLE_STAFF)
+		self.department = Department.objects.create(name='Cache Dept')
+
+	def _profile(self):
+		# A fresh instance, as loaded for a new request.
+		return get_permission_profile(User.objects.get(pk=self.user.pk))
+
+	def test_profile_is_shared_between_requests(self):
+		self.assertFalse(self._profile().is_hr_admin)
+		user = User.objects.get(pk=self.user.pk)
+		with self.assertNumQueries(0):
+			self.assertFalse(get_permission_profile(user).is_supervisor_plus)
+
+	def test_group_membership_invalidates(self):
+		self.assertFalse(self._profile().is_hr_admin)
+		group = Group.objects.get_or_create(name='HR Manager')[0]
+		group.user_set.add(self.user)
+		self.assertTrue(self._profile().is_hr_admin)
+		group.user_set.clear()
+		self.assertFalse(self._profile().is_hr_admin)
+
+	def test_role_change_invalidates(self):
+		self.assertFalse(self._profile().is_supervisor_plus)
+		user = User.objects.get(pk=self.user.pk)
+		user.role = User.ROLE_SUPERVISOR
+		user.save()
+		self.assertTrue(self._profile().is_supervisor_plus)
+
+	def test_department_role_save_and_delete_invalidate(self):
+		self.assertFalse(self._profile().is_supervisor_plus)
+		role = BusinessRole.objects.create(code='supervisor', name='Supervisor')
+		assignment = EmployeeDepartmentRole.objects.create(employee=self.user, department=self.department, role=role)
+		self.assertTrue(self._profile().is_supervisor_plus)
+		assignment.is_active = False
+		assignment.save()
+		self.assertFalse(self._profile().is_supervisor_plus)
+		assignment.is_active = True
+		assignment.save()
+		self.assertTrue(self._profile().is_supervisor_plus)
+		assignment.delete()
+		self.assertFalse(self._profile().is_supervisor_plus)
+
+	def test_login_does_not_invalidate(self):
+		version = User.objects.get(pk=self.user.pk).permissions_version
+		self.client.login(username='cache-staff', password='pw')
+		self.assertEqual(User.objects.get(pk=self.user.pk).permissions_version, version)
+
+	def test_file_based_cache(self):
+		with tempfile.TemporaryDirectory() as location:
+			backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+			with override_settings(CACHES={'default': backend}):
+				self.assertFalse(self._profile().is_hr_admin)
+				with self.assertNumQueries(1):
+					self.assertFalse(self._profile().is_hr_admin)
+				self.user.groups.add(Group.objects.get_or_create(name='HR Manager')[0])
+				self.assertTrue(self._profile().is_hr_admin)
+
+
+class BrandingTransactionTestCase(TransactionTestCase):
+	# Outside TestCase's wrapping transaction, so get_solo() may cache and
+	# on_commit hooks (which write the theme stylesheet) run.
+
+	def setUp(self):
+		cache.clear()
+		BrandingSettings._solo_cache = None
+		self.media = tempfile.TemporaryDirectory()
+		self.settings_override = override_settings(MEDIA_ROOT=self.media.name)
+		self.settings_override.enable()
+
+	def tearDown(self):
+		self.settings_override.disable()
+		self.media.cleanup()
+		cache.clear()
+		BrandingSettings._solo_cache = None
+
+
+class BrandingSettingsCacheTests(BrandingTransactionTestCase):
+
+	def test_get_solo_is_served_from_process_cache(self):
+		first = BrandingSettings.get_solo()
+		with self.assertNumQueries(1):
+			second = BrandingSettings.get_solo()
+		self.assertIsNot(first, second)
+		self.assertEqual(second.app_name, BrandingSettings.DEFAULT_APP_NAME)
+		first.app_name = 'Unsaved edit'
+		self.assertEqual(BrandingSettings.get_solo().app_name, BrandingSettings.DEFAULT_APP_NAME)
+
+	def test_save_invalidates(self):
+		branding = BrandingSettings.get_solo()
+		branding.app_name = 'Renamed'
+		branding.logo = 'branding/logo.png'
+		branding.save()
+		cached = BrandingSettings.get_solo()
+		self.assertEqual(cached.app_name, 'Renamed')
+		self.assertEqual(cached.logo.name, 'branding/logo.png')
+		with self.assertNumQueries(1):
+			self.assertEqual(BrandingSettings.get_solo().app_name, 'Renamed')
+
+	def test_save_from_another_process_reloads(self):
+		BrandingSettings.get_solo()
+		# Another worker's save changes the row but not this process's memory.
+		BrandingSettings.objects.filter(pk=1).update(
+			public_access_code_enabled=True,
+			public_access_code_hash=make_password('4321'),
+			updated_at=timezone.now(),
+		)
+		branding = BrandingSettings.get_solo()
+		self.assertTrue(branding.public_access_code_enabled)
+		self.assertTrue(check_password('4321', branding.public_access_code_hash))
+
+	def test_theme_reset_invalidates(self):
+		branding = BrandingSettings.get_solo()
+		branding.primary_color = '#000000'
+		branding.save()
+		self.assertEqual(BrandingSettings.get_solo().primary_color, '#000000')
+
+		admin = User.objects.create_user(username='theme-admin', password='pw', role=User.ROLE_HR_MANAGER)
+		self.client.force_login(admin)
+		response = self.client.post(reverse('core:theme_settings'), {'reset_theme': '1'}, secure=True)
+		self.assertEqual(response.status_code, 302)
+		self.assertEqual(BrandingSettings.get_solo().primary_color, BrandingSettings.DEFAULT_PRIMARY_COLOR)
+
+
+class ThemeStylesheetTests(BrandingTransactionTestCase):
+	def test_save_compiles_hashed_stylesheet(self):
+		branding = BrandingSettings.get_solo()
+		branding.primary_color = '#123456'
+		branding.save()
+		first_hash = branding.theme_css_hash
+		self.assertEqual(len(first_hash), 16)
+		self.assertIn('--primary-color: #123456;', read_theme_css(first_hash))
+
+		branding.primary_color = '#654321'
+		branding.save()
+		self.assertNotEqual(branding.theme_css_hash, first_hash)
+		self.assertIn('--primary-color: #654321;', read_theme_css(branding.theme_css_hash))
+
+	def test_current_stylesheet_is_immutable(self):
+		branding = BrandingSettings.get_solo()
+		branding.sidebar_color = '#abcdef'
+		branding.save()
+		response = self.client.get(reverse('core:theme_css', args=[branding.theme_css_hash]), secure=True)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+		self.assertIn('immutable', response['Cache-Control'])
+		self.assertIn(b'--bg-sidebar: #abcdef;', response.content)
+
+		stale = self.client.get(reverse('core:theme_css', args=['current']), secure=True)
+		self.assertIn('no-cache', stale['Cache-Control'])
+		self.assertIn(b'--bg-sidebar: #abcdef;', stale.content)
+
+	def test_pages_link_stylesheet_behind_access_code(self):
+		branding = BrandingSettings.get_solo()
+		branding.public_access_code_enabled = True
+		branding.public_access_code_hash = make_password('1234')
+		branding.save()
+		page = self.client.get(reverse('core:public_access'), secure=True)
+		url = reverse('core:theme_css', args=[branding.theme_css_hash])
+		self.assertContains(page, url)
+		self.assertNotContains(page, '--primary-color:')
+		self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+
+	def test_migration_compiles_stylesheet_for_existing_row(self):
+		BrandingSettings.get_solo()
+		BrandingSettings.objects.filter(pk=1).update(primary_color='#0a0b0c', theme_css_hash='')
+		migration = import_module('core.migrations.0013_brandingsettings_theme_css_hash')
+		with connection.schema_editor() as schema_editor:
+			migration.compile_existing_theme(apps, schema_editor)
+		# Migrations run before the web processes start, with nothing cached.
+		BrandingSettings._solo_cache = None
+
+		branding = BrandingSettings.objects.get(pk=1)
+		self.assertEqual(branding.theme_css_hash, theme_css_hash(compile_theme_css(branding)))
+		response = self.client.get(reverse('core:theme_css', args=[branding.theme_css_hash]), secure=True)
+		self.assertIn(b'--primary-color: #0a0b0c;', response.content)
+		self.assertIn('--primary-color: #0a0b0c;', read_theme_css(branding.theme_css_hash))
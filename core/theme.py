@@ -0,0 +1,45 @@
+"""Compiled theme stylesheet for ``BrandingSettings``.
+
+The colour settings are rendered into one CSS file whenever branding is
+saved. The file name carries a hash of its content, so pages reference it
+with far-future cache headers and a changed theme always gets a new URL.
+"""
+from __future__ import annotations
+
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+
+
+THEME_DIR = 'theme'
+THEME_TEMPLATE = 'core/theme.css'
+
+
+def compile_theme_css(branding) -> str:
+	return render_to_string(THEME_TEMPLATE, {'branding': branding})
+
+
+def theme_css_hash(css: str) -> str:
+	return hashlib.sha256(css.encode('utf-8')).hexdigest()[:16]
+
+
+def theme_css_name(css_hash: str) -> str:
+	return f'{THEME_DIR}/theme.{css_hash}.css'
+
+
+def write_theme_css(css: str, css_hash: str) -> str:
+	"""Store the compiled stylesheet once; the content never changes for a hash."""
+	name = theme_css_name(css_hash)
+	if not default_storage.exists(name):
+		default_storage.save(name, ContentFile(css.encode('utf-8')))
+	return name
+
+
+def read_theme_css(css_hash: str):
+	name = theme_css_name(css_hash)
+	if not default_storage.exists(name):
+		return None
+	with default_storage.open(name, 'rb') as handle:
+		return handle.read().decode('utf-8')
@@ -14,6 +14,7 @@ from .views import (
     GlobalSearchView,
     StaffDashboardView,
     ThemeSettingsUpdateView,
+    ThemeStylesheetView,
 )
 
 app_name = 'core'
@@ -31,5 +32,6 @@ urlpatterns = [
     path('help/user-manual.pdf', UserManualPdfView.as_view(), name='user_manual_pdf'),
 	path('help/user-manual-staff.pdf', UserManualStaffPdfView.as_view(), name='user_manual_staff_pdf'),
     path('settings/theme/', ThemeSettingsUpdateView.as_view(), name='theme_settings'),
+    path('theme/<slug:css_hash>.css', ThemeStylesheetView.as_view(), name='theme_css'),
 	path('settings/access-code/', PublicAccessCodeSettingsUpdateView.as_view(), name='access_code_settings'),
 ]
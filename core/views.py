@@ -1,24 +1,26 @@
 from django.contrib.auth.hashers import check_password
 from django.contrib import messages
-from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.mail import EmailMessage
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.urls import reverse
 from django.utils import timezone
-from django.views.generic import FormView, TemplateView, UpdateView
+from django.utils.cache import patch_cache_control
+from django.views.generic import FormView, TemplateView, UpdateView, View
 from django.views.generic import DetailView, ListView
-from django.db.models import Q
+from django.db.models import Count, Q
 
 import mimetypes
 
+from .pagination import KeysetPaginationMixin
 from .pdf import render_user_manual_pdf
+from .theme import compile_theme_css, read_theme_css, write_theme_css
 
 from attendance.models import AttendanceRecord
 from core.permissions import HRAdminRequiredMixin, SupervisorPlusRequiredMixin, user_is_hr_admin, user_is_supervisor_plus
-from audit.models import Notification
+from audit.notifications import notify_admins
 from employees.models import Department, EmployeeDocument, EmployeeProfile
 from leave_mgmt.models import LeaveRequest
 from noticeboard.models import Notice
@@ -36,30 +38,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def _admin_recipients():
-	User = get_user_model()
-	return list(User.objects.filter(Q(is_superuser=True) | Q(role__in={'SUPER_ADMIN', 'HR_MANAGER'})).only('id'))
-
-
-def _notify_admins(*, actor, message: str, path: str = ''):
-	admins = _admin_recipients()
-	if not admins:
-		return
-	Notification.objects.bulk_create(
-		[
-			Notification(
-				recipient=a,
-				actor=actor,
-				message=(message or '')[:255],
-				path=(path or '')[:255],
-				level=Notification.LEVEL_INFO,
-			)
-			for a in admins
-			if not actor or a.id != actor.id
-		]
-	)
-
-
 class PublicHomeView(TemplateView):
 	template_name = 'core/public_home.html'
 
@@ -301,6 +279,24 @@ class ThemeSettingsUpdateView(LoginRequiredMixin, HRAdminRequiredMixin, UpdateVi
 		return super().form_valid(form)
 
 
+class ThemeStylesheetView(View):
+	"""Serve the compiled theme CSS; the current hash is cached for a year."""
+	def get(self, request, css_hash):
+		branding = BrandingSettings.get_solo()
+		if css_hash and css_hash == branding.theme_css_hash:
+			css = read_theme_css(css_hash)
+			if css is None:
+				css = compile_theme_css(branding)
+				write_theme_css(css, css_hash)
+			response = HttpResponse(css, content_type='text/css; charset=utf-8')
+			patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+		else:
+			# An old or unhashed URL: serve the current theme but let it be refetched.
+			response = HttpResponse(compile_theme_css(branding), content_type='text/css; charset=utf-8')
+			patch_cache_control(response, no_cache=True)
+		return response
+
+
 class PublicAccessCodeSettingsUpdateView(LoginRequiredMixin, HRAdminRequiredMixin, UpdateView):
 	model = BrandingSettings
 	form_class = PublicAccessCodeSettingsForm
@@ -356,7 +352,7 @@ class ExecutiveEmailView(LoginRequiredMixin, SupervisorPlusRequiredMixin, FormVi
 			path = self.request.path
 		try:
 			subject_short = (subject or '').strip()[:120]
-			_notify_admins(
+			notify_admins(
 				actor=self.request.user,
 				message=f'Email sent: {subject_short} (to {len(recipients)} recipient(s))',
 				path=path,
@@ -399,12 +395,14 @@ class UserManualStaffPdfView(LoginRequiredMixin, SupervisorPlusRequiredMixin, Te
 		)
 
 
-class InboxListView(LoginRequiredMixin, SupervisorPlusRequiredMixin, ListView):
+class InboxListView(LoginRequiredMixin, SupervisorPlusRequiredMixin, KeysetPaginationMixin, ListView):
 	template_name = 'core/inbox_list.html'
 	context_object_name = 'emails'
+	paginate_by = 50
+	keyset_ordering = ('-uid', '-id')
 
 	def get_queryset(self):
-		return InboundEmail.objects.order_by('-uid')[:50]
+		return InboundEmail.objects.annotate(attachment_count=Count('attachments'))
 
 
 class InboxDetailView(LoginRequiredMixin, SupervisorPlusRequiredMixin, DetailView):
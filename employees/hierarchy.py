@@ -0,0 +1,65 @@
+"""Maintenance of the ``DepartmentClosure`` table.
+
+Each department has a row pairing it with itself (depth 0) and with every
+ancestor above it, so "all departments under X" is one indexed lookup no
+matter how deep the tree goes.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+
+from .models import Department, DepartmentClosure
+
+
+def subtree_ids(department_id) -> list:
+	"""Ids of ``department_id`` and everything below it."""
+	return list(DepartmentClosure.objects.filter(ancestor_id=department_id).values_list('descendant_id', flat=True))
+
+
+def attach_department(department_id, parent_id):
+	"""(Re)place ``department_id`` and its subtree under ``parent_id`` (or make it a root)."""
+	with transaction.atomic():
+		DepartmentClosure.objects.get_or_create(ancestor_id=department_id, descendant_id=department_id, defaults={'depth': 0})
+		subtree = list(DepartmentClosure.objects.filter(ancestor_id=department_id).values_list('descendant_id', 'depth'))
+		subtree_ids = [descendant_id for descendant_id, _depth in subtree]
+		if parent_id in subtree_ids:
+			raise ValueError('A department cannot be placed under itself or one of its sub-departments.')
+
+		# Cut the subtree loose from its old ancestors, keeping its internal links.
+		DepartmentClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+		if not parent_id:
+			return
+
+		ancestors = list(DepartmentClosure.objects.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth'))
+		DepartmentClosure.objects.bulk_create(
+			[
+				DepartmentClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + descendant_depth + 1)
+				for ancestor_id, ancestor_depth in ancestors
+				for descendant_id, descendant_depth in subtree
+			],
+			batch_size=500,
+		)
+
+
+def detach_department(department_id):
+	"""Prepare for deleting ``department_id``: its children become roots with their subtrees intact."""
+	below = [pk for pk in subtree_ids(department_id) if pk != department_id]
+	if below:
+		DepartmentClosure.objects.filter(descendant_id__in=below).exclude(ancestor_id__in=below).delete()
+
+
+def rebuild_department_closure():
+	"""Recreate the whole closure table from ``Department.parent`` (e.g. after queryset updates)."""
+	parents = dict(Department.objects.values_list('id', 'parent_id'))
+	rows = []
+	for department_id in parents:
+		seen = set()
+		node, depth = department_id, 0
+		while node is not None and node not in seen:
+			seen.add(node)
+			rows.append(DepartmentClosure(ancestor_id=node, descendant_id=department_id, depth=depth))
+			node, depth = parents.get(node), depth + 1
+	with transaction.atomic():
+		DepartmentClosure.objects.all().delete()
+		DepartmentClosure.objects.bulk_create(rows, batch_size=500)
+	return len(rows)
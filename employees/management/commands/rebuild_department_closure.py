@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from employees.hierarchy import rebuild_department_closure
+
+
+class Command(BaseCommand):
+    help = "Rebuild the department hierarchy closure table from Department.parent."
+
+    def handle(self, *args, **options):
+        count = rebuild_department_closure()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt department closure ({count} rows)."))
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_closure(apps, schema_editor):
+    Department = apps.get_model('employees', 'Department')
+    DepartmentClosure = apps.get_model('employees', 'DepartmentClosure')
+    parents = dict(Department.objects.values_list('id', 'parent_id'))
+    rows = []
+    for department_id in parents:
+        seen = set()
+        node, depth = department_id, 0
+        while node is not None and node not in seen:
+            seen.add(node)
+            rows.append(DepartmentClosure(ancestor_id=node, descendant_id=department_id, depth=depth))
+            node, depth = parents.get(node), depth + 1
+    DepartmentClosure.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_rename_employees_e_user_id_9d2de1_idx_employees_e_user_id_1e9249_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(default=0)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='employees.department')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='employees.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='employees_d_descend_8690b4_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='departmentclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_department_closure_pair'),
+        ),
+        migrations.RunPython(backfill_closure, migrations.RunPython.noop),
+    ]
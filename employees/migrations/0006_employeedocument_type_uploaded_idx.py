@@ -0,0 +1,17 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_department_closure'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeedocument',
+            index=models.Index(fields=['document_type', 'uploaded_at', 'id'], name='emp_doc_type_uploaded_idx'),
+        ),
+    ]
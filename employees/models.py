@@ -33,6 +33,32 @@ class Department(models.Model):
 	def __str__(self):
 		return self.name
 
+	def clean(self):
+		if self.parent_id and self.pk:
+			if self.parent_id == self.pk or DepartmentClosure.objects.filter(ancestor_id=self.pk, descendant_id=self.parent_id).exists():
+				raise ValidationError({'parent': 'A department cannot be placed under itself or one of its sub-departments.'})
+
+
+class DepartmentClosure(models.Model):
+	"""Every (ancestor, descendant) pair of the department tree, including each department with itself.
+
+	Maintained by ``employees.signals`` on save/delete so subtree queries are a single join.
+	"""
+	ancestor = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='descendant_links')
+	descendant = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='ancestor_links')
+	depth = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_department_closure_pair'),
+		]
+		indexes = [
+			models.Index(fields=['descendant', 'depth']),
+		]
+
+	def __str__(self):
+		return f'{self.ancestor} > {self.descendant} ({self.depth})'
+
 
 class Position(models.Model):
 	title = models.CharField(max_length=120)
@@ -179,6 +205,7 @@ class EmployeeDocument(models.Model):
 		indexes = [
 			models.Index(fields=['user']),
 			models.Index(fields=['document_type']),
+			models.Index(fields=['document_type', 'uploaded_at', 'id'], name='emp_doc_type_uploaded_idx'),
 		]
 
 	def __str__(self):
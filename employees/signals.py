@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.permissions import invalidate_permission_profiles
+
+from .hierarchy import attach_department, detach_department, subtree_ids
+from .models import Department, EmployeeDepartmentRole
+
+
+@receiver(pre_save, sender=Department)
+def department_pre_save(sender, instance, **kwargs):
+	instance._previous_parent_id = None
+	if not instance.pk:
+		return
+	instance._previous_parent_id = sender.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+	if instance.parent_id and instance.parent_id != instance._previous_parent_id and instance.parent_id in subtree_ids(instance.pk):
+		# Forms catch this in Department.clean(); refuse before writing a cycle from other code paths.
+		raise ValueError('A department cannot be placed under itself or one of its sub-departments.')
+
+
+@receiver(post_save, sender=Department)
+def department_saved(sender, instance, created, **kwargs):
+	if kwargs.get('raw'):
+		return
+	if created or instance.parent_id != getattr(instance, '_previous_parent_id', None):
+		attach_department(instance.pk, instance.parent_id)
+
+
+@receiver(pre_delete, sender=Department)
+def department_deleting(sender, instance, **kwargs):
+	detach_department(instance.pk)
+
+
+@receiver(pre_save, sender=EmployeeDepartmentRole)
+def department_role_pre_save(sender, instance, **kwargs):
+	instance._previous_employee_id = None
+	if instance.pk:
+		instance._previous_employee_id = sender.objects.filter(pk=instance.pk).values_list('employee_id', flat=True).first()
+
+
+@receiver(post_save, sender=EmployeeDepartmentRole)
+def department_role_saved(sender, instance, **kwargs):
+	if kwargs.get('raw'):
+		return
+	invalidate_permission_profiles({instance.employee_id, getattr(instance, '_previous_employee_id', None)} - {None})
+
+
+@receiver(post_delete, sender=EmployeeDepartmentRole)
+def department_role_deleted(sender, instance, **kwargs):
+	invalidate_permission_profiles([instance.employee_id])
@@ -1,9 +1,11 @@
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.urls import reverse
 
 from accounts.models import User
-from .models import EmployeeDocument, EmployeeProfile
+from .hierarchy import rebuild_department_closure, subtree_ids
+from .models import Department, DepartmentClosure, EmployeeDocument, EmployeeProfile
 
 
 class EmployeeOnboardingTests(TestCase):
@@ -84,3 +86,48 @@ class EmployeeDocumentOwnershipTests(TestCase):
 		self.assertEqual(delete_resp.status_code, 404)
 		dl_resp = self.client.get(reverse('employees:document_download', args=[doc.pk]))
 		self.assertEqual(dl_resp.status_code, 404)
+
+
+class DepartmentClosureTests(TestCase):
+	def setUp(self):
+		self.root = Department.objects.create(name='Head Office')
+		self.ops = Department.objects.create(name='Operations', parent=self.root)
+		self.field = Department.objects.create(name='Field', parent=self.ops)
+		self.north = Department.objects.create(name='North', parent=self.field)
+		self.finance = Department.objects.create(name='Finance', parent=self.root)
+
+	def _pairs(self):
+		return set(DepartmentClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+	def test_closure_tracks_creation_and_moves(self):
+		self.assertEqual(set(subtree_ids(self.ops.pk)), {self.ops.pk, self.field.pk, self.north.pk})
+		self.assertIn((self.root.pk, self.north.pk, 3), self._pairs())
+
+		self.field.parent = self.finance
+		self.field.save()
+		self.assertEqual(set(subtree_ids(self.ops.pk)), {self.ops.pk})
+		self.assertEqual(set(subtree_ids(self.finance.pk)), {self.finance.pk, self.field.pk, self.north.pk})
+		self.assertIn((self.finance.pk, self.north.pk, 2), self._pairs())
+
+		before = self._pairs()
+		self.assertEqual(rebuild_department_closure(), len(before))
+		self.assertEqual(self._pairs(), before)
+
+	def test_deleting_department_orphans_children_as_roots(self):
+		self.ops.delete()
+		self.field.refresh_from_db()
+		self.assertIsNone(self.field.parent_id)
+		self.assertEqual(set(subtree_ids(self.root.pk)), {self.root.pk, self.finance.pk})
+		self.assertEqual(set(subtree_ids(self.field.pk)), {self.field.pk, self.north.pk})
+		before = self._pairs()
+		rebuild_department_closure()
+		self.assertEqual(self._pairs(), before)
+
+	def test_cycles_are_rejected(self):
+		self.ops.parent = self.north
+		with self.assertRaises(ValidationError):
+			self.ops.full_clean()
+		with self.assertRaises(ValueError):
+			self.ops.save()
+		self.ops.refresh_from_db()
+		self.assertEqual(self.ops.parent_id, self.root.pk)
@@ -13,6 +13,7 @@ from django.views.generic import CreateView, DeleteView, DetailView, ListView, U
 
 import mimetypes
 
+from core.pagination import KeysetPaginationMixin
 from core.permissions import HRAdminRequiredMixin, SupervisorPlusRequiredMixin, user_is_hr_admin, user_is_supervisor_plus, user_is_super_admin
 
 from .forms import DepartmentForm, EmployeeDocumentForm, EmployeeOnboardingForm, EmployeeProfileForm, PositionForm, UserPasswordResetForm
@@ -59,17 +60,7 @@ def toggle_user_access(request, user_pk):
 
 
 def _can_manage_documents(user):
-	if not user.is_authenticated:
-		return False
-	if user.is_superuser or user.role in {'SUPER_ADMIN', 'HR_MANAGER', 'SUPERVISOR'}:
-		return True
-	if user.groups.filter(name__in={'Super Admin', 'HR Manager', 'Supervisor'}).exists():
-		return True
-	return EmployeeDepartmentRole.objects.filter(
-		employee=user,
-		is_active=True,
-		role__code__in={'super-admin', 'hr-manager', 'supervisor'},
-	).exists()
+	return user_is_supervisor_plus(user)
 
 
 def _can_view_employee(actor: User, employee_profile: EmployeeProfile) -> bool:
@@ -448,11 +439,12 @@ class MyProfileView(LoginRequiredMixin, DetailView):
 		return context
 
 
-class ContractsListView(LoginRequiredMixin, SupervisorPlusRequiredMixin, ListView):
+class ContractsListView(LoginRequiredMixin, SupervisorPlusRequiredMixin, KeysetPaginationMixin, ListView):
 	model = EmployeeDocument
 	template_name = 'employees/contracts_list.html'
 	context_object_name = 'contracts'
 	paginate_by = 50
+	keyset_ordering = ('-uploaded_at', '-id')
 
 	def get_queryset(self):
 		qs = EmployeeDocument.objects.filter(document_type=EmployeeDocument.DOC_CONTRACT).select_related(
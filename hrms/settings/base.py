@@ -197,6 +197,53 @@ IMAP_USE_SSL = env_bool('IMAP_USE_SSL', True)
 IMAP_MAILBOX = os.getenv('IMAP_MAILBOX', 'INBOX')
 IMAP_MAX_FETCH = int(os.getenv('IMAP_MAX_FETCH', '50'))
 
+# Payroll background jobs, processed by `python manage.py payroll_worker`.
+# When disabled, payroll jobs run inline inside the request.
+PAYROLL_BACKGROUND_JOBS = env_bool('PAYROLL_BACKGROUND_JOBS', not RUNNING_TESTS)
+PAYROLL_JOB_CHUNK_SIZE = int(os.getenv('PAYROLL_JOB_CHUNK_SIZE', '200'))
+PAYROLL_JOB_STALE_SECONDS = int(os.getenv('PAYROLL_JOB_STALE_SECONDS', '900'))
+# Worker processes used to render payslip PDFs (1 renders inline).
+PAYROLL_PDF_WORKERS = int(os.getenv('PAYROLL_PDF_WORKERS', '1' if RUNNING_TESTS else str(min(4, os.cpu_count() or 1))))
+# Employees per PDF file in the bulk annual (P9-style) summary download.
+PAYROLL_ANNUAL_SUMMARY_BATCH_SIZE = int(os.getenv('PAYROLL_ANNUAL_SUMMARY_BATCH_SIZE', '250'))
+# Net-pay change (percent of last month) flagged by the payroll variance report.
+PAYROLL_VARIANCE_THRESHOLD_PERCENT = os.getenv('PAYROLL_VARIANCE_THRESHOLD_PERCENT', '10')
+
+# Audit log entries are queued per process and written in batches
+# (audit.writer). Tests write each entry immediately.
+AUDIT_LOG_BUFFERED = env_bool('AUDIT_LOG_BUFFERED', not RUNNING_TESTS)
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', '50'))
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv('AUDIT_LOG_FLUSH_SECONDS', '5'))
+
+# Retention for `python manage.py archive_audit`: older rows are moved to
+# gzip JSONL files under AUDIT_ARCHIVE_DIR, which must not be inside
+# MEDIA_ROOT (media may be served publicly).
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv('AUDIT_LOG_RETENTION_DAYS', '180'))
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+AUDIT_ARCHIVE_DIR = Path(os.getenv('AUDIT_ARCHIVE_DIR', str(BASE_DIR / 'audit_archive')))
+
+# Repeated Kanban notifications from one user within this window are merged
+# into a single admin notification. 0 disables merging.
+NOTIFICATION_COALESCE_SECONDS = int(os.getenv('NOTIFICATION_COALESCE_SECONDS', '300'))
+
+# Shared cache (permission profiles). Local memory works per process; set
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache to
+# share entries between worker processes.
+CACHE_BACKEND = os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+if CACHE_BACKEND.endswith('FileBasedCache'):
+    CACHE_LOCATION = os.getenv('DJANGO_CACHE_LOCATION', str(BASE_DIR / '.cache'))
+else:
+    CACHE_LOCATION = os.getenv('DJANGO_CACHE_LOCATION', 'hrms')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'TIMEOUT': int(os.getenv('DJANGO_CACHE_TIMEOUT', '300')),
+    }
+}
+# Seconds a user's resolved roles stay cached (entries are invalidated on change).
+PERMISSION_CACHE_TIMEOUT = int(os.getenv('PERMISSION_CACHE_TIMEOUT', '3600'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -3,6 +3,7 @@ from django.test import TestCase
 from django.urls import reverse
 
 from audit.models import Notification
+from audit.notifications import unread_count
 from noticeboard.models import Notice
 
 
@@ -18,4 +19,7 @@ class NoticeboardNotificationTests(TestCase):
 		self.assertEqual(response.status_code, 302)
 		self.assertEqual(Notice.objects.count(), 1)
 
-		self.assertEqual(Notification.objects.filter(recipient=admin).count(), 1)
+		notification = Notification.objects.get()
+		self.assertEqual(notification.audience, Notification.AUDIENCE_ADMINS)
+		self.assertEqual(unread_count(admin), 1)
+		self.assertEqual(unread_count(staff), 0)
@@ -1,7 +1,6 @@
 from datetime import date
 
 from django.http import Http404
-from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
@@ -11,7 +10,7 @@ from django.urls import reverse_lazy
 from django.views.decorators.http import require_POST
 from django.views.generic import CreateView, DeleteView, DetailView, ListView, UpdateView
 
-from audit.models import Notification
+from audit.notifications import notify_admins
 from core.permissions import HRAdminRequiredMixin
 
 from .forms import NoticeCommentForm, NoticeForm
@@ -22,30 +21,6 @@ def user_can_manage_notices(user):
 	return user.is_authenticated and (user.is_superuser or user.role in {'SUPER_ADMIN', 'HR_MANAGER'})
 
 
-def _admin_recipients():
-	User = get_user_model()
-	return list(User.objects.filter(Q(is_superuser=True) | Q(role__in={'SUPER_ADMIN', 'HR_MANAGER'})).only('id'))
-
-
-def _notify_admins(*, actor, message: str, path: str = ''):
-	admins = _admin_recipients()
-	if not admins:
-		return
-	Notification.objects.bulk_create(
-		[
-			Notification(
-				recipient=a,
-				actor=actor,
-				message=(message or '')[:255],
-				path=(path or '')[:255],
-				level=Notification.LEVEL_INFO,
-			)
-			for a in admins
-			if not actor or a.id != actor.id
-		]
-	)
-
-
 class NoticeListView(ListView):
 	model = Notice
 	template_name = 'noticeboard/notice_list.html'
@@ -97,7 +72,7 @@ class NoticeCreateView(LoginRequiredMixin, CreateView):
 		except Exception:
 			path = ''
 		try:
-			_notify_admins(actor=user, message=f'Notice posted: {self.object.title}', path=path)
+			notify_admins(actor=user, message=f'Notice posted: {self.object.title}', path=path)
 		except Exception:
 			pass
 		return response
@@ -162,7 +137,7 @@ class NoticeUpdateView(LoginRequiredMixin, HRAdminRequiredMixin, UpdateView):
 		except Exception:
 			path = ''
 		try:
-			_notify_admins(actor=user, message=f'Notice updated: {self.object.title}', path=path)
+			notify_admins(actor=user, message=f'Notice updated: {self.object.title}', path=path)
 		except Exception:
 			pass
 		return response
@@ -178,7 +153,7 @@ class NoticeDeleteView(LoginRequiredMixin, HRAdminRequiredMixin, DeleteView):
 		title = getattr(obj, 'title', '')
 		response = super().delete(request, *args, **kwargs)
 		try:
-			_notify_admins(actor=request.user, message=f'Notice deleted: {title}', path=reverse('noticeboard:list'))
+			notify_admins(actor=request.user, message=f'Notice deleted: {title}', path=reverse('noticeboard:list'))
 		except Exception:
 			pass
 		return response
@@ -4,16 +4,36 @@ from .models import (
 	EmployeePayItem,
 	PayItemType,
 	PayrollRun,
+	PayrollYearToDate,
 	Payslip,
+	PayslipLine,
 	Penalty,
 	SalaryStructure,
+	SalaryStructureVersion,
 	SalaryVoucher,
+	TaxBand,
+	TaxTable,
 )
 
 admin.site.register(SalaryStructure)
+admin.site.register(SalaryStructureVersion)
 admin.site.register(PayItemType)
 admin.site.register(EmployeePayItem)
 admin.site.register(Penalty)
 admin.site.register(PayrollRun)
+admin.site.register(PayrollYearToDate)
 admin.site.register(Payslip)
+admin.site.register(PayslipLine)
 admin.site.register(SalaryVoucher)
+
+
+class TaxBandInline(admin.TabularInline):
+	model = TaxBand
+	extra = 0
+
+
+@admin.register(TaxTable)
+class TaxTableAdmin(admin.ModelAdmin):
+	list_display = ('name', 'effective_from', 'nssf_employee_rate', 'nssf_employer_rate', 'is_active')
+	list_filter = ('is_active',)
+	inlines = [TaxBandInline]
@@ -0,0 +1,45 @@
+"""Pay item analytics over stored ``PayslipLine`` rows."""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from .models import PayslipLine
+
+
+ZERO = Decimal('0.00')
+
+
+def pay_item_totals(year, *, kind=None) -> list:
+	"""Amount paid per pay item and month of ``year``, from one GROUP BY query.
+
+	Returns rows of ``{'code', 'name', 'kind', 'months': [12 amounts], 'total', 'employees'}``
+	where ``employees`` is the most employees paid the item in any single month.
+	"""
+	lines = PayslipLine.objects.filter(payroll_run__month__year=year)
+	if kind:
+		lines = lines.filter(kind=kind)
+	grouped = (
+		lines.values('code', 'name', 'kind', 'payroll_run__month')
+		.annotate(total=Sum('amount'), employees=Count('payslip__employee_id', distinct=True))
+		.order_by('kind', 'name', 'code')
+	)
+
+	rows = {}
+	for entry in grouped:
+		key = (entry['kind'], entry['name'], entry['code'])
+		row = rows.get(key)
+		if row is None:
+			row = rows[key] = {
+				'code': entry['code'],
+				'name': entry['name'],
+				'kind': entry['kind'],
+				'months': [ZERO] * 12,
+				'total': ZERO,
+				'employees': 0,
+			}
+		row['months'][entry['payroll_run__month'].month - 1] += entry['total']
+		row['total'] += entry['total']
+		row['employees'] = max(row['employees'], entry['employees'])
+	return list(rows.values())
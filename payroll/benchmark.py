@@ -0,0 +1,250 @@
+"""Synthetic payroll data and a timing harness for the hot payroll paths.
+
+``synthesize_company`` bulk-creates a fake workforce (profiles, salary
+structures, pay items and penalties). ``run_benchmark`` times run creation
+through ``PayrollRunCreateView``, per-employee ``compute_payslip``, the bulk
+recompute, the cleared CSV export and voucher clearing, recording wall time
+and query counts. The benchmark works inside a transaction that is rolled
+back, so it can be pointed at a copy of production data.
+"""
+from __future__ import annotations
+
+import random
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from employees.models import Department, EmployeeProfile
+
+from .engine import compute_payroll_run, compute_payslip
+from .models import EmployeePayItem, PayItemType, PayrollRun, Penalty, SalaryStructure, SalaryStructureVersion
+from .structures import OPEN_START, structures_for_month
+
+
+SYNTH_PREFIX = 'synth'
+BATCH_SIZE = 1000
+DEPARTMENT_COUNT = 5
+
+_PAY_ITEM_TYPES = [
+	('overtime', 'Overtime', PayItemType.KIND_ALLOWANCE),
+	('transport', 'Transport', PayItemType.KIND_ALLOWANCE),
+	('loan', 'Loan Repayment', PayItemType.KIND_DEDUCTION),
+	('sacco', 'SACCO', PayItemType.KIND_DEDUCTION),
+]
+_PENALTY_STATUSES = [Penalty.STATUS_PENDING, Penalty.STATUS_CLEARED, Penalty.STATUS_CLEARED, Penalty.STATUS_WAIVED]
+
+
+class BenchmarkError(RuntimeError):
+	pass
+
+
+def _money(rng, low, high):
+	return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def synthesize_company(*, employees, pay_items=0, penalties=0, month=None, seed=0, prefix=SYNTH_PREFIX) -> dict:
+	"""Bulk-create ``employees`` staff with salaries, ``pay_items`` pay items and ``penalties`` penalties.
+
+	Usernames are ``<prefix>-NNNNNN`` and continue after any earlier synthetic
+	staff, so the command can be run repeatedly. Penalties apply to ``month``.
+	"""
+	User = get_user_model()
+	rng = random.Random(seed)
+	month = (month or timezone.localdate()).replace(day=1)
+	password = make_password(None)
+
+	with transaction.atomic():
+		departments = [
+			Department.objects.get_or_create(name=f'{prefix.title()} Department {index}')[0]
+			for index in range(1, DEPARTMENT_COUNT + 1)
+		]
+		item_types = [
+			PayItemType.objects.get_or_create(code=f'{prefix}-{code}', defaults={'name': f'{name} ({prefix})', 'kind': kind})[0]
+			for code, name, kind in _PAY_ITEM_TYPES
+		]
+
+		offset = User.objects.filter(username__startswith=f'{prefix}-').count()
+		usernames = [f'{prefix}-{offset + index:06d}' for index in range(1, employees + 1)]
+		User.objects.bulk_create(
+			[
+				User(username=username, first_name='Synthetic', last_name=username.rsplit('-', 1)[-1], password=password)
+				for username in usernames
+			],
+			batch_size=BATCH_SIZE,
+		)
+		ids_by_username = dict(User.objects.filter(username__startswith=f'{prefix}-').values_list('username', 'id'))
+		user_ids = [ids_by_username[username] for username in usernames]
+
+		EmployeeProfile.objects.bulk_create(
+			[
+				EmployeeProfile(
+					user_id=user_id,
+					employee_id=f'{prefix.upper()[:4]}-{username.rsplit("-", 1)[-1]}',
+					department=rng.choice(departments),
+					date_hired=date(2020, 1, 1),
+					tin=f'{rng.randrange(10 ** 9, 10 ** 10)}',
+					bank_name='Synthetic Bank',
+					bank_account_number=f'{rng.randrange(10 ** 11, 10 ** 12)}',
+				)
+				for username, user_id in zip(usernames, user_ids)
+			],
+			batch_size=BATCH_SIZE,
+		)
+		SalaryStructure.objects.bulk_create(
+			[
+				SalaryStructure(
+					employee_id=user_id,
+					basic_salary=_money(rng, 400_000, 6_000_000),
+					allowances=_money(rng, 0, 200_000) if rng.random() < 0.3 else Decimal('0.00'),
+					deductions=_money(rng, 0, 100_000) if rng.random() < 0.2 else Decimal('0.00'),
+				)
+				for user_id in user_ids
+			],
+			batch_size=BATCH_SIZE,
+		)
+		# bulk_create skips the signal that records salary versions.
+		structures = SalaryStructure.objects.filter(employee__username__startswith=f'{prefix}-', versions__isnull=True)
+		SalaryStructureVersion.objects.bulk_create(
+			[
+				SalaryStructureVersion(
+					structure=structure,
+					employee_id=structure.employee_id,
+					effective_from=OPEN_START,
+					basic_salary=structure.basic_salary,
+					allowances=structure.allowances,
+					deductions=structure.deductions,
+					currency=structure.currency,
+					is_active=structure.is_active,
+				)
+				for structure in structures
+			],
+			batch_size=BATCH_SIZE,
+		)
+
+		if user_ids:
+			EmployeePayItem.objects.bulk_create(
+				[
+					EmployeePayItem(employee_id=rng.choice(user_ids), item_type=rng.choice(item_types), amount=_money(rng, 5_000, 300_000))
+					for _index in range(pay_items)
+				],
+				batch_size=BATCH_SIZE,
+			)
+			Penalty.objects.bulk_create(
+				[
+					Penalty(
+						employee_id=rng.choice(user_ids),
+						applies_to_month=month,
+						amount=_money(rng, 1_000, 50_000),
+						reason='Synthetic penalty',
+						status=rng.choice(_PENALTY_STATUSES),
+					)
+					for _index in range(penalties)
+				],
+				batch_size=BATCH_SIZE,
+			)
+
+	return {'employees': len(user_ids), 'pay_items': pay_items if user_ids else 0, 'penalties': penalties if user_ids else 0, 'month': month.isoformat()}
+
+
+def purge_synthetic(prefix=SYNTH_PREFIX) -> int:
+	"""Delete synthetic staff (and their payroll rows), pay item types and departments."""
+	User = get_user_model()
+	with transaction.atomic():
+		users = User.objects.filter(username__startswith=f'{prefix}-')
+		count = users.count()
+		users.delete()
+		PayItemType.objects.filter(code__startswith=f'{prefix}-').delete()
+		Department.objects.filter(name__startswith=f'{prefix.title()} Department ').delete()
+	return count
+
+
+def _measure(func):
+	with CaptureQueriesContext(connection) as queries:
+		started = time.perf_counter()
+		result = func()
+		elapsed = time.perf_counter() - started
+	return result, {'seconds': round(elapsed, 4), 'queries': len(queries.captured_queries)}
+
+
+def _free_month():
+	"""The first month from now on without a payroll run."""
+	month = timezone.localdate().replace(day=1)
+	taken = set(PayrollRun.objects.filter(month__gte=month).values_list('month', flat=True))
+	while month in taken:
+		month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+	return month
+
+
+def _benchmark_steps(*, month, sample, seed):
+	User = get_user_model()
+	steps = {}
+	admin, _created = User.objects.update_or_create(username=f'{SYNTH_PREFIX}-benchmark-admin', defaults={'role': User.ROLE_HR_MANAGER})
+	client = Client()
+	client.force_login(admin)
+
+	response, steps['create_run_view'] = _measure(
+		lambda: client.post(reverse('payroll:create'), {'month': month.isoformat()}, secure=True)
+	)
+	if response.status_code != 302:
+		raise BenchmarkError(f'PayrollRunCreateView returned {response.status_code}.')
+	run = PayrollRun.objects.get(month=month)
+	steps['create_run_view']['payslips'] = run.payslips.count()
+
+	employee_ids = list(structures_for_month(month).values_list('employee_id', flat=True))
+	sampled = random.Random(seed).sample(employee_ids, min(sample, len(employee_ids)))
+	sampled_users = list(User.objects.filter(pk__in=sampled))
+	_result, steps['compute_payslip'] = _measure(lambda: [compute_payslip(run, user, created_by=admin) for user in sampled_users])
+	steps['compute_payslip']['employees'] = len(sampled_users)
+	if sampled_users:
+		steps['compute_payslip']['ms_per_employee'] = round(steps['compute_payslip']['seconds'] * 1000 / len(sampled_users), 3)
+
+	payslips, steps['compute_payroll_run'] = _measure(lambda: compute_payroll_run(run, created_by=admin))
+	steps['compute_payroll_run']['payslips'] = len(payslips)
+
+	body, steps['export_cleared_csv'] = _measure(
+		lambda: b''.join(client.get(reverse('payroll:export_cleared_csv', args=[run.pk]), secure=True).streaming_content)
+	)
+	steps['export_cleared_csv']['bytes'] = len(body)
+
+	response, steps['clear_vouchers_view'] = _measure(
+		lambda: client.post(reverse('payroll:clear_vouchers', args=[run.pk]), secure=True)
+	)
+	if response.status_code != 302:
+		raise BenchmarkError(f'PayrollRunClearVouchersView returned {response.status_code}.')
+	return steps
+
+
+def run_benchmark(*, employees=0, pay_items=0, penalties=0, month=None, sample=50, seed=0, keep=False) -> dict:
+	"""Time the hot payroll paths and return a JSON-serializable report.
+
+	Synthetic staff are generated first when ``employees`` is set. Everything
+	is rolled back afterwards unless ``keep`` is true.
+	"""
+	report = {
+		'database': connection.vendor,
+		'started_at': timezone.now().isoformat(),
+	}
+	with transaction.atomic():
+		month = (month or _free_month()).replace(day=1)
+		if PayrollRun.objects.filter(month=month).exists():
+			raise BenchmarkError(f'A payroll run for {month:%Y-%m} already exists; pick another --month.')
+		if employees:
+			report['synthetic'], report['synthesize'] = _measure(
+				lambda: synthesize_company(employees=employees, pay_items=pay_items, penalties=penalties, month=month, seed=seed)
+			)
+		report['month'] = month.isoformat()
+		report['active_structures'] = structures_for_month(month).count()
+		with override_settings(PAYROLL_BACKGROUND_JOBS=False, ALLOWED_HOSTS=['testserver']):
+			report['steps'] = _benchmark_steps(month=month, sample=sample, seed=seed)
+		if not keep:
+			transaction.set_rollback(True)
+	report['kept'] = keep
+	return report
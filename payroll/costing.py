@@ -0,0 +1,99 @@
+"""Cost-centre roll-up of a payroll run over the department hierarchy.
+
+Subtree membership comes from ``employees.DepartmentClosure``, so the whole
+report is a handful of grouped queries regardless of how deep the tree is.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+
+from employees.models import Department, DepartmentClosure
+
+from .models import Payslip
+
+
+ZERO = Decimal('0.00')
+HUNDRED = Decimal('100')
+
+_SUMS = {
+	'gross': Sum('gross_pay'),
+	'net': Sum('net_pay'),
+	'tax': Sum('tax_amount'),
+	'nssf_employer': Sum('nssf_employer'),
+}
+
+
+def _figures(row=None):
+	row = row or {}
+	figures = {
+		'headcount': row.get('headcount') or 0,
+		'gross': row.get('gross') or ZERO,
+		'net': row.get('net') or ZERO,
+		'tax': row.get('tax') or ZERO,
+		'nssf_employer': row.get('nssf_employer') or ZERO,
+	}
+	figures['employer_cost'] = figures['gross'] + figures['nssf_employer']
+	return figures
+
+
+def department_cost_rollup(run) -> dict:
+	"""Gross/net/tax per department, both for its own staff and its whole subtree.
+
+	Returns ``{'departments': [...], 'unassigned': {...}, 'totals': {...}}`` with
+	departments in tree order and each subtree's employer cost compared against
+	the department's ``budget_allocation``.
+	"""
+	payslips = Payslip.objects.filter(payroll_run=run)
+	department_field = 'employee__employee_profile__department_id'
+
+	subtree = {
+		row['department_id']: _figures(row)
+		for row in (
+			payslips.filter(employee__employee_profile__department__isnull=False)
+			.values(department_id=F('employee__employee_profile__department__ancestor_links__ancestor_id'))
+			.annotate(headcount=Count('id'), **_SUMS)
+			.order_by()
+		)
+	}
+	own = {
+		row[department_field]: _figures(row)
+		for row in payslips.values(department_field).annotate(headcount=Count('id'), **_SUMS).order_by()
+	}
+
+	# Tree order and indentation from the closure rows: each department's path of ancestor names.
+	departments = {department.pk: department for department in Department.objects.all()}
+	paths = {department_id: [] for department_id in departments}
+	for ancestor_id, descendant_id, depth in DepartmentClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'):
+		if descendant_id in paths and ancestor_id in departments:
+			paths[descendant_id].append((depth, departments[ancestor_id].name.lower(), ancestor_id))
+
+	rows = []
+	for department_id, department in departments.items():
+		path = sorted(paths[department_id], reverse=True) or [(0, department.name.lower(), department_id)]
+		figures = subtree.get(department_id) or _figures()
+		budget = department.budget_allocation or ZERO
+		rows.append({
+			'sort_key': [(name, pk) for _depth, name, pk in path],
+			'department': department,
+			'level': len(path) - 1,
+			'budget': budget,
+			'subtree': figures,
+			'own': own.get(department_id) or _figures(),
+			'variance': budget - figures['employer_cost'],
+			'utilisation': (figures['employer_cost'] * HUNDRED / budget).quantize(Decimal('0.1')) if budget else None,
+		})
+	rows.sort(key=lambda row: row['sort_key'])
+	for row in rows:
+		del row['sort_key']
+
+	totals = _figures()
+	for figures in own.values():
+		for field in totals:
+			totals[field] += figures[field]
+	return {
+		'departments': rows,
+		'unassigned': own.get(None) or _figures(),
+		'totals': totals,
+	}
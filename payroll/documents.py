@@ -0,0 +1,266 @@
+"""Payslip PDF generation, storage and bulk download."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from core.models import BrandingSettings
+
+from .models import Payslip
+from .pdf import render_annual_summary_pdf, render_payslip_pdf
+from .snapshots import payslip_rows
+from .year_to_date import TOTAL_FIELDS, annual_summary_rows
+
+
+# Bump when the PDF layout changes so every payslip re-renders once.
+RENDERER_VERSION = 2
+STORE_BATCH_SIZE = 100
+
+_SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def _safe_name(value: str) -> str:
+	return _SAFE_NAME_RE.sub('_', value or '').strip('_') or 'payslip'
+
+
+def _worker_count(requested, jobs: int) -> int:
+	if requested is None:
+		requested = getattr(settings, 'PAYROLL_PDF_WORKERS', None)
+	if requested is None:
+		requested = min(4, os.cpu_count() or 1)
+	return max(1, min(int(requested), jobs))
+
+
+def _company_payload():
+	branding = BrandingSettings.get_solo()
+	return {
+		'name': branding.app_name,
+		'address': branding.company_address,
+		'phone': branding.company_phone,
+		'email': branding.company_email,
+	}
+
+
+def payslip_payload(row, *, company: dict, period: str) -> dict:
+	"""Plain, picklable description of everything printed on a payslip.
+
+	``row`` is a payslip row from ``payroll.snapshots.payslip_rows``, so locked
+	runs print their frozen data.
+	"""
+	return {
+		'renderer_version': RENDERER_VERSION,
+		'company': company,
+		'period': period,
+		'currency': row['currency'],
+		'voucher_number': row['voucher_number'],
+		'employee': {
+			'name': row['name'],
+			'employee_id': row['employee_code'],
+			'department': row['department'],
+			'position': row['position'],
+			'bank_name': row['bank_name'],
+			'bank_account_number': row['bank_account_number'],
+		},
+		'figures': {
+			'basic_salary': str(row['basic_salary']),
+			'allowance_total': str(row['allowance_total']),
+			'deduction_total': str(row['deduction_total']),
+			'penalty_total': str(row['penalty_total']),
+			'gross_pay': str(row['gross_pay']),
+			'tax_amount': str(row['tax_amount']),
+			'nssf_employee': str(row['nssf_employee']),
+			'net_pay': str(row['net_pay']),
+		},
+		'lines': [{'name': name, 'kind': kind, 'amount': str(amount)} for _code, name, kind, amount in row['items']],
+	}
+
+
+def archive_name(row) -> str:
+	return _safe_name(f"{row['employee_code'] or row['username']}_{row['name']}") + '.pdf'
+
+
+def payload_hash(payload: dict) -> str:
+	encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+	return hashlib.sha256(encoded).hexdigest()
+
+
+def _store(payslip, row, pdf_bytes: bytes, digest: str, month):
+	old_name = payslip.pdf_file.name if payslip.pdf_file else ''
+	filename = f"{month:%Y_%m}/{_safe_name(row['employee_code'] or row['username'])}_{digest[:12]}.pdf"
+	payslip.pdf_file.save(filename, ContentFile(pdf_bytes), save=False)
+	payslip.pdf_hash = digest
+	if old_name and old_name != payslip.pdf_file.name:
+		payslip.pdf_file.storage.delete(old_name)
+
+
+def render_payroll_run_pdfs(run, *, payslip_ids=None, workers=None, force=False, progress=None) -> dict:
+	"""Render payslip PDFs for ``run`` into ``Payslip.pdf_file``.
+
+	Payslips whose content hash matches the stored ``pdf_hash`` are skipped unless
+	``force`` is set. Rendering fans out over a process pool when more than one
+	worker is configured (``PAYROLL_PDF_WORKERS``). ``progress(done, total)`` is
+	called as payslips are stored.
+	"""
+	company = _company_payload()
+	period = f"{run.month:%B %Y}"
+	rows = payslip_rows(run, payslip_ids=payslip_ids)
+	stored = Payslip.objects.filter(payroll_run=run).only('id', 'pdf_file', 'pdf_hash').in_bulk([row['payslip_id'] for row in rows])
+	total = len(rows)
+
+	pending = []
+	skipped = 0
+	for row in rows:
+		payslip = stored.get(row['payslip_id'])
+		if payslip is None:
+			total -= 1
+			continue
+		payload = payslip_payload(row, company=company, period=period)
+		digest = payload_hash(payload)
+		if not force and payslip.pdf_file and payslip.pdf_hash == digest:
+			skipped += 1
+			continue
+		pending.append((payslip, row, payload, digest))
+
+	done = skipped
+	if progress:
+		progress(done, total)
+
+	worker_count = _worker_count(workers, len(pending))
+	payloads = [payload for _payslip, _row, payload, _digest in pending]
+	executor = ProcessPoolExecutor(max_workers=worker_count) if worker_count > 1 and pending else None
+	try:
+		if executor is not None:
+			results = executor.map(render_payslip_pdf, payloads, chunksize=max(1, len(payloads) // (worker_count * 4)))
+		else:
+			results = map(render_payslip_pdf, payloads)
+
+		batch = []
+		for (payslip, row, _payload, digest), pdf_bytes in zip(pending, results):
+			_store(payslip, row, pdf_bytes, digest, run.month)
+			batch.append(payslip)
+			done += 1
+			if len(batch) >= STORE_BATCH_SIZE:
+				Payslip.objects.bulk_update(batch, ['pdf_file', 'pdf_hash'])
+				batch = []
+				if progress:
+					progress(done, total)
+		if batch:
+			Payslip.objects.bulk_update(batch, ['pdf_file', 'pdf_hash'])
+	finally:
+		if executor is not None:
+			executor.shutdown()
+
+	if progress:
+		progress(done, total)
+	return {'total': total, 'rendered': len(pending), 'skipped': skipped}
+
+
+class _ZipStream:
+	"""Write-only, non-seekable sink that hands ``zipfile`` output back in chunks."""
+
+	def __init__(self):
+		self._chunks = []
+		self._position = 0
+
+	def write(self, data):
+		self._chunks.append(bytes(data))
+		self._position += len(data)
+		return len(data)
+
+	def tell(self):
+		return self._position
+
+	def flush(self):
+		pass
+
+	def drain(self) -> bytes:
+		data = b''.join(self._chunks)
+		self._chunks = []
+		return data
+
+
+def iter_payslip_zip(entries, *, chunk_size=64 * 1024):
+	"""Yield a ZIP archive of ``(name, pdf_file)`` entries without buffering it in memory.
+
+	``pdf_file`` is a stored file, or the PDF bytes themselves.
+	"""
+	stream = _ZipStream()
+	used_names = set()
+	with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_STORED) as archive:
+		for name, pdf_file in entries:
+			if not pdf_file:
+				continue
+			if name in used_names:
+				name = f"{len(used_names)}_{name}"
+			used_names.add(name)
+			if isinstance(pdf_file, bytes):
+				with archive.open(name, mode='w', force_zip64=True) as target:
+					target.write(pdf_file)
+				yield stream.drain()
+				continue
+			with pdf_file.open('rb') as source, archive.open(name, mode='w', force_zip64=True) as target:
+				for chunk in iter(lambda: source.read(chunk_size), b''):
+					target.write(chunk)
+					data = stream.drain()
+					if data:
+						yield data
+			data = stream.drain()
+			if data:
+				yield data
+	yield stream.drain()
+
+
+def payslip_zip_entries(run):
+	"""``(archive name, pdf_file)`` for every stored payslip PDF in ``run``."""
+	files = {
+		payslip.pk: payslip.pdf_file
+		for payslip in Payslip.objects.filter(payroll_run=run).exclude(pdf_file='').exclude(pdf_file__isnull=True).only('id', 'pdf_file')
+	}
+	return [(archive_name(row), files[row['payslip_id']]) for row in payslip_rows(run, with_items=False) if row['payslip_id'] in files]
+
+
+def annual_summary_payloads(year, *, batch_size=None):
+	"""Yield one picklable payload per batch of employees' year-to-date totals."""
+	if batch_size is None:
+		batch_size = getattr(settings, 'PAYROLL_ANNUAL_SUMMARY_BATCH_SIZE', 250)
+	company = _company_payload()
+	employees = []
+	for name, employee_code, tin, nssf_number, payslip_count, *totals in annual_summary_rows(year):
+		employees.append({
+			'name': name,
+			'employee_id': employee_code,
+			'tin': tin,
+			'nssf_number': nssf_number,
+			'payslip_count': payslip_count,
+			'figures': {field: str(value) for field, value in zip(TOTAL_FIELDS, totals)},
+		})
+		if len(employees) >= batch_size:
+			yield {'company': company, 'year': year, 'employees': employees}
+			employees = []
+	if employees:
+		yield {'company': company, 'year': year, 'employees': employees}
+
+
+def render_annual_summary_pdfs(year, *, batch_size=None, workers=None):
+	"""Yield ``(archive name, pdf bytes)`` per batch of annual summaries.
+
+	Batches render over a process pool when more than one worker is configured
+	(``PAYROLL_PDF_WORKERS``), the same as payslip PDFs.
+	"""
+	payloads = list(annual_summary_payloads(year, batch_size=batch_size))
+	worker_count = _worker_count(workers, len(payloads))
+	executor = ProcessPoolExecutor(max_workers=worker_count) if worker_count > 1 else None
+	try:
+		results = executor.map(render_annual_summary_pdf, payloads) if executor is not None else map(render_annual_summary_pdf, payloads)
+		for index, pdf_bytes in enumerate(results, start=1):
+			yield f"annual_summary_{year}_{index:03d}.pdf", pdf_bytes
+	finally:
+		if executor is not None:
+			executor.shutdown()
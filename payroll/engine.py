@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import EmployeePayItem, PayItemType, PayrollRun, Payslip, PayslipLine, Penalty, SalaryVoucher
+from .structures import structure_as_of, structures_for_month
+from .tax import FLAT_TAX_TABLE, tax_table_for
+from .year_to_date import refresh_run_year_to_date
+
+
+ZERO = Decimal('0.00')
+BULK_BATCH_SIZE = 500
+
+LEGACY_ALLOWANCE_NAME = 'Allowances (salary structure)'
+LEGACY_DEDUCTION_NAME = 'Deductions (salary structure)'
+
+PAYSLIP_FIELDS = [
+	'basic_salary',
+	'allowance_total',
+	'deduction_total',
+	'penalty_total',
+	'gross_pay',
+	'tax_amount',
+	'nssf_employee',
+	'nssf_employer',
+	'net_pay',
+	'is_held',
+]
+
+
+def _month_bounds(month_start):
+	month_start = month_start.replace(day=1)
+	if month_start.month == 12:
+		next_month = month_start.replace(year=month_start.year + 1, month=1, day=1)
+	else:
+		next_month = month_start.replace(month=month_start.month + 1, day=1)
+	month_end = next_month - timedelta(days=1)
+	return month_start, month_end
+
+
+def _employee_identifier(user):
+	try:
+		profile = user.employee_profile
+		if profile.employee_id:
+			return profile.employee_id
+	except Exception:
+		pass
+	return user.username
+
+
+def _voucher_number(run, employee):
+	return f"SV-{run.month:%Y%m}-{_employee_identifier(employee)}"
+
+
+@dataclass
+class PayslipInputs:
+	"""Everything needed to price one employee's payslip for a month."""
+	employee: object
+	basic_salary: Decimal
+	legacy_allowances: Decimal
+	legacy_deductions: Decimal
+	allowance_total: Decimal = ZERO
+	deduction_total: Decimal = ZERO
+	penalty_total: Decimal = ZERO
+	penalties_pending: bool = False
+	# (item_type_id, code, name, kind, amount) for each pay item applied.
+	items: list = field(default_factory=list)
+
+	def add_item(self, item_type_id, code, name, kind, amount):
+		if kind == PayItemType.KIND_ALLOWANCE:
+			self.allowance_total += amount
+		else:
+			self.deduction_total += amount
+		self.items.append((item_type_id, code, name, kind, amount))
+
+	def lines(self):
+		"""Line items for the payslip: structure allowance/deduction first, then pay items."""
+		lines = []
+		if self.legacy_allowances:
+			lines.append((None, '', LEGACY_ALLOWANCE_NAME, PayItemType.KIND_ALLOWANCE, self.legacy_allowances))
+		if self.legacy_deductions:
+			lines.append((None, '', LEGACY_DEDUCTION_NAME, PayItemType.KIND_DEDUCTION, self.legacy_deductions))
+		return lines + self.items
+
+
+def calculate_payslips(rows, tax_table=FLAT_TAX_TABLE) -> list:
+	"""Pure payslip arithmetic for many ``PayslipInputs`` at once.
+
+	PAYE and NSSF are evaluated through ``tax_table`` in one pass over the
+	batch, so the bulk path, the per-employee path and what-if tools share it.
+	"""
+	rows = list(rows)
+	grosses = []
+	deductions = []
+	for inputs in rows:
+		grosses.append(inputs.basic_salary + inputs.legacy_allowances + inputs.allowance_total)
+		deductions.append(inputs.legacy_deductions + inputs.deduction_total + inputs.penalty_total)
+	taxes = tax_table.paye_many([max(gross - deducted, ZERO) for gross, deducted in zip(grosses, deductions)])
+	contributions = tax_table.nssf_many(grosses)
+
+	results = []
+	for inputs, gross, deducted, tax, (nssf_employee, nssf_employer) in zip(rows, grosses, deductions, taxes, contributions):
+		results.append({
+			'basic_salary': inputs.basic_salary,
+			'allowance_total': inputs.legacy_allowances + inputs.allowance_total,
+			'deduction_total': inputs.legacy_deductions + inputs.deduction_total,
+			'penalty_total': inputs.penalty_total,
+			'gross_pay': gross,
+			'tax_amount': tax,
+			'nssf_employee': nssf_employee,
+			'nssf_employer': nssf_employer,
+			'net_pay': gross - deducted - tax - nssf_employee,
+			'is_held': inputs.penalties_pending,
+		})
+	return results
+
+
+def calculate_payslip(inputs: PayslipInputs, tax_table=FLAT_TAX_TABLE) -> dict:
+	return calculate_payslips([inputs], tax_table)[0]
+
+
+def _payslip_lines(payslip, inputs):
+	return [
+		PayslipLine(
+			payslip_id=payslip.pk,
+			payroll_run_id=payslip.payroll_run_id,
+			item_type_id=item_type_id,
+			code=code,
+			name=name,
+			kind=kind,
+			amount=amount,
+		)
+		for item_type_id, code, name, kind, amount in inputs.lines()
+	]
+
+
+def _apply_voucher_status(voucher, *, is_held, created_by, now):
+	voucher.status = SalaryVoucher.STATUS_ON_HOLD if is_held else SalaryVoucher.STATUS_CLEARED
+	if voucher.status == SalaryVoucher.STATUS_CLEARED and not voucher.cleared_at:
+		voucher.cleared_by = created_by
+		voucher.cleared_at = now
+	if voucher.status == SalaryVoucher.STATUS_ON_HOLD:
+		voucher.cleared_by = None
+		voucher.cleared_at = None
+
+
+def compute_payslip(run, employee, *, created_by=None, tax_table=None):
+	month_start, month_end = _month_bounds(run.month)
+
+	structure = structure_as_of(employee.pk, month_end)
+	if not structure or not structure.is_active:
+		return None
+
+	items = EmployeePayItem.objects.select_related('item_type').filter(employee=employee, is_active=True, item_type__is_active=True)
+	items = items.filter(
+		models.Q(start_date__isnull=True) | models.Q(start_date__lte=month_end),
+		models.Q(end_date__isnull=True) | models.Q(end_date__gte=month_start),
+	).order_by('item_type__kind', 'item_type__name', 'id')
+
+	inputs = PayslipInputs(
+		employee=employee,
+		basic_salary=structure.basic_salary,
+		legacy_allowances=structure.allowances,
+		legacy_deductions=structure.deductions,
+	)
+	for item in items:
+		inputs.add_item(item.item_type_id, item.item_type.code, item.item_type.name, item.item_type.kind, item.amount)
+
+	penalties = Penalty.objects.filter(employee=employee, applies_to_month=run.month)
+	inputs.penalty_total = penalties.filter(status=Penalty.STATUS_CLEARED).aggregate(models.Sum('amount')).get('amount__sum') or ZERO
+	inputs.penalties_pending = penalties.filter(status=Penalty.STATUS_PENDING).exists()
+
+	payslip, _created = Payslip.objects.update_or_create(
+		payroll_run=run,
+		employee=employee,
+		defaults=calculate_payslip(inputs, tax_table or tax_table_for(run.month)),
+	)
+	PayslipLine.objects.filter(payslip=payslip).delete()
+	PayslipLine.objects.bulk_create(_payslip_lines(payslip, inputs))
+
+	voucher_defaults = {
+		'voucher_number': _voucher_number(run, employee),
+		'status': SalaryVoucher.STATUS_ON_HOLD if payslip.is_held else SalaryVoucher.STATUS_CLEARED,
+	}
+	voucher, _voucher_created = SalaryVoucher.objects.update_or_create(payslip=payslip, defaults=voucher_defaults)
+	if voucher.status == SalaryVoucher.STATUS_CLEARED and not voucher.cleared_at:
+		voucher.cleared_by = created_by
+		voucher.cleared_at = timezone.now()
+		voucher.save(update_fields=['cleared_by', 'cleared_at'])
+	if voucher.status == SalaryVoucher.STATUS_ON_HOLD:
+		SalaryVoucher.objects.filter(pk=voucher.pk).update(cleared_by=None, cleared_at=None)
+
+	return payslip
+
+
+def pay_items_for_month(month):
+	"""Active pay items that apply to ``month`` for employees with an active salary that month."""
+	month_start, month_end = _month_bounds(month)
+	return EmployeePayItem.objects.filter(
+		models.Q(start_date__isnull=True) | models.Q(start_date__lte=month_end),
+		models.Q(end_date__isnull=True) | models.Q(end_date__gte=month_start),
+		is_active=True,
+		item_type__is_active=True,
+		employee_id__in=structures_for_month(month).values('employee_id'),
+	)
+
+
+def load_payslip_inputs(month, *, employee_ids=None) -> dict:
+	"""Load payroll inputs for every salary in force that month in three queries.
+
+	Returns ``{employee_id: PayslipInputs}``. ``employee_ids`` narrows the load to
+	a subset of employees (e.g. a recompute of a few rows).
+	"""
+	month = month.replace(day=1)
+
+	structures = structures_for_month(month).select_related('employee', 'employee__employee_profile')
+	items = pay_items_for_month(month)
+	penalties = Penalty.objects.filter(applies_to_month=month, status__in={Penalty.STATUS_CLEARED, Penalty.STATUS_PENDING})
+	if employee_ids is not None:
+		employee_ids = list(employee_ids)
+		structures = structures.filter(employee_id__in=employee_ids)
+		items = items.filter(employee_id__in=employee_ids)
+		penalties = penalties.filter(employee_id__in=employee_ids)
+
+	inputs = {
+		structure.employee_id: PayslipInputs(
+			employee=structure.employee,
+			basic_salary=structure.basic_salary,
+			legacy_allowances=structure.allowances,
+			legacy_deductions=structure.deductions,
+		)
+		for structure in structures
+	}
+
+	items = items.order_by('employee_id', 'item_type__kind', 'item_type__name', 'id').values_list(
+		'employee_id', 'item_type_id', 'item_type__code', 'item_type__name', 'item_type__kind', 'amount',
+	)
+	for employee_id, item_type_id, code, name, kind, amount in items:
+		row = inputs.get(employee_id)
+		if row is None:
+			continue
+		row.add_item(item_type_id, code, name, kind, amount)
+
+	for employee_id, status, amount in penalties.values_list('employee_id', 'status', 'amount'):
+		row = inputs.get(employee_id)
+		if row is None:
+			continue
+		if status == Penalty.STATUS_CLEARED:
+			row.penalty_total += amount
+		else:
+			row.penalties_pending = True
+
+	return inputs
+
+
+def compute_payroll_run(run, *, created_by=None, employee_ids=None) -> list:
+	"""Set-based equivalent of calling ``compute_payslip`` for every salary in force that month.
+
+	Loads all inputs up front, prices every payslip in memory and writes the
+	payslips, their line items and salary vouchers with ``bulk_create``/
+	``bulk_update``. Produces the same rows as the per-employee path.
+
+	Payslips of employees (within ``employee_ids``, if given) who no longer
+	have a salary in force that month, because their structure was deleted,
+	deactivated or moved, are deleted along with their voucher and lines.
+	"""
+	inputs = load_payslip_inputs(run.month, employee_ids=employee_ids)
+	stale = Payslip.objects.filter(payroll_run=run).exclude(employee_id__in=list(inputs))
+	if employee_ids is not None:
+		stale = stale.filter(employee_id__in=list(employee_ids))
+	# Deleting row by row fires the Payslip signals, which bump the run
+	# revision and refresh year-to-date totals.
+	stale.delete()
+	if not inputs:
+		return []
+	figures_by_employee = dict(zip(inputs, calculate_payslips(inputs.values(), tax_table_for(run.month))))
+
+	existing_qs = Payslip.objects.filter(payroll_run=run)
+	if employee_ids is not None:
+		existing_qs = existing_qs.filter(employee_id__in=list(inputs))
+	existing = {payslip.employee_id: payslip for payslip in existing_qs}
+
+	to_create = []
+	to_update = []
+	for employee_id, figures in figures_by_employee.items():
+		payslip = existing.get(employee_id)
+		if payslip is None:
+			to_create.append(Payslip(payroll_run=run, employee_id=employee_id, **figures))
+			continue
+		for field, value in figures.items():
+			setattr(payslip, field, value)
+		to_update.append(payslip)
+
+	with transaction.atomic():
+		Payslip.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+		if any(payslip.pk is None for payslip in to_create):
+			# Backends that do not return primary keys from bulk inserts.
+			created_ids = dict(
+				Payslip.objects.filter(payroll_run=run, employee_id__in=[p.employee_id for p in to_create]).values_list('employee_id', 'id')
+			)
+			for payslip in to_create:
+				payslip.pk = created_ids[payslip.employee_id]
+		Payslip.objects.bulk_update(to_update, PAYSLIP_FIELDS, batch_size=BULK_BATCH_SIZE)
+
+		payslips = to_create + to_update
+		vouchers_qs = SalaryVoucher.objects.filter(payslip__payroll_run=run)
+		if employee_ids is not None:
+			vouchers_qs = vouchers_qs.filter(payslip_id__in=[p.pk for p in payslips])
+		vouchers = {voucher.payslip_id: voucher for voucher in vouchers_qs}
+
+		now = timezone.now()
+		new_vouchers = []
+		changed_vouchers = []
+		for payslip in payslips:
+			voucher = vouchers.get(payslip.pk)
+			if voucher is None:
+				voucher = SalaryVoucher(payslip=payslip)
+				new_vouchers.append(voucher)
+			else:
+				changed_vouchers.append(voucher)
+			voucher.voucher_number = _voucher_number(run, inputs[payslip.employee_id].employee)
+			_apply_voucher_status(voucher, is_held=payslip.is_held, created_by=created_by, now=now)
+
+		SalaryVoucher.objects.bulk_create(new_vouchers, batch_size=BULK_BATCH_SIZE)
+		SalaryVoucher.objects.bulk_update(
+			changed_vouchers,
+			['voucher_number', 'status', 'cleared_by', 'cleared_at'],
+			batch_size=BULK_BATCH_SIZE,
+		)
+		payslip_ids = [payslip.pk for payslip in payslips]
+		for start in range(0, len(payslip_ids), BULK_BATCH_SIZE):
+			PayslipLine.objects.filter(payslip_id__in=payslip_ids[start:start + BULK_BATCH_SIZE]).delete()
+		PayslipLine.objects.bulk_create(
+			[line for payslip in payslips for line in _payslip_lines(payslip, inputs[payslip.employee_id])],
+			batch_size=BULK_BATCH_SIZE,
+		)
+
+		# Bulk writes skip the Payslip signals, so bump the run revision and year-to-date totals here.
+		PayrollRun.bump_revision(run.pk)
+		refresh_run_year_to_date(run, None if employee_ids is None else [payslip.employee_id for payslip in payslips])
+
+	return payslips
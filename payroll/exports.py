@@ -0,0 +1,140 @@
+"""Streaming bank-transfer exports for cleared payslips.
+
+Rows come from one joined ``values_list`` query (payslip, voucher, employee and
+employee profile) read with ``.iterator()``, and each format writes straight to
+the response generator, so memory stays flat regardless of headcount.
+"""
+from __future__ import annotations
+
+import csv
+
+from .models import Payslip, SalaryVoucher
+from .snapshots import decode_rows, get_snapshot
+
+
+EXPORT_CHUNK_SIZE = 2000
+# Encoded rows are grouped into a single chunk to avoid one write per line.
+ROWS_PER_CHUNK = 500
+
+HEADER = ['Employee', 'Employee ID', 'Bank Name', 'Account Number', 'Branch', 'Net Pay', 'Voucher Number']
+
+# (width, right-aligned) per column of the fixed-width bank file.
+FIXED_WIDTH_LAYOUT = [
+	(40, False),
+	(20, False),
+	(30, False),
+	(34, False),
+	(30, False),
+	(18, True),
+	(32, False),
+]
+
+_ROW_FIELDS = (
+	'employee__first_name',
+	'employee__last_name',
+	'employee__username',
+	'employee__employee_profile__employee_id',
+	'employee__employee_profile__bank_name',
+	'employee__employee_profile__bank_account_number',
+	'employee__employee_profile__bank_branch',
+	'net_pay',
+	'salary_voucher__voucher_number',
+)
+
+
+class _Echo:
+	"""File-like object whose ``write`` hands the value back to the caller."""
+
+	def write(self, value):
+		return value
+
+
+def cleared_payslip_rows(run, *, chunk_size=EXPORT_CHUNK_SIZE):
+	"""Yield one export row (matching ``HEADER``) per cleared payslip in ``run``.
+
+	Locked runs are exported from their frozen snapshot rather than live data.
+	"""
+	snapshot = get_snapshot(run)
+	if snapshot is not None:
+		for row in decode_rows(snapshot.data):
+			if row['voucher_status'] == SalaryVoucher.STATUS_CLEARED:
+				yield [
+					row['name'],
+					row['employee_code'],
+					row['bank_name'],
+					row['bank_account_number'],
+					row['bank_branch'],
+					str(row['net_pay']),
+					row['voucher_number'],
+				]
+		return
+
+	rows = (
+		Payslip.objects.filter(payroll_run=run, salary_voucher__status=SalaryVoucher.STATUS_CLEARED)
+		.order_by('employee__username')
+		.values_list(*_ROW_FIELDS)
+		.iterator(chunk_size=chunk_size)
+	)
+	for first_name, last_name, username, employee_id, bank_name, account_number, branch, net_pay, voucher_number in rows:
+		name = f'{first_name} {last_name}'.strip() or username
+		yield [
+			name,
+			employee_id or '',
+			bank_name or '',
+			account_number or '',
+			branch or '',
+			str(net_pay),
+			voucher_number or '',
+		]
+
+
+def _chunked(lines):
+	buffer = []
+	for line in lines:
+		buffer.append(line)
+		if len(buffer) >= ROWS_PER_CHUNK:
+			yield ''.join(buffer)
+			buffer = []
+	if buffer:
+		yield ''.join(buffer)
+
+
+def _delimited(rows, *, dialect, header):
+	writer = csv.writer(_Echo(), dialect=dialect)
+	yield writer.writerow(header)
+	for row in rows:
+		yield writer.writerow(row)
+
+
+def _fixed_width_line(values):
+	cells = []
+	for value, (width, right) in zip(values, FIXED_WIDTH_LAYOUT):
+		text = ' '.join(str(value).split())[:width]
+		cells.append(text.rjust(width) if right else text.ljust(width))
+	return ''.join(cells) + '\r\n'
+
+
+def _fixed_width(rows):
+	yield _fixed_width_line(HEADER)
+	for row in rows:
+		yield _fixed_width_line(row)
+
+
+def stream_csv(rows, header=HEADER):
+	return _chunked(_delimited(rows, dialect=csv.excel, header=header))
+
+
+def stream_tsv(rows, header=HEADER):
+	return _chunked(_delimited(rows, dialect=csv.excel_tab, header=header))
+
+
+def stream_fixed_width(rows):
+	return _chunked(_fixed_width(rows))
+
+
+# format -> (streamer, content type, file extension)
+EXPORT_FORMATS = {
+	'csv': (stream_csv, 'text/csv', 'csv'),
+	'tsv': (stream_tsv, 'text/tab-separated-values', 'tsv'),
+	'fixed': (stream_fixed_width, 'text/plain', 'txt'),
+}
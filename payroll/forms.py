@@ -49,3 +49,14 @@ class PenaltyForm(forms.ModelForm):
             'incident_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'applies_to_month': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
         }
+
+
+class CsvImportForm(forms.Form):
+    file = forms.FileField(help_text='UTF-8 CSV with a header row.')
+    dry_run = forms.BooleanField(required=False, label='Validate only', help_text='Check every row without saving anything.')
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Upload a .csv file.')
+        return upload
@@ -0,0 +1,249 @@
+"""Bulk CSV import of employee pay items and penalties.
+
+The file is read as a stream of rows. Employees are resolved by
+``EmployeeProfile.employee_id`` through one prebuilt dict, and every row is
+validated before anything is written. When the whole file is clean the
+objects are inserted with chunked ``bulk_create`` in one transaction.
+``bulk_create`` skips the model signals, so affected employees are marked
+dirty in the matching unlocked runs here.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from employees.models import EmployeeProfile
+
+from .models import EmployeePayItem, PayItemType, PayrollDirtyEmployee, Penalty
+from .tracking import affected_runs, mark_employees_dirty
+
+
+IMPORT_BATCH_SIZE = 1000
+# Largest amount that fits the 12-digit, 2-decimal money columns.
+MAX_AMOUNT = Decimal('9999999999.99')
+
+PAY_ITEM_COLUMNS = ('employee_id', 'item_code', 'amount')
+PAY_ITEM_OPTIONAL_COLUMNS = ('start_date', 'end_date', 'is_recurring')
+PENALTY_COLUMNS = ('employee_id', 'month', 'amount', 'reason')
+PENALTY_OPTIONAL_COLUMNS = ('status', 'incident_date', 'clearance_notes')
+
+_TRUE = {'1', 'true', 'yes', 'y'}
+_FALSE = {'0', 'false', 'no', 'n'}
+
+
+class RowError(ValueError):
+	pass
+
+
+class ImportFileError(ValueError):
+	"""The upload as a whole cannot be read (wrong encoding, malformed CSV)."""
+
+
+@dataclass
+class ImportResult:
+	rows: int = 0
+	created: int = 0
+	# (line number, message); line 1 is the header.
+	errors: list = field(default_factory=list)
+
+	@property
+	def ok(self):
+		return not self.errors
+
+
+def _rows(file):
+	"""Yield ``(line number, {column: value})`` from an uploaded CSV without loading it whole."""
+	lines = codecs.iterdecode(file, 'utf-8-sig')
+	reader = csv.reader(lines)
+	header = next(reader, None) or []
+	columns = [name.strip().lower() for name in header]
+	yield columns
+	for values in reader:
+		if not any(value.strip() for value in values):
+			continue
+		values = values + [''] * (len(columns) - len(values))
+		yield reader.line_num, {column: value.strip() for column, value in zip(columns, values)}
+
+
+def _decimal(value, label):
+	try:
+		amount = Decimal(value.replace(',', ''))
+	except InvalidOperation:
+		raise RowError(f'{label} "{value}" is not a number.')
+	if not amount.is_finite() or amount <= 0:
+		raise RowError(f'{label} must be greater than zero.')
+	if amount > MAX_AMOUNT:
+		raise RowError(f'{label} is too large.')
+	return amount.quantize(Decimal('0.01'))
+
+
+def _date(value, label, *, month=False):
+	if not value:
+		return None
+	formats = ('%Y-%m-%d', '%Y-%m') if month else ('%Y-%m-%d',)
+	for fmt in formats:
+		try:
+			parsed = datetime.strptime(value, fmt).date()
+		except ValueError:
+			continue
+		return parsed.replace(day=1) if month else parsed
+	raise RowError(f'{label} "{value}" must be a date (YYYY-MM-DD).')
+
+
+def _bool(value, label, default):
+	if not value:
+		return default
+	lowered = value.lower()
+	if lowered in _TRUE:
+		return True
+	if lowered in _FALSE:
+		return False
+	raise RowError(f'{label} "{value}" must be yes or no.')
+
+
+def _employee_index():
+	"""``{employee_id: (user_id, department_id)}`` for every employee profile."""
+	return {
+		employee_code: (user_id, department_id)
+		for employee_code, user_id, department_id in EmployeeProfile.objects.values_list('employee_id', 'user_id', 'department_id')
+	}
+
+
+def _resolve_employee(employees, row):
+	code = row.get('employee_id') or ''
+	if not code:
+		raise RowError('employee_id is required.')
+	try:
+		return employees[code]
+	except KeyError:
+		raise RowError(f'Unknown employee_id "{code}".')
+
+
+def _validate(file, required, build):
+	"""Run ``build(row)`` for every data row; returns (objects, result).
+
+	Raises ``ImportFileError`` when the file itself cannot be decoded or parsed.
+	"""
+	result = ImportResult()
+	rows = _rows(file)
+	try:
+		columns = next(rows)
+		missing = [column for column in required if column not in columns]
+		if missing:
+			result.errors.append((1, f"Missing column(s): {', '.join(missing)}."))
+			return [], result
+
+		objects = []
+		for line, row in rows:
+			result.rows += 1
+			try:
+				objects.append(build(row))
+			except RowError as exc:
+				result.errors.append((line, str(exc)))
+	except UnicodeDecodeError as exc:
+		raise ImportFileError('The file must be a UTF-8 encoded CSV. In Excel, save it as "CSV UTF-8".') from exc
+	except csv.Error as exc:
+		raise ImportFileError(f'The file is not a valid CSV: {exc}.') from exc
+	return objects, result
+
+
+def _bulk_insert(model, objects):
+	for start in range(0, len(objects), IMPORT_BATCH_SIZE):
+		model.objects.bulk_create(objects[start:start + IMPORT_BATCH_SIZE])
+
+
+def import_pay_items(file, *, created_by=None, dry_run=False) -> ImportResult:
+	"""Import ``EmployeePayItem`` rows: employee_id, item_code, amount[, start_date, end_date, is_recurring]."""
+	employees = _employee_index()
+	item_types = {code: (pk, is_active) for code, pk, is_active in PayItemType.objects.values_list('code', 'id', 'is_active')}
+
+	def build(row):
+		user_id, _department_id = _resolve_employee(employees, row)
+		code = row.get('item_code') or ''
+		if code not in item_types:
+			raise RowError(f'Unknown item_code "{code}".')
+		item_type_id, is_active = item_types[code]
+		if not is_active:
+			raise RowError(f'Pay item type "{code}" is inactive.')
+		start_date = _date(row.get('start_date'), 'start_date')
+		end_date = _date(row.get('end_date'), 'end_date')
+		if start_date and end_date and end_date < start_date:
+			raise RowError('end_date is before start_date.')
+		return EmployeePayItem(
+			employee_id=user_id,
+			item_type_id=item_type_id,
+			amount=_decimal(row.get('amount') or '', 'amount'),
+			start_date=start_date,
+			end_date=end_date,
+			is_recurring=_bool(row.get('is_recurring'), 'is_recurring', True),
+			created_by=created_by,
+		)
+
+	items, result = _validate(file, PAY_ITEM_COLUMNS, build)
+	if result.errors or dry_run:
+		return result
+
+	with transaction.atomic():
+		_bulk_insert(EmployeePayItem, items)
+		by_range = defaultdict(set)
+		for item in items:
+			by_range[(item.start_date, item.end_date)].add(item.employee_id)
+		for (start_date, end_date), employee_ids in by_range.items():
+			mark_employees_dirty(employee_ids, affected_runs(start_date=start_date, end_date=end_date), reason=PayrollDirtyEmployee.REASON_PAY_ITEM)
+	result.created = len(items)
+	return result
+
+
+def import_penalties(file, *, created_by=None, dry_run=False) -> ImportResult:
+	"""Import ``Penalty`` rows: employee_id, month, amount, reason[, status, incident_date, clearance_notes]."""
+	employees = _employee_index()
+	statuses = dict(Penalty.STATUS_CHOICES)
+	now = timezone.now()
+	today = timezone.localdate()
+
+	def build(row):
+		user_id, department_id = _resolve_employee(employees, row)
+		month = _date(row.get('month'), 'month', month=True)
+		if month is None:
+			raise RowError('month is required.')
+		reason = row.get('reason') or ''
+		if not reason:
+			raise RowError('reason is required.')
+		status = (row.get('status') or Penalty.STATUS_PENDING).upper()
+		if status not in statuses:
+			raise RowError(f'Unknown status "{status}".')
+		settled = status in {Penalty.STATUS_CLEARED, Penalty.STATUS_WAIVED}
+		return Penalty(
+			employee_id=user_id,
+			department_id=department_id,
+			incident_date=_date(row.get('incident_date'), 'incident_date') or today,
+			applies_to_month=month,
+			amount=_decimal(row.get('amount') or '', 'amount'),
+			reason=reason,
+			status=status,
+			clearance_notes=row.get('clearance_notes') or '',
+			created_by=created_by,
+			cleared_by=created_by if settled else None,
+			cleared_at=now if settled else None,
+		)
+
+	penalties, result = _validate(file, PENALTY_COLUMNS, build)
+	if result.errors or dry_run:
+		return result
+
+	with transaction.atomic():
+		_bulk_insert(Penalty, penalties)
+		by_month = defaultdict(set)
+		for penalty in penalties:
+			by_month[penalty.applies_to_month].add(penalty.employee_id)
+		for month, employee_ids in by_month.items():
+			mark_employees_dirty(employee_ids, affected_runs(month=month), reason=PayrollDirtyEmployee.REASON_PENALTY)
+	result.created = len(penalties)
+	return result
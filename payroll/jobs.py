@@ -0,0 +1,131 @@
+"""DB-backed background jobs for long payroll operations.
+
+Jobs live in ``PayrollJob`` rows, so no broker is needed: the
+``payroll_worker`` management command (run from cron or a long-lived
+process) claims queued jobs with a conditional UPDATE and records progress
+as it goes. Payslip computation and payslip PDF rendering both run here.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .documents import render_payroll_run_pdfs
+from .engine import compute_payroll_run
+from .models import PayrollJob
+from .structures import structures_for_month
+
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_size():
+	return max(1, int(getattr(settings, 'PAYROLL_JOB_CHUNK_SIZE', 200) or 200))
+
+
+def background_jobs_enabled():
+	return bool(getattr(settings, 'PAYROLL_BACKGROUND_JOBS', True))
+
+
+def enqueue_payroll_job(run, *, kind=PayrollJob.KIND_COMPUTE, requested_by=None):
+	"""Queue a job for ``run``; runs it inline when background jobs are disabled."""
+	job = PayrollJob.objects.create(payroll_run=run, kind=kind, requested_by=requested_by)
+	if not background_jobs_enabled():
+		now = timezone.now()
+		if PayrollJob.objects.filter(pk=job.pk, status=PayrollJob.STATUS_QUEUED).update(
+			status=PayrollJob.STATUS_RUNNING,
+			started_at=now,
+			heartbeat_at=now,
+		):
+			job.refresh_from_db()
+			run_job(job)
+	return job
+
+
+def requeue_stale_jobs():
+	"""Put RUNNING jobs whose worker stopped reporting back in the queue."""
+	stale_seconds = int(getattr(settings, 'PAYROLL_JOB_STALE_SECONDS', 900) or 900)
+	cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+	return PayrollJob.objects.filter(status=PayrollJob.STATUS_RUNNING, heartbeat_at__lt=cutoff).update(
+		status=PayrollJob.STATUS_QUEUED,
+	)
+
+
+def claim_next_job():
+	"""Atomically move the oldest queued job to RUNNING and return it (or None)."""
+	candidates = PayrollJob.objects.filter(status=PayrollJob.STATUS_QUEUED).order_by('created_at', 'id').values_list('id', flat=True)[:10]
+	for job_id in candidates:
+		now = timezone.now()
+		claimed = PayrollJob.objects.filter(pk=job_id, status=PayrollJob.STATUS_QUEUED).update(
+			status=PayrollJob.STATUS_RUNNING,
+			started_at=now,
+			heartbeat_at=now,
+		)
+		if claimed:
+			return PayrollJob.objects.select_related('payroll_run', 'requested_by').get(pk=job_id)
+	return None
+
+
+def _report_progress(job, processed):
+	job.processed_count = processed
+	job.heartbeat_at = timezone.now()
+	PayrollJob.objects.filter(pk=job.pk).update(processed_count=processed, heartbeat_at=job.heartbeat_at)
+
+
+def _run_compute(job):
+	run = job.payroll_run
+	if run.locked:
+		raise RuntimeError('Payroll run is locked.')
+
+	employee_ids = list(structures_for_month(run.month).order_by('employee_id').values_list('employee_id', flat=True))
+	job.total_count = len(employee_ids)
+	PayrollJob.objects.filter(pk=job.pk).update(total_count=job.total_count)
+
+	size = _chunk_size()
+	processed = 0
+	for start in range(0, len(employee_ids), size):
+		chunk = employee_ids[start:start + size]
+		# Each chunk commits on its own so progress survives a worker restart.
+		with transaction.atomic():
+			compute_payroll_run(run, created_by=job.requested_by, employee_ids=chunk)
+		processed += len(chunk)
+		_report_progress(job, processed)
+
+
+def _run_render_pdfs(job):
+	def progress(done, total):
+		if total != job.total_count:
+			job.total_count = total
+			PayrollJob.objects.filter(pk=job.pk).update(total_count=total)
+		_report_progress(job, done)
+
+	render_payroll_run_pdfs(job.payroll_run, progress=progress)
+
+
+JOB_HANDLERS = {
+	PayrollJob.KIND_COMPUTE: _run_compute,
+	PayrollJob.KIND_RENDER_PDFS: _run_render_pdfs,
+}
+
+
+def run_job(job):
+	"""Execute a claimed job, recording DONE or FAILED on the row."""
+	handler = JOB_HANDLERS.get(job.kind)
+	try:
+		if handler is None:
+			raise RuntimeError(f'Unknown payroll job kind: {job.kind}')
+		handler(job)
+	except Exception as exc:
+		logger.exception('Payroll job %s failed', job.pk)
+		job.status = PayrollJob.STATUS_FAILED
+		job.error = str(exc)[:2000]
+	else:
+		job.status = PayrollJob.STATUS_DONE
+		job.error = ''
+	job.finished_at = timezone.now()
+	PayrollJob.objects.filter(pk=job.pk).update(status=job.status, error=job.error, finished_at=job.finished_at)
+	return job
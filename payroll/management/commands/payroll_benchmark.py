@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll.benchmark import BenchmarkError, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Time payroll run creation, compute_payslip, the cleared CSV export and voucher clearing, "
+        "and print wall time and query counts as JSON. Changes are rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=0, help="Generate this many synthetic employees first (default: use existing data).")
+        parser.add_argument("--pay-items", type=int, default=0, help="Synthetic pay items to generate with --employees.")
+        parser.add_argument("--penalties", type=int, default=0, help="Synthetic penalties to generate with --employees.")
+        parser.add_argument("--month", help="Month to run payroll for, YYYY-MM (default: first month without a run).")
+        parser.add_argument("--sample", type=int, default=50, help="Employees timed through compute_payslip (default 50).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable data.")
+        parser.add_argument("--keep", action="store_true", help="Commit the generated data and payroll run instead of rolling back.")
+        parser.add_argument("--output", help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        month = None
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--month must be YYYY-MM.")
+
+        try:
+            report = run_benchmark(
+                employees=max(0, options["employees"]),
+                pay_items=max(0, options["pay_items"]),
+                penalties=max(0, options["penalties"]),
+                month=month,
+                sample=max(0, options["sample"]),
+                seed=options["seed"],
+                keep=options["keep"],
+            )
+        except BenchmarkError as exc:
+            raise CommandError(str(exc))
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(payload + "\n")
+        self.stdout.write(payload)
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll.benchmark import SYNTH_PREFIX, purge_synthetic, synthesize_company
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic company (staff, salaries, pay items, penalties) for payroll benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=1000, help="Number of synthetic employees (default 1000).")
+        parser.add_argument("--pay-items", type=int, default=2000, help="Number of employee pay items (default 2000).")
+        parser.add_argument("--penalties", type=int, default=200, help="Number of penalties for --month (default 200).")
+        parser.add_argument("--month", help="Month the penalties apply to, YYYY-MM (default: current month).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable data.")
+        parser.add_argument("--prefix", default=SYNTH_PREFIX, help=f"Username/code prefix (default {SYNTH_PREFIX!r}).")
+        parser.add_argument("--purge", action="store_true", help="Delete previously generated data instead of adding more.")
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            count = purge_synthetic(options["prefix"])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {count} synthetic user(s)."))
+            return
+
+        month = None
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--month must be YYYY-MM.")
+        if options["employees"] < 0 or options["pay_items"] < 0 or options["penalties"] < 0:
+            raise CommandError("Counts must not be negative.")
+
+        result = synthesize_company(
+            employees=options["employees"],
+            pay_items=options["pay_items"],
+            penalties=options["penalties"],
+            month=month,
+            seed=options["seed"],
+            prefix=options["prefix"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['employees']} employee(s), {result['pay_items']} pay item(s) "
+            f"and {result['penalties']} penalt(y/ies) for {result['month']}."
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payroll.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued payroll jobs (payslip generation) from the database job table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit (suitable for cron).")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Seconds to wait between polls when idle (default 5).")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Exit after processing this many jobs (0 = no limit).")
+
+    def handle(self, *args, **options):
+        once = options["once"]
+        sleep = max(0.5, options["sleep"])
+        max_jobs = max(0, options["max_jobs"])
+        processed = 0
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale job(s)."))
+
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(sleep)
+                continue
+
+            self.stdout.write(f"Running job #{job.pk}: {job.get_kind_display()} for {job.payroll_run}...")
+            run_job(job)
+            if job.status == job.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"Job #{job.pk} done ({job.processed_count}/{job.total_count})."))
+            else:
+                self.stdout.write(self.style.ERROR(f"Job #{job.pk} failed: {job.error}"))
+
+            processed += 1
+            if max_jobs and processed >= max_jobs:
+                break
+
+        self.stdout.write(f"Processed {processed} job(s).")
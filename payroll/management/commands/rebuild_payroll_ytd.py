@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from payroll.year_to_date import rebuild_year_to_date
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-employee payroll year-to-date totals from payslips."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, action="append", dest="years", help="Only rebuild this year (repeatable).")
+
+    def handle(self, *args, **options):
+        count = rebuild_year_to_date(options["years"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt payroll year-to-date totals ({count} rows)."))
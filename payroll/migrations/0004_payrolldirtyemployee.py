@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payroll', '0003_payrolljob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollDirtyEmployee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('SALARY_STRUCTURE', 'Salary Structure'), ('PAY_ITEM', 'Pay Item'), ('PENALTY', 'Penalty')], max_length=20)),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('payroll_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_employees', to='payroll.payrollrun')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='payrolldirtyemployee',
+            constraint=models.UniqueConstraint(fields=('payroll_run', 'employee'), name='unique_dirty_employee_per_run'),
+        ),
+    ]
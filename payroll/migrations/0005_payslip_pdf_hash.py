@@ -0,0 +1,23 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0004_payrolldirtyemployee'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslip',
+            name='pdf_hash',
+            field=models.CharField(blank=True, help_text='Content hash of the inputs the stored PDF was rendered from.', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='payrolljob',
+            name='kind',
+            field=models.CharField(choices=[('COMPUTE', 'Compute Payslips'), ('RENDER_PDFS', 'Render Payslip PDFs')], default='COMPUTE', max_length=20),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0005_payslip_pdf_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120)),
+                ('effective_from', models.DateField(help_text='Applies to payroll months starting on or after this date.', unique=True)),
+                ('nssf_employee_rate', models.DecimalField(decimal_places=4, default=0, help_text='Fraction of gross pay, e.g. 0.0500', max_digits=5)),
+                ('nssf_employer_rate', models.DecimalField(decimal_places=4, default=0, help_text='Fraction of gross pay, e.g. 0.1000', max_digits=5)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-effective_from'],
+            },
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='nssf_employee',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='nssf_employer',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='TaxBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lower_bound', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('rate', models.DecimalField(decimal_places=4, help_text='Fraction of the amount within the band, e.g. 0.2000', max_digits=5)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='payroll.taxtable')),
+            ],
+            options={
+                'ordering': ['table', 'lower_bound'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taxband',
+            constraint=models.UniqueConstraint(fields=('table', 'lower_bound'), name='unique_tax_band_lower_bound'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0006_tax_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrun',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped whenever the payslips of this run change.'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payroll', '0007_payrollrun_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRunSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField()),
+                ('payslip_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('payroll_run', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='payroll.payrollrun')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0008_payrollrunsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayslipLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(blank=True, max_length=60)),
+                ('name', models.CharField(max_length=120)),
+                ('kind', models.CharField(choices=[('ALLOWANCE', 'Allowance'), ('DEDUCTION', 'Deduction')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('item_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payslip_lines', to='payroll.payitemtype')),
+                ('payroll_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslip_lines', to='payroll.payrollrun')),
+                ('payslip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='payroll.payslip')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item_type', 'payroll_run'], name='payroll_pay_item_ty_441487_idx'), models.Index(fields=['payroll_run', 'kind'], name='payroll_pay_payroll_0281de_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.27 on 2026-10-17 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TOTAL_FIELDS = ('gross_pay', 'tax_amount', 'nssf_employee', 'nssf_employer', 'penalty_total', 'net_pay')
+
+
+def backfill_year_to_date(apps, schema_editor):
+    Payslip = apps.get_model('payroll', 'Payslip')
+    PayrollYearToDate = apps.get_model('payroll', 'PayrollYearToDate')
+    totals = (
+        Payslip.objects.values('employee_id', 'payroll_run__month__year')
+        .annotate(payslip_count=models.Count('id'), **{field: models.Sum(field) for field in TOTAL_FIELDS})
+        .order_by()
+    )
+    rows = []
+    for row in totals:
+        row['year'] = row.pop('payroll_run__month__year')
+        rows.append(PayrollYearToDate(**row))
+    PayrollYearToDate.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payroll', '0009_payslipline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollYearToDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('payslip_count', models.PositiveSmallIntegerField(default=0)),
+                ('gross_pay', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nssf_employee', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('nssf_employer', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('penalty_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net_pay', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_year_to_date', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['year', 'employee'], name='payroll_pay_year_2323cd_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='payrollyeartodate',
+            constraint=models.UniqueConstraint(fields=('employee', 'year'), name='unique_payroll_ytd_per_year'),
+        ),
+        migrations.RunPython(backfill_year_to_date, migrations.RunPython.noop),
+    ]
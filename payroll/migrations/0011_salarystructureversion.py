@@ -0,0 +1,67 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:00
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_versions(apps, schema_editor):
+    SalaryStructure = apps.get_model('payroll', 'SalaryStructure')
+    SalaryStructureVersion = apps.get_model('payroll', 'SalaryStructureVersion')
+    SalaryStructureVersion.objects.bulk_create(
+        [
+            SalaryStructureVersion(
+                structure_id=structure.pk,
+                employee_id=structure.employee_id,
+                effective_from=structure.effective_from or datetime.date(1900, 1, 1),
+                basic_salary=structure.basic_salary,
+                allowances=structure.allowances,
+                deductions=structure.deductions,
+                currency=structure.currency,
+                is_active=structure.is_active,
+            )
+            for structure in SalaryStructure.objects.all()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payroll', '0010_payrollyeartodate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salarystructure',
+            name='effective_from',
+            field=models.DateField(blank=True, help_text='Date these figures take effect. Use a new date for a raise so earlier months keep the previous salary.', null=True),
+        ),
+        migrations.CreateModel(
+            name='SalaryStructureVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField()),
+                ('basic_salary', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('allowances', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('deductions', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('currency', models.CharField(default='UGX', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('recorded_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salary_structure_versions', to=settings.AUTH_USER_MODEL)),
+                ('structure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='payroll.salarystructure')),
+            ],
+            options={
+                'ordering': ['employee', '-effective_from'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='salarystructureversion',
+            constraint=models.UniqueConstraint(fields=('employee', 'effective_from'), name='unique_salary_version_per_date'),
+        ),
+        migrations.RunPython(backfill_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.27 on 2026-10-17 03:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0011_salarystructureversion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salarystructure',
+            name='effective_from',
+            field=models.DateField(blank=True, help_text='Date these figures take effect. Changes saved without a later date take effect today; earlier months keep the previous salary.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='salarystructureversion',
+            name='structure',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='versions', to='payroll.salarystructure'),
+        ),
+    ]
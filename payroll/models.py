@@ -9,13 +9,44 @@ class SalaryStructure(models.Model):
 	allowances = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 	deductions = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 	currency = models.CharField(max_length=10, default='UGX')
-	effective_from = models.DateField(null=True, blank=True)
+	effective_from = models.DateField(
+		null=True,
+		blank=True,
+		help_text='Date these figures take effect. Changes saved without a later date take effect today; earlier months keep the previous salary.',
+	)
 	is_active = models.BooleanField(default=True)
 
 	def __str__(self):
 		return f'Salary - {self.employee}'
 
 
+class SalaryStructureVersion(models.Model):
+	"""The figures of a salary structure from ``effective_from`` until the next version.
+
+	Added whenever the structure's figures change; payroll resolves the
+	version in force for each month instead of reading the current structure.
+	"""
+	# Kept after the structure is deleted: past runs still resolve against it.
+	structure = models.ForeignKey(SalaryStructure, on_delete=models.SET_NULL, null=True, blank=True, related_name='versions')
+	employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='salary_structure_versions')
+	effective_from = models.DateField()
+	basic_salary = models.DecimalField(max_digits=12, decimal_places=2)
+	allowances = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	deductions = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	currency = models.CharField(max_length=10, default='UGX')
+	is_active = models.BooleanField(default=True)
+	recorded_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ['employee', '-effective_from']
+		constraints = [
+			models.UniqueConstraint(fields=['employee', 'effective_from'], name='unique_salary_version_per_date'),
+		]
+
+	def __str__(self):
+		return f'Salary - {self.employee} from {self.effective_from}'
+
+
 class PayItemType(models.Model):
 	KIND_ALLOWANCE = 'ALLOWANCE'
 	KIND_DEDUCTION = 'DEDUCTION'
@@ -107,11 +138,44 @@ class Penalty(models.Model):
 		return f'Penalty {self.employee} {self.amount} ({self.get_status_display()})'
 
 
+class TaxTable(models.Model):
+	"""A version of the PAYE band schedule and NSSF rates, in force from ``effective_from``."""
+	name = models.CharField(max_length=120)
+	effective_from = models.DateField(unique=True, help_text='Applies to payroll months starting on or after this date.')
+	nssf_employee_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0, help_text='Fraction of gross pay, e.g. 0.0500')
+	nssf_employer_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0, help_text='Fraction of gross pay, e.g. 0.1000')
+	is_active = models.BooleanField(default=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['-effective_from']
+
+	def __str__(self):
+		return f'{self.name} (from {self.effective_from:%Y-%m-%d})'
+
+
+class TaxBand(models.Model):
+	"""Marginal PAYE rate applied to taxable pay from ``lower_bound`` up to the next band."""
+	table = models.ForeignKey(TaxTable, on_delete=models.CASCADE, related_name='bands')
+	lower_bound = models.DecimalField(max_digits=12, decimal_places=2)
+	rate = models.DecimalField(max_digits=5, decimal_places=4, help_text='Fraction of the amount within the band, e.g. 0.2000')
+
+	class Meta:
+		ordering = ['table', 'lower_bound']
+		constraints = [
+			models.UniqueConstraint(fields=['table', 'lower_bound'], name='unique_tax_band_lower_bound'),
+		]
+
+	def __str__(self):
+		return f'{self.table}: {self.lower_bound}+ @ {self.rate}'
+
+
 class PayrollRun(models.Model):
 	month = models.DateField(help_text='Use first day of month')
 	created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='payroll_runs')
 	created_at = models.DateTimeField(auto_now_add=True)
 	locked = models.BooleanField(default=False, help_text='When locked, this payroll run should not be recalculated.')
+	revision = models.PositiveIntegerField(default=0, editable=False, help_text='Bumped whenever the payslips of this run change.')
 
 	class Meta:
 		indexes = [models.Index(fields=['month'])]
@@ -122,6 +186,22 @@ class PayrollRun(models.Model):
 	def __str__(self):
 		return f'Payroll {self.month:%Y-%m}'
 
+	@classmethod
+	def bump_revision(cls, *run_ids):
+		cls.objects.filter(pk__in=run_ids).update(revision=models.F('revision') + 1)
+
+
+class PayrollRunSnapshot(models.Model):
+	"""Denormalized, columnar copy of a run's payslips frozen when the run is locked."""
+	payroll_run = models.OneToOneField(PayrollRun, on_delete=models.CASCADE, related_name='snapshot')
+	data = models.JSONField()
+	payslip_count = models.PositiveIntegerField(default=0)
+	created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	def __str__(self):
+		return f'Snapshot {self.payroll_run} ({self.payslip_count} payslips)'
+
 
 class Payslip(models.Model):
 	payroll_run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='payslips')
@@ -132,8 +212,11 @@ class Payslip(models.Model):
 	penalty_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 	gross_pay = models.DecimalField(max_digits=12, decimal_places=2)
 	tax_amount = models.DecimalField(max_digits=12, decimal_places=2)
+	nssf_employee = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+	nssf_employer = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 	net_pay = models.DecimalField(max_digits=12, decimal_places=2)
 	pdf_file = models.FileField(upload_to='payslips/', blank=True, null=True)
+	pdf_hash = models.CharField(max_length=64, blank=True, help_text='Content hash of the inputs the stored PDF was rendered from.')
 	is_held = models.BooleanField(default=False, help_text='Held until penalty clearance is completed.')
 
 	class Meta:
@@ -145,6 +228,51 @@ class Payslip(models.Model):
 		return f'Payslip {self.employee} - {self.payroll_run}'
 
 
+class PayslipLine(models.Model):
+	"""One pay item (or salary-structure allowance/deduction) as paid on a payslip."""
+	payslip = models.ForeignKey(Payslip, on_delete=models.CASCADE, related_name='lines')
+	payroll_run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='payslip_lines')
+	item_type = models.ForeignKey(PayItemType, on_delete=models.SET_NULL, null=True, blank=True, related_name='payslip_lines')
+	code = models.SlugField(max_length=60, blank=True)
+	name = models.CharField(max_length=120)
+	kind = models.CharField(max_length=20, choices=PayItemType.KIND_CHOICES)
+	amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['item_type', 'payroll_run']),
+			models.Index(fields=['payroll_run', 'kind']),
+		]
+
+	def __str__(self):
+		return f'{self.name} {self.amount} ({self.payslip})'
+
+
+class PayrollYearToDate(models.Model):
+	"""Running per-employee totals of every payslip in a calendar year (P9-style summary)."""
+	employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='payroll_year_to_date')
+	year = models.PositiveSmallIntegerField()
+	payslip_count = models.PositiveSmallIntegerField(default=0)
+	gross_pay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	nssf_employee = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	nssf_employer = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	penalty_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	net_pay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['employee', 'year'], name='unique_payroll_ytd_per_year'),
+		]
+		indexes = [
+			models.Index(fields=['year', 'employee']),
+		]
+
+	def __str__(self):
+		return f'{self.employee} YTD {self.year}'
+
+
 class SalaryVoucher(models.Model):
 	STATUS_ON_HOLD = 'ON_HOLD'
 	STATUS_CLEARED = 'CLEARED'
@@ -169,3 +297,86 @@ class SalaryVoucher(models.Model):
 
 	def __str__(self):
 		return f'Salary Voucher {self.voucher_number} - {self.payslip.employee}'
+
+
+class PayrollJob(models.Model):
+	KIND_COMPUTE = 'COMPUTE'
+	KIND_RENDER_PDFS = 'RENDER_PDFS'
+
+	KIND_CHOICES = [
+		(KIND_COMPUTE, 'Compute Payslips'),
+		(KIND_RENDER_PDFS, 'Render Payslip PDFs'),
+	]
+
+	STATUS_QUEUED = 'QUEUED'
+	STATUS_RUNNING = 'RUNNING'
+	STATUS_DONE = 'DONE'
+	STATUS_FAILED = 'FAILED'
+
+	STATUS_CHOICES = [
+		(STATUS_QUEUED, 'Queued'),
+		(STATUS_RUNNING, 'Running'),
+		(STATUS_DONE, 'Done'),
+		(STATUS_FAILED, 'Failed'),
+	]
+
+	ACTIVE_STATUSES = {STATUS_QUEUED, STATUS_RUNNING}
+
+	payroll_run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='jobs')
+	kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_COMPUTE)
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+	processed_count = models.PositiveIntegerField(default=0)
+	total_count = models.PositiveIntegerField(default=0)
+	error = models.TextField(blank=True)
+	requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='payroll_jobs')
+	created_at = models.DateTimeField(auto_now_add=True)
+	started_at = models.DateTimeField(null=True, blank=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+	heartbeat_at = models.DateTimeField(null=True, blank=True, help_text='Last progress update from the worker.')
+
+	class Meta:
+		ordering = ['-created_at', '-id']
+		indexes = [
+			models.Index(fields=['status', 'created_at']),
+		]
+
+	def __str__(self):
+		return f'{self.get_kind_display()} - {self.payroll_run} ({self.get_status_display()})'
+
+	@property
+	def is_active(self):
+		return self.status in self.ACTIVE_STATUSES
+
+	@property
+	def percent(self):
+		if self.status == self.STATUS_DONE:
+			return 100
+		if not self.total_count:
+			return 0
+		return min(100, int(self.processed_count * 100 / self.total_count))
+
+
+class PayrollDirtyEmployee(models.Model):
+	"""An employee whose payslip in an unlocked run is out of date with its inputs."""
+	REASON_SALARY_STRUCTURE = 'SALARY_STRUCTURE'
+	REASON_PAY_ITEM = 'PAY_ITEM'
+	REASON_PENALTY = 'PENALTY'
+
+	REASON_CHOICES = [
+		(REASON_SALARY_STRUCTURE, 'Salary Structure'),
+		(REASON_PAY_ITEM, 'Pay Item'),
+		(REASON_PENALTY, 'Penalty'),
+	]
+
+	payroll_run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='dirty_employees')
+	employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+	reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+	marked_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['payroll_run', 'employee'], name='unique_dirty_employee_per_run'),
+		]
+
+	def __str__(self):
+		return f'{self.employee} dirty in {self.payroll_run}'
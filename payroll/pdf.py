@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+def _money(value) -> str:
+	try:
+		return f"{float(value):,.2f}"
+	except (TypeError, ValueError):
+		return str(value or '')
+
+
+def render_payslip_pdf(payload: dict) -> bytes:
+	"""Render one payslip to PDF bytes.
+
+	``payload`` is a plain dict (see ``payroll.documents.payslip_payload``) so this
+	function can run in a worker process without touching the database.
+	"""
+	buffer = BytesIO()
+	company = payload.get('company') or {}
+	employee = payload.get('employee') or {}
+	figures = payload.get('figures') or {}
+	currency = payload.get('currency') or ''
+
+	doc = SimpleDocTemplate(
+		buffer,
+		pagesize=A4,
+		topMargin=36,
+		bottomMargin=36,
+		leftMargin=40,
+		rightMargin=40,
+		title=f"Payslip {payload.get('period', '')} - {employee.get('name', '')}",
+	)
+
+	styles = getSampleStyleSheet()
+	styles.add(ParagraphStyle(name='H1', parent=styles['Heading1'], fontSize=16, spaceAfter=4))
+	styles.add(ParagraphStyle(name='Muted', parent=styles['BodyText'], fontSize=9.5, textColor=colors.HexColor('#4b5563')))
+	styles.add(ParagraphStyle(name='Small', parent=styles['BodyText'], fontSize=8.5, textColor=colors.HexColor('#6b7280')))
+
+	story: list = []
+	story.append(Paragraph(company.get('name') or 'HRMS', styles['H1']))
+	contact = ' · '.join([part for part in [company.get('address'), company.get('phone'), company.get('email')] if part])
+	if contact:
+		story.append(Paragraph(contact, styles['Muted']))
+	story.append(Spacer(1, 10))
+	story.append(Paragraph(f"<b>Payslip for {payload.get('period', '')}</b>", styles['BodyText']))
+	story.append(Spacer(1, 8))
+
+	meta = Table(
+		[
+			['Employee:', employee.get('name', ''), 'Employee ID:', employee.get('employee_id', '')],
+			['Department:', employee.get('department', ''), 'Position:', employee.get('position', '')],
+			['Bank:', employee.get('bank_name', ''), 'Account:', employee.get('bank_account_number', '')],
+			['Voucher:', payload.get('voucher_number', ''), 'Currency:', currency],
+		],
+		colWidths=[70, 175, 75, 175],
+	)
+	meta.setStyle(
+		TableStyle(
+			[
+				('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9fafb')),
+				('BOX', (0, 0), (-1, -1), 0.6, colors.HexColor('#e5e7eb')),
+				('INNERGRID', (0, 0), (-1, -1), 0.3, colors.HexColor('#e5e7eb')),
+				('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+				('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+				('FONTSIZE', (0, 0), (-1, -1), 9.5),
+				('PADDING', (0, 0), (-1, -1), 5),
+			]
+		)
+	)
+	story.append(meta)
+	story.append(Spacer(1, 14))
+
+	rows = [['Description', 'Amount']]
+	rows.append(['Basic salary', _money(figures.get('basic_salary'))])
+	for line in payload.get('lines') or []:
+		sign = '-' if line.get('kind') == 'DEDUCTION' else ''
+		rows.append([line.get('name', ''), f"{sign}{_money(line.get('amount'))}"])
+	if not payload.get('lines'):
+		rows.append(['Allowances', _money(figures.get('allowance_total'))])
+		rows.append(['Deductions', f"-{_money(figures.get('deduction_total'))}"])
+	rows.append(['Penalties', f"-{_money(figures.get('penalty_total'))}"])
+	rows.append(['Gross pay', _money(figures.get('gross_pay'))])
+	rows.append(['Tax (PAYE)', f"-{_money(figures.get('tax_amount'))}"])
+	if figures.get('nssf_employee') not in (None, '', '0', '0.00'):
+		rows.append(['NSSF (employee)', f"-{_money(figures.get('nssf_employee'))}"])
+	rows.append(['Net pay', _money(figures.get('net_pay'))])
+
+	breakdown = Table(rows, colWidths=[345, 150])
+	breakdown.setStyle(
+		TableStyle(
+			[
+				('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eef2ff')),
+				('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+				('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+				('LINEABOVE', (0, -1), (-1, -1), 0.8, colors.HexColor('#111827')),
+				('BOX', (0, 0), (-1, -1), 0.6, colors.HexColor('#e5e7eb')),
+				('INNERGRID', (0, 0), (-1, -2), 0.3, colors.HexColor('#e5e7eb')),
+				('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+				('FONTSIZE', (0, 0), (-1, -1), 10),
+				('PADDING', (0, 0), (-1, -1), 6),
+			]
+		)
+	)
+	story.append(breakdown)
+	story.append(Spacer(1, 18))
+	story.append(Paragraph('This payslip was generated electronically and is valid without a signature.', styles['Small']))
+
+	doc.build(story)
+	return buffer.getvalue()
+
+
+def render_annual_summary_pdf(payload: dict) -> bytes:
+	"""Render a batch of P9-style annual summaries, one page per employee, to PDF bytes.
+
+	``payload`` comes from ``payroll.documents.annual_summary_payloads``.
+	"""
+	buffer = BytesIO()
+	company = payload.get('company') or {}
+	year = payload.get('year', '')
+
+	doc = SimpleDocTemplate(
+		buffer,
+		pagesize=A4,
+		topMargin=36,
+		bottomMargin=36,
+		leftMargin=40,
+		rightMargin=40,
+		title=f"Annual payroll summary {year}",
+	)
+
+	styles = getSampleStyleSheet()
+	styles.add(ParagraphStyle(name='H1', parent=styles['Heading1'], fontSize=16, spaceAfter=4))
+	styles.add(ParagraphStyle(name='Small', parent=styles['BodyText'], fontSize=8.5, textColor=colors.HexColor('#6b7280')))
+
+	story: list = []
+	for index, employee in enumerate(payload.get('employees') or []):
+		if index:
+			story.append(PageBreak())
+		figures = employee.get('figures') or {}
+		story.append(Paragraph(company.get('name') or 'HRMS', styles['H1']))
+		story.append(Paragraph(f"<b>Annual payroll summary for {year}</b>", styles['BodyText']))
+		story.append(Spacer(1, 8))
+
+		meta = Table(
+			[
+				['Employee:', employee.get('name', ''), 'Employee ID:', employee.get('employee_id', '')],
+				['TIN:', employee.get('tin', ''), 'NSSF No.:', employee.get('nssf_number', '')],
+			],
+			colWidths=[70, 175, 75, 175],
+		)
+		meta.setStyle(
+			TableStyle(
+				[
+					('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9fafb')),
+					('BOX', (0, 0), (-1, -1), 0.6, colors.HexColor('#e5e7eb')),
+					('INNERGRID', (0, 0), (-1, -1), 0.3, colors.HexColor('#e5e7eb')),
+					('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+					('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+					('FONTSIZE', (0, 0), (-1, -1), 9.5),
+					('PADDING', (0, 0), (-1, -1), 5),
+				]
+			)
+		)
+		story.append(meta)
+		story.append(Spacer(1, 14))
+
+		totals = Table(
+			[
+				['Description', 'Amount'],
+				['Payslips in year', str(employee.get('payslip_count', ''))],
+				['Gross pay', _money(figures.get('gross_pay'))],
+				['Tax (PAYE)', _money(figures.get('tax_amount'))],
+				['NSSF (employee)', _money(figures.get('nssf_employee'))],
+				['NSSF (employer)', _money(figures.get('nssf_employer'))],
+				['Penalties', _money(figures.get('penalty_total'))],
+				['Net pay', _money(figures.get('net_pay'))],
+			],
+			colWidths=[345, 150],
+		)
+		totals.setStyle(
+			TableStyle(
+				[
+					('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eef2ff')),
+					('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+					('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+					('LINEABOVE', (0, -1), (-1, -1), 0.8, colors.HexColor('#111827')),
+					('BOX', (0, 0), (-1, -1), 0.6, colors.HexColor('#e5e7eb')),
+					('INNERGRID', (0, 0), (-1, -2), 0.3, colors.HexColor('#e5e7eb')),
+					('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+					('FONTSIZE', (0, 0), (-1, -1), 10),
+					('PADDING', (0, 0), (-1, -1), 6),
+				]
+			)
+		)
+		story.append(totals)
+		story.append(Spacer(1, 18))
+		story.append(Paragraph('This summary was generated electronically and is valid without a signature.', styles['Small']))
+
+	if not story:
+		story.append(Paragraph(f"No payroll totals for {year}.", styles['BodyText']))
+	doc.build(story)
+	return buffer.getvalue()
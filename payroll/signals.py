@@ -0,0 +1,112 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import EmployeePayItem, PayrollDirtyEmployee, PayrollRun, Payslip, Penalty, SalaryStructure
+from .structures import close_structure_versions, record_structure_version
+from .tracking import affected_runs, mark_employees_dirty
+from .year_to_date import refresh_year_to_date
+
+
+def _remember_previous(sender, instance, fields):
+	"""Keep the pre-save values so an edit also dirties where the row used to apply."""
+	instance._payroll_previous = None
+	if instance.pk:
+		instance._payroll_previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _is_cascade(sender, kwargs):
+	"""True when a delete was triggered by another model (e.g. the employee being deleted)."""
+	origin = kwargs.get('origin')
+	if origin is None:
+		return False
+	origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+	return origin_model is not sender
+
+
+@receiver(pre_save, sender=SalaryStructure)
+def salary_structure_pre_save(sender, instance, **kwargs):
+	_remember_previous(sender, instance, ['employee_id'])
+
+
+@receiver(post_save, sender=SalaryStructure)
+def salary_structure_saved(sender, instance, **kwargs):
+	version = record_structure_version(instance)
+	previous = getattr(instance, '_payroll_previous', None) or {}
+	reason = PayrollDirtyEmployee.REASON_SALARY_STRUCTURE
+	if previous.get('employee_id') not in (None, instance.employee_id):
+		# A structure moved to another employee stops paying the previous one
+		# from today; their earlier versions still price past months.
+		closed = close_structure_versions(instance, employee_id=previous['employee_id'])
+		start_date = closed.effective_from if closed is not None else None
+		mark_employees_dirty([previous['employee_id']], affected_runs(start_date=start_date), reason=reason)
+	mark_employees_dirty([instance.employee_id], affected_runs(start_date=version.effective_from), reason=reason)
+
+
+@receiver(post_delete, sender=SalaryStructure)
+def salary_structure_deleted(sender, instance, **kwargs):
+	if _is_cascade(sender, kwargs):
+		return
+	version = close_structure_versions(instance)
+	start_date = version.effective_from if version is not None else None
+	mark_employees_dirty([instance.employee_id], affected_runs(start_date=start_date), reason=PayrollDirtyEmployee.REASON_SALARY_STRUCTURE)
+
+
+@receiver(pre_save, sender=EmployeePayItem)
+def pay_item_pre_save(sender, instance, **kwargs):
+	_remember_previous(sender, instance, ['employee_id', 'start_date', 'end_date'])
+
+
+@receiver(post_save, sender=EmployeePayItem)
+@receiver(post_delete, sender=EmployeePayItem)
+def pay_item_changed(sender, instance, **kwargs):
+	if _is_cascade(sender, kwargs):
+		return
+	reason = PayrollDirtyEmployee.REASON_PAY_ITEM
+	mark_employees_dirty([instance.employee_id], affected_runs(start_date=instance.start_date, end_date=instance.end_date), reason=reason)
+	previous = getattr(instance, '_payroll_previous', None)
+	if previous:
+		mark_employees_dirty(
+			[previous['employee_id']],
+			affected_runs(start_date=previous['start_date'], end_date=previous['end_date']),
+			reason=reason,
+		)
+
+
+@receiver(pre_save, sender=Penalty)
+def penalty_pre_save(sender, instance, **kwargs):
+	_remember_previous(sender, instance, ['employee_id', 'applies_to_month'])
+
+
+@receiver(post_save, sender=Penalty)
+@receiver(post_delete, sender=Penalty)
+def penalty_changed(sender, instance, **kwargs):
+	if _is_cascade(sender, kwargs):
+		return
+	reason = PayrollDirtyEmployee.REASON_PENALTY
+	mark_employees_dirty([instance.employee_id], affected_runs(month=instance.applies_to_month), reason=reason)
+	previous = getattr(instance, '_payroll_previous', None)
+	if previous:
+		mark_employees_dirty([previous['employee_id']], affected_runs(month=previous['applies_to_month']), reason=reason)
+
+
+@receiver(post_save, sender=Payslip)
+@receiver(post_delete, sender=Payslip)
+def payslip_changed(sender, instance, **kwargs):
+	PayrollRun.bump_revision(instance.payroll_run_id)
+	if _is_cascade(sender, kwargs):
+		# Deleting a run refreshes its employees once in payroll_run_deleted.
+		return
+	refresh_year_to_date(instance.payroll_run.month.year, [instance.employee_id])
+
+
+@receiver(pre_delete, sender=PayrollRun)
+def payroll_run_deleting(sender, instance, **kwargs):
+	instance._payroll_employee_ids = list(Payslip.objects.filter(payroll_run=instance).values_list('employee_id', flat=True))
+
+
+@receiver(post_delete, sender=PayrollRun)
+def payroll_run_deleted(sender, instance, **kwargs):
+	employee_ids = getattr(instance, '_payroll_employee_ids', None)
+	if employee_ids:
+		refresh_year_to_date(instance.month.year, employee_ids)
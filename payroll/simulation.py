@@ -0,0 +1,214 @@
+"""In-memory payroll what-if simulation.
+
+Prices the current payroll inputs for a month twice, once as-is and once with
+hypothetical overrides applied, using the same loader and arithmetic as the
+bulk engine. Nothing is written to the database.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import replace
+from decimal import Decimal, InvalidOperation
+
+from employees.models import Department
+
+from .engine import ZERO, calculate_payslips, load_payslip_inputs
+from .models import PayItemType, Penalty
+from .tax import tax_table_for
+
+
+TOTAL_FIELDS = ('gross_pay', 'tax_amount', 'nssf_employee', 'nssf_employer', 'net_pay', 'employer_cost')
+HUNDRED = Decimal('100')
+CENT = Decimal('0.01')
+# Largest figure accepted; fits the 12-digit, 2-decimal money columns.
+MAX_AMOUNT = Decimal('9999999999.99')
+
+
+class SimulationError(ValueError):
+	pass
+
+
+def _decimal(value, label):
+	try:
+		result = Decimal(str(value))
+	except (InvalidOperation, TypeError, ValueError):
+		raise SimulationError(f'{label} must be a number.')
+	if not result.is_finite():
+		raise SimulationError(f'{label} must be a number.')
+	if abs(result) > MAX_AMOUNT:
+		raise SimulationError(f'{label} is too large.')
+	return result
+
+
+def _entries(overrides, key):
+	"""The list of objects under ``overrides[key]``, checked for shape."""
+	entries = overrides.get(key) or []
+	if not isinstance(entries, list):
+		raise SimulationError(f'{key} must be a list.')
+	for index, entry in enumerate(entries):
+		if not isinstance(entry, dict):
+			raise SimulationError(f'{key}[{index}] must be an object.')
+	return entries
+
+
+def _int(value, label):
+	if isinstance(value, bool):
+		raise SimulationError(f'{label} must be an integer id.')
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		raise SimulationError(f'{label} must be an integer id.')
+
+
+def _department_id(inputs):
+	try:
+		return inputs.employee.employee_profile.department_id
+	except Exception:
+		return None
+
+
+def _totals(figures):
+	row = {field: figures[field] for field in TOTAL_FIELDS if field in figures}
+	row['employer_cost'] = figures['gross_pay'] + figures['nssf_employer']
+	return row
+
+
+def _add(target, figures):
+	for field in TOTAL_FIELDS:
+		target[field] = target.get(field, ZERO) + figures[field]
+
+
+def _delta(baseline, scenario):
+	return {field: scenario.get(field, ZERO) - baseline.get(field, ZERO) for field in TOTAL_FIELDS}
+
+
+def _apply_salary_change(row, change, index):
+	label = f'salary_changes[{index}]'
+	if 'basic_salary' in change:
+		row.basic_salary = _decimal(change['basic_salary'], f'{label}.basic_salary')
+	if 'percent' in change:
+		percent = _decimal(change['percent'], f'{label}.percent')
+		row.basic_salary = (row.basic_salary * (HUNDRED + percent) / HUNDRED).quantize(CENT)
+	if 'allowances' in change:
+		row.legacy_allowances = _decimal(change['allowances'], f'{label}.allowances')
+	if 'deductions' in change:
+		row.legacy_deductions = _decimal(change['deductions'], f'{label}.deductions')
+
+
+def apply_overrides(inputs: dict, overrides: dict) -> dict:
+	"""Return a copy of ``inputs`` with the what-if ``overrides`` applied.
+
+	``overrides`` may contain ``salary_changes`` (by ``employee_id`` or
+	``department_id``, with ``basic_salary``, ``percent``, ``allowances`` or
+	``deductions``), ``pay_items`` (``employee_id``, ``kind``, ``amount``) and
+	``penalties`` (``employee_id``, ``amount``, optional ``status``).
+	"""
+	scenario = {employee_id: replace(row) for employee_id, row in inputs.items()}
+
+	def target(employee_id, label):
+		row = scenario.get(employee_id)
+		if row is None:
+			raise SimulationError(f'{label}: employee {employee_id} has no active salary structure.')
+		return row
+
+	for index, change in enumerate(_entries(overrides, 'salary_changes')):
+		if 'employee_id' in change:
+			rows = [target(_int(change['employee_id'], f'salary_changes[{index}].employee_id'), f'salary_changes[{index}]')]
+		elif 'department_id' in change:
+			department_id = _int(change['department_id'], f'salary_changes[{index}].department_id')
+			rows = [row for row in scenario.values() if _department_id(row) == department_id]
+		else:
+			raise SimulationError(f'salary_changes[{index}] needs an employee_id or department_id.')
+		for row in rows:
+			_apply_salary_change(row, change, index)
+
+	for index, item in enumerate(_entries(overrides, 'pay_items')):
+		label = f'pay_items[{index}]'
+		row = target(_int(item.get('employee_id'), f'{label}.employee_id'), label)
+		amount = _decimal(item.get('amount'), f'{label}.amount')
+		kind = item.get('kind') or PayItemType.KIND_ALLOWANCE
+		if kind == PayItemType.KIND_ALLOWANCE:
+			row.allowance_total += amount
+		elif kind == PayItemType.KIND_DEDUCTION:
+			row.deduction_total += amount
+		else:
+			raise SimulationError(f'{label}.kind must be ALLOWANCE or DEDUCTION.')
+
+	for index, penalty in enumerate(_entries(overrides, 'penalties')):
+		label = f'penalties[{index}]'
+		row = target(_int(penalty.get('employee_id'), f'{label}.employee_id'), label)
+		amount = _decimal(penalty.get('amount'), f'{label}.amount')
+		status = penalty.get('status') or Penalty.STATUS_CLEARED
+		if status == Penalty.STATUS_CLEARED:
+			row.penalty_total += amount
+		elif status == Penalty.STATUS_PENDING:
+			row.penalties_pending = True
+		else:
+			raise SimulationError(f'{label}.status must be CLEARED or PENDING.')
+
+	return scenario
+
+
+def simulate_payroll(month, overrides=None) -> dict:
+	"""Price ``month`` with and without ``overrides``; see ``apply_overrides``."""
+	month = month.replace(day=1)
+	overrides = overrides or {}
+	if not isinstance(overrides, dict):
+		raise SimulationError('Overrides must be an object.')
+
+	inputs = load_payslip_inputs(month)
+	scenario = apply_overrides(inputs, overrides)
+	tax_table = tax_table_for(month)
+	employee_ids = list(inputs)
+	baseline_figures = calculate_payslips([inputs[employee_id] for employee_id in employee_ids], tax_table)
+	scenario_figures = calculate_payslips([scenario[employee_id] for employee_id in employee_ids], tax_table)
+
+	department_names = dict(Department.objects.values_list('id', 'name'))
+	totals = {'baseline': {}, 'scenario': {}}
+	departments = defaultdict(lambda: {'headcount': 0, 'baseline': {}, 'scenario': {}})
+	employees = []
+	for employee_id, before, after in zip(employee_ids, baseline_figures, scenario_figures):
+		before = _totals(before)
+		after = _totals(after)
+		department_id = _department_id(inputs[employee_id])
+		bucket = departments[department_id]
+		bucket['headcount'] += 1
+		_add(bucket['baseline'], before)
+		_add(bucket['scenario'], after)
+		_add(totals['baseline'], before)
+		_add(totals['scenario'], after)
+
+		delta = _delta(before, after)
+		if any(delta.values()):
+			user = inputs[employee_id].employee
+			employees.append({
+				'employee_id': employee_id,
+				'name': user.get_full_name() or user.username,
+				'department': department_names.get(department_id, ''),
+				'baseline': before,
+				'scenario': after,
+				'delta': delta,
+			})
+
+	department_rows = []
+	for department_id, bucket in departments.items():
+		department_rows.append({
+			'department_id': department_id,
+			'department': department_names.get(department_id, 'Unassigned'),
+			'headcount': bucket['headcount'],
+			'baseline': bucket['baseline'],
+			'scenario': bucket['scenario'],
+			'delta': _delta(bucket['baseline'], bucket['scenario']),
+		})
+	department_rows.sort(key=lambda row: row['department'])
+	employees.sort(key=lambda row: row['name'])
+
+	totals['delta'] = _delta(totals['baseline'], totals['scenario'])
+	return {
+		'month': f'{month:%Y-%m}',
+		'tax_table_id': tax_table.table_id,
+		'headcount': len(employee_ids),
+		'totals': totals,
+		'departments': department_rows,
+		'employees': employees,
+	}
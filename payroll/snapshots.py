@@ -0,0 +1,194 @@
+"""Frozen payslip data for locked payroll runs.
+
+``lock_payroll_run`` stores every payslip of a run (names, bank details, item
+breakdown, voucher) as one columnar JSON blob. Views and exports of a locked
+run read that single row through ``payslip_rows`` instead of joining live
+``User``/``EmployeeProfile`` data, so later edits no longer change history.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import PayrollRun, PayrollRunSnapshot, Payslip, PayslipLine, SalaryVoucher
+from .tracking import recompute_dirty_employees
+
+
+SNAPSHOT_VERSION = 1
+
+MONEY_COLUMNS = (
+	'basic_salary',
+	'allowance_total',
+	'deduction_total',
+	'penalty_total',
+	'gross_pay',
+	'tax_amount',
+	'nssf_employee',
+	'nssf_employer',
+	'net_pay',
+)
+
+COLUMNS = (
+	'payslip_id',
+	'employee_id',
+	'username',
+	'name',
+	'employee_code',
+	'department',
+	'position',
+	'bank_name',
+	'bank_account_number',
+	'bank_branch',
+	'currency',
+) + MONEY_COLUMNS + (
+	'is_held',
+	'voucher_number',
+	'voucher_status',
+	'items',
+)
+
+_QUERY_FIELDS = (
+	'id',
+	'employee_id',
+	'employee__username',
+	'employee__first_name',
+	'employee__last_name',
+	'employee__employee_profile__employee_id',
+	'employee__employee_profile__department__name',
+	'employee__employee_profile__position__title',
+	'employee__employee_profile__bank_name',
+	'employee__employee_profile__bank_account_number',
+	'employee__employee_profile__bank_branch',
+	'employee__salary_structure__currency',
+) + MONEY_COLUMNS + (
+	'is_held',
+	'salary_voucher__voucher_number',
+	'salary_voucher__status',
+)
+
+_VOUCHER_STATUS_LABELS = dict(SalaryVoucher.STATUS_CHOICES)
+
+
+def _item_breakdown(run, payslip_ids=None) -> dict:
+	"""``{payslip_id: [[code, name, kind, amount], ...]}`` from the run's stored payslip lines."""
+	breakdown = {}
+	lines = PayslipLine.objects.filter(payroll_run=run)
+	if payslip_ids is not None:
+		lines = lines.filter(payslip_id__in=payslip_ids)
+	lines = lines.order_by('payslip_id', 'id').values_list('payslip_id', 'code', 'name', 'kind', 'amount')
+	for payslip_id, code, name, kind, amount in lines:
+		breakdown.setdefault(payslip_id, []).append([code, name, kind, amount])
+	return breakdown
+
+
+def _with_display(row: dict) -> dict:
+	row['voucher_status_display'] = _VOUCHER_STATUS_LABELS.get(row['voucher_status'], '')
+	return row
+
+
+def live_payslip_rows(run, *, with_items=True, payslip_ids=None) -> list:
+	"""Current payslip rows of ``run`` (or only ``payslip_ids``) read from live tables in one joined query."""
+	rows = []
+	payslips = Payslip.objects.filter(payroll_run=run)
+	if payslip_ids is not None:
+		payslips = payslips.filter(pk__in=payslip_ids)
+	for values in payslips.order_by('employee__username').values_list(*_QUERY_FIELDS):
+		record = dict(zip(_QUERY_FIELDS, values))
+		row = {
+			'payslip_id': record['id'],
+			'employee_id': record['employee_id'],
+			'username': record['employee__username'],
+			'name': f"{record['employee__first_name']} {record['employee__last_name']}".strip() or record['employee__username'],
+			'employee_code': record['employee__employee_profile__employee_id'] or '',
+			'department': record['employee__employee_profile__department__name'] or '',
+			'position': record['employee__employee_profile__position__title'] or '',
+			'bank_name': record['employee__employee_profile__bank_name'] or '',
+			'bank_account_number': record['employee__employee_profile__bank_account_number'] or '',
+			'bank_branch': record['employee__employee_profile__bank_branch'] or '',
+			'currency': record['employee__salary_structure__currency'] or '',
+			'is_held': record['is_held'],
+			'voucher_number': record['salary_voucher__voucher_number'] or '',
+			'voucher_status': record['salary_voucher__status'] or '',
+			'items': [],
+		}
+		for column in MONEY_COLUMNS:
+			row[column] = record[column]
+		rows.append(_with_display(row))
+
+	if with_items and rows:
+		breakdown = _item_breakdown(run, payslip_ids)
+		for row in rows:
+			row['items'] = breakdown.get(row['payslip_id'], [])
+	return rows
+
+
+def encode_rows(rows) -> dict:
+	"""Pack rows into the columnar JSON layout stored on ``PayrollRunSnapshot``."""
+	packed = []
+	for row in rows:
+		values = []
+		for column in COLUMNS:
+			value = row[column]
+			if column in MONEY_COLUMNS:
+				value = str(value)
+			elif column == 'items':
+				value = [[code, name, kind, str(amount)] for code, name, kind, amount in value]
+			values.append(value)
+		packed.append(values)
+	return {'version': SNAPSHOT_VERSION, 'columns': list(COLUMNS), 'rows': packed}
+
+
+def decode_rows(data, *, payslip_ids=None) -> list:
+	columns = data.get('columns') or []
+	wanted = set(payslip_ids) if payslip_ids is not None else None
+	rows = []
+	for values in data.get('rows') or []:
+		row = dict(zip(columns, values))
+		if wanted is not None and row.get('payslip_id') not in wanted:
+			continue
+		for column in MONEY_COLUMNS:
+			row[column] = Decimal(row.get(column) or '0')
+		row['items'] = [[code, name, kind, Decimal(amount)] for code, name, kind, amount in row.get('items') or []]
+		rows.append(_with_display(row))
+	return rows
+
+
+def get_snapshot(run):
+	"""The frozen snapshot of ``run`` if it is locked and has one, else None."""
+	if not run.locked:
+		return None
+	return PayrollRunSnapshot.objects.filter(payroll_run=run).first()
+
+
+def payslip_rows(run, *, with_items=True, payslip_ids=None) -> list:
+	"""Payslip rows for display/export: the frozen snapshot for locked runs, live data otherwise.
+
+	``payslip_ids`` limits the rows (and their line items) to those payslips.
+	"""
+	snapshot = get_snapshot(run)
+	if snapshot is not None:
+		return decode_rows(snapshot.data, payslip_ids=payslip_ids)
+	return live_payslip_rows(run, with_items=with_items, payslip_ids=payslip_ids)
+
+
+def lock_payroll_run(run, *, locked_by=None):
+	"""Freeze ``run``: store its snapshot and set ``locked``. Re-locking replaces the snapshot.
+
+	Employees still marked dirty are recomputed first, in the same
+	transaction, so stale payslips are never frozen.
+	"""
+	with transaction.atomic():
+		locked_run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+		if not locked_run.locked:
+			recompute_dirty_employees(locked_run, created_by=locked_by)
+		rows = live_payslip_rows(locked_run)
+		snapshot, _created = PayrollRunSnapshot.objects.update_or_create(
+			payroll_run=locked_run,
+			defaults={'data': encode_rows(rows), 'payslip_count': len(rows), 'created_by': locked_by},
+		)
+		if not locked_run.locked:
+			locked_run.locked = True
+			locked_run.save(update_fields=['locked'])
+	run.locked = True
+	return snapshot
@@ -0,0 +1,118 @@
+"""Effective-dated salary structure lookups.
+
+``SalaryStructure`` holds the current figures; every save that changes them
+adds a ``SalaryStructureVersion`` keyed by its ``effective_from`` date.
+Payroll reads the version in force at the end of the month, so recomputing
+an old run uses the salary paid at the time. Versions are kept when the
+structure is deleted or moved to another employee.
+"""
+from __future__ import annotations
+
+import calendar
+from datetime import date
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import SalaryStructureVersion
+
+
+# Effective date recorded for structures saved without ``effective_from``.
+OPEN_START = date(1900, 1, 1)
+
+VERSION_FIELDS = ('basic_salary', 'allowances', 'deductions', 'currency', 'is_active')
+
+
+def month_end(month):
+	return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+def _figures(source):
+	return {field: getattr(source, field) for field in VERSION_FIELDS}
+
+
+def _latest_version(employee_id):
+	return SalaryStructureVersion.objects.filter(employee_id=employee_id).order_by('-effective_from').first()
+
+
+def _write_version(latest, effective_from, **values):
+	"""Add a version at ``effective_from``, or correct ``latest`` if it already starts there.
+
+	Callers never pass a date before today when ``latest`` exists, so a
+	version that finished months resolve against is never rewritten.
+	"""
+	if latest is not None and latest.effective_from == effective_from:
+		for field, value in values.items():
+			setattr(latest, field, value)
+		latest.save()
+		return latest
+	return SalaryStructureVersion.objects.create(effective_from=effective_from, **values)
+
+
+def record_structure_version(structure, *, today=None):
+	"""Record ``structure``'s figures as a new version when they differ from the latest one.
+
+	The first version starts at ``effective_from`` (or ``OPEN_START``). Later
+	changes start at ``effective_from`` when it was moved past the latest
+	version, otherwise on ``today``, and the structure's ``effective_from`` is
+	updated to match. Earlier versions are left untouched, so recomputing an
+	old run still uses the salary paid at the time.
+	"""
+	figures = _figures(structure)
+	latest = _latest_version(structure.employee_id)
+	if latest is None:
+		return _write_version(None, structure.effective_from or OPEN_START, structure=structure, employee_id=structure.employee_id, **figures)
+	if _figures(latest) == figures and latest.structure_id == structure.pk:
+		return latest
+
+	if structure.effective_from and structure.effective_from > latest.effective_from:
+		effective_from = structure.effective_from
+	else:
+		effective_from = max(today or timezone.localdate(), latest.effective_from)
+	version = _write_version(latest, effective_from, structure=structure, employee_id=structure.employee_id, **figures)
+	if structure.effective_from != effective_from:
+		type(structure).objects.filter(pk=structure.pk).update(effective_from=effective_from)
+		structure.effective_from = effective_from
+	return version
+
+
+def close_structure_versions(structure, *, employee_id=None, today=None):
+	"""Stop paying ``structure``'s employee from ``today`` on, keeping the earlier versions.
+
+	``employee_id`` names the employee to close when the structure has since
+	been reassigned to someone else.
+	"""
+	employee_id = structure.employee_id if employee_id is None else employee_id
+	latest = _latest_version(employee_id)
+	if latest is None or not latest.is_active:
+		return latest
+	effective_from = max(today or timezone.localdate(), latest.effective_from)
+	return _write_version(latest, effective_from, structure=None, employee_id=employee_id, **{**_figures(latest), 'is_active': False})
+
+
+def structure_versions_as_of(day):
+	"""The version in force on ``day`` for every employee, as a single queryset.
+
+	Resolved with a correlated subquery on ``(employee, effective_from)`` so a
+	whole payroll month is one query.
+	"""
+	latest = (
+		SalaryStructureVersion.objects.filter(employee_id=OuterRef('employee_id'), effective_from__lte=day)
+		.order_by('-effective_from')
+		.values('effective_from')[:1]
+	)
+	return SalaryStructureVersion.objects.filter(effective_from__lte=day, effective_from=Subquery(latest))
+
+
+def structures_for_month(month):
+	"""Active salary versions that apply to payroll ``month``."""
+	return structure_versions_as_of(month_end(month)).filter(is_active=True)
+
+
+def structure_as_of(employee_id, day):
+	"""The version in force for one employee on ``day``, or None."""
+	return (
+		SalaryStructureVersion.objects.filter(employee_id=employee_id, effective_from__lte=day)
+		.order_by('-effective_from')
+		.first()
+	)
@@ -0,0 +1,106 @@
+"""Progressive PAYE and NSSF evaluation from versioned ``TaxTable`` rows.
+
+A table is compiled once per payroll run into sorted thresholds with the
+cumulative tax owed at each threshold, so every employee is priced with a
+``bisect`` lookup instead of a query.
+"""
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Exists, OuterRef
+
+from .models import TaxBand, TaxTable
+
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+
+@dataclass(frozen=True)
+class CompiledTaxTable:
+	thresholds: tuple
+	rates: tuple
+	base_tax: tuple
+	nssf_employee_rate: Decimal = ZERO
+	nssf_employer_rate: Decimal = ZERO
+	table_id: int | None = None
+
+	def paye(self, taxable: Decimal) -> Decimal:
+		if taxable <= 0:
+			return ZERO
+		index = bisect_right(self.thresholds, taxable) - 1
+		if index < 0:
+			return ZERO
+		tax = self.base_tax[index] + (taxable - self.thresholds[index]) * self.rates[index]
+		return tax.quantize(CENT)
+
+	def paye_many(self, taxable_amounts) -> list:
+		"""PAYE for each amount in ``taxable_amounts``, in order."""
+		return [self.paye(amount) for amount in taxable_amounts]
+
+	def nssf(self, gross: Decimal) -> tuple:
+		"""(employee, employer) NSSF contributions on ``gross``."""
+		if gross <= 0:
+			return ZERO, ZERO
+		return (gross * self.nssf_employee_rate).quantize(CENT), (gross * self.nssf_employer_rate).quantize(CENT)
+
+	def nssf_many(self, gross_amounts) -> list:
+		return [self.nssf(amount) for amount in gross_amounts]
+
+
+def compile_bands(bands, *, nssf_employee_rate=ZERO, nssf_employer_rate=ZERO, table_id=None) -> CompiledTaxTable:
+	"""Compile ``[(lower_bound, rate), ...]`` into a ``CompiledTaxTable``."""
+	bands = sorted((Decimal(lower), Decimal(rate)) for lower, rate in bands)
+	thresholds = []
+	rates = []
+	base_tax = []
+	running = ZERO
+	for index, (lower, rate) in enumerate(bands):
+		if index:
+			previous_lower, previous_rate = bands[index - 1]
+			running += (lower - previous_lower) * previous_rate
+		thresholds.append(lower)
+		rates.append(rate)
+		base_tax.append(running)
+	return CompiledTaxTable(
+		thresholds=tuple(thresholds),
+		rates=tuple(rates),
+		base_tax=tuple(base_tax),
+		nssf_employee_rate=Decimal(nssf_employee_rate),
+		nssf_employer_rate=Decimal(nssf_employer_rate),
+		table_id=table_id,
+	)
+
+
+# Used when no tax table has been configured: the historic flat 10% PAYE.
+FLAT_TAX_TABLE = compile_bands([(ZERO, Decimal('0.10'))])
+
+
+def compile_tax_table(table: TaxTable) -> CompiledTaxTable:
+	return compile_bands(
+		table.bands.values_list('lower_bound', 'rate'),
+		nssf_employee_rate=table.nssf_employee_rate,
+		nssf_employer_rate=table.nssf_employer_rate,
+		table_id=table.pk,
+	)
+
+
+def tax_table_for(month) -> CompiledTaxTable:
+	"""The compiled table in force for the payroll ``month`` (flat 10% if none).
+
+	An active table without bands would tax nothing, so it is skipped as if
+	it were missing.
+	"""
+	month = month.replace(day=1)
+	table = (
+		TaxTable.objects.filter(is_active=True, effective_from__lte=month)
+		.filter(Exists(TaxBand.objects.filter(table=OuterRef('pk'))))
+		.order_by('-effective_from')
+		.first()
+	)
+	if table is None:
+		return FLAT_TAX_TABLE
+	return compile_tax_table(table)
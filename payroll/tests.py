@@ -1,3 +1,1038 @@
-from django.test import TestCase
+import csv
+import json
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, models
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from employees.models import Department, EmployeeProfile
+
+from .analytics import pay_item_totals
+from .costing import department_cost_rollup
+from .documents import render_annual_summary_pdfs, render_payroll_run_pdfs
+from .engine import compute_payroll_run, compute_payslip
+from .imports import ImportFileError, import_pay_items, import_penalties
+from .jobs import enqueue_payroll_job, requeue_stale_jobs
+from .tracking import recompute_dirty_employees
+from .models import EmployeePayItem, PayItemType, PayrollDirtyEmployee, PayrollJob, PayrollRun, PayrollYearToDate, Payslip, PayslipLine, Penalty, SalaryStructure, SalaryStructureVersion, SalaryVoucher, TaxBand, TaxTable
+from .simulation import SimulationError, simulate_payroll
+from .snapshots import lock_payroll_run, payslip_rows
+from .structures import OPEN_START, structure_as_of, structures_for_month
+from .tax import FLAT_TAX_TABLE, compile_bands, tax_table_for
+from .variance import cached_compare_runs, compare_runs
+from .vouchers import clear_vouchers
+from .year_to_date import TOTAL_FIELDS, annual_summary_rows
+
+
+def _payslip_rows(run):
+	rows = {}
+	for ps in Payslip.objects.filter(payroll_run=run).select_related('salary_voucher'):
+		voucher = ps.salary_voucher
+		rows[ps.employee_id] = (
+			ps.basic_salary,
+			ps.allowance_total,
+			ps.deduction_total,
+			ps.penalty_total,
+			ps.gross_pay,
+			ps.tax_amount,
+			ps.net_pay,
+			ps.is_held,
+			voucher.voucher_number,
+			voucher.status,
+			voucher.cleared_by_id,
+			voucher.cleared_at is not None,
+		)
+	return rows
+
+
+def _set_basic_salary(employee, amount, effective_from):
+	structure = SalaryStructure.objects.get(employee=employee)
+	structure.basic_salary = amount
+	structure.effective_from = effective_from
+	structure.save()
+
+
+class PayrollFixtureMixin:
+	month = date(2026, 3, 1)
+
+	def setUp(self):
+		self.admin = User.objects.create_user(username='hradmin', password='Pass12345', role=User.ROLE_HR_MANAGER)
+		self.transport = PayItemType.objects.create(code='transport', name='Transport', kind=PayItemType.KIND_ALLOWANCE)
+		self.loan = PayItemType.objects.create(code='loan', name='Loan', kind=PayItemType.KIND_DEDUCTION)
+		retired = PayItemType.objects.create(code='retired', name='Retired', kind=PayItemType.KIND_ALLOWANCE, is_active=False)
+
+		self.employees = []
+		for idx in range(6):
+			user = User.objects.create_user(username=f'staff{idx}', first_name=f'Staff{idx}')
+			if idx % 2 == 0:
+				EmployeeProfile.objects.create(user=user, employee_id=f'EMP-{idx:03d}', date_hired=date(2025, 1, 1))
+			SalaryStructure.objects.create(
+				employee=user,
+				basic_salary=Decimal('1000000.00') + idx * Decimal('12345.67'),
+				allowances=Decimal('50000.00') if idx % 3 == 0 else Decimal('0.00'),
+				deductions=Decimal('20000.00') if idx % 2 else Decimal('0.00'),
+				is_active=idx != 5,
+			)
+			self.employees.append(user)
+
+		e0, e1, e2, e3, e4, _e5 = self.employees
+		EmployeePayItem.objects.create(employee=e0, item_type=self.transport, amount=Decimal('75000.50'))
+		EmployeePayItem.objects.create(employee=e0, item_type=self.loan, amount=Decimal('30000.00'), start_date=date(2026, 3, 15))
+		EmployeePayItem.objects.create(employee=e1, item_type=self.transport, amount=Decimal('10000.00'), end_date=date(2026, 2, 28))
+		EmployeePayItem.objects.create(employee=e1, item_type=self.transport, amount=Decimal('5000.00'), is_active=False)
+		EmployeePayItem.objects.create(employee=e2, item_type=retired, amount=Decimal('99999.00'))
+		EmployeePayItem.objects.create(employee=e3, item_type=self.loan, amount=Decimal('12500.25'), start_date=date(2026, 1, 1), end_date=date(2026, 6, 30))
+
+		Penalty.objects.create(employee=e0, applies_to_month=self.month, amount=Decimal('5000.00'), reason='Late', status=Penalty.STATUS_CLEARED)
+		Penalty.objects.create(employee=e0, applies_to_month=self.month, amount=Decimal('2500.00'), reason='Late', status=Penalty.STATUS_CLEARED)
+		Penalty.objects.create(employee=e2, applies_to_month=self.month, amount=Decimal('8000.00'), reason='Damage', status=Penalty.STATUS_PENDING)
+		Penalty.objects.create(employee=e3, applies_to_month=self.month, amount=Decimal('4000.00'), reason='Waived', status=Penalty.STATUS_WAIVED)
+		Penalty.objects.create(employee=e4, applies_to_month=date(2026, 4, 1), amount=Decimal('7000.00'), reason='Next month', status=Penalty.STATUS_CLEARED)
+
+		self.run = PayrollRun.objects.create(month=self.month, created_by=self.admin)
+
+	def _compute_per_employee(self):
+		for structure in SalaryStructure.objects.select_related('employee').filter(is_active=True):
+			compute_payslip(self.run, structure.employee, created_by=self.admin)
+
+
+class BulkPayrollEngineTests(PayrollFixtureMixin, TestCase):
+	def test_bulk_engine_matches_per_employee_path(self):
+		self._compute_per_employee()
+		expected = _payslip_rows(self.run)
+		self.assertEqual(len(expected), 5)
+
+		Payslip.objects.filter(payroll_run=self.run).delete()
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.assertEqual(_payslip_rows(self.run), expected)
+
+	def test_bulk_recompute_updates_existing_rows_like_per_employee_path(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		e0, _e1, e2 = self.employees[:3]
+		Penalty.objects.filter(employee=e2).update(status=Penalty.STATUS_CLEARED)
+		EmployeePayItem.objects.create(employee=e0, item_type=self.transport, amount=Decimal('1.01'))
+		_set_basic_salary(e0, Decimal('2000000.00'), self.month)
+
+		compute_payroll_run(self.run, created_by=self.admin)
+		bulk_rows = _payslip_rows(self.run)
+		self._compute_per_employee()
+		self.assertEqual(_payslip_rows(self.run), bulk_rows)
+		self.assertEqual(SalaryVoucher.objects.filter(payslip__payroll_run=self.run).count(), 5)
+
+	def test_bulk_engine_query_count_does_not_grow_with_headcount(self):
+		with CaptureQueriesContext(connection) as ctx:
+			compute_payroll_run(self.run, created_by=self.admin)
+		baseline = len(ctx.captured_queries)
+
+		for idx in range(6, 30):
+			user = User.objects.create_user(username=f'staff{idx}')
+			SalaryStructure.objects.create(employee=user, basic_salary=Decimal('500000.00'))
+			EmployeePayItem.objects.create(employee=user, item_type=self.transport, amount=Decimal('1000.00'))
+		Payslip.objects.filter(payroll_run=self.run).delete()
+
+		with CaptureQueriesContext(connection) as ctx:
+			compute_payroll_run(self.run, created_by=self.admin)
+		self.assertEqual(len(ctx.captured_queries), baseline)
+		self.assertEqual(Payslip.objects.filter(payroll_run=self.run).count(), 29)
+
+	def test_create_view_generates_payslips(self):
+		self.run.delete()
+		self.client.force_login(self.admin)
+		response = self.client.post(reverse('payroll:create'), {'month': '2026-03-10'})
+		self.assertEqual(response.status_code, 302)
+		run = PayrollRun.objects.get()
+		self.assertEqual(run.month, self.month)
+		self.assertEqual(run.payslips.count(), 5)
+
+
+@override_settings(PAYROLL_BACKGROUND_JOBS=True, PAYROLL_JOB_CHUNK_SIZE=2)
+class PayrollBackgroundJobTests(PayrollFixtureMixin, TestCase):
+	def test_create_view_queues_job_and_worker_completes_it(self):
+		self.run.delete()
+		self.client.force_login(self.admin)
+		response = self.client.post(reverse('payroll:create'), {'month': '2026-03-01'})
+		run = PayrollRun.objects.get()
+		self.assertRedirects(response, reverse('payroll:detail', args=[run.pk]))
+		self.assertEqual(run.payslips.count(), 0)
+
+		progress_url = reverse('payroll:run_progress', args=[run.pk])
+		self.assertEqual(self.client.get(progress_url).json()['status'], PayrollJob.STATUS_QUEUED)
+
+		call_command('payroll_worker', '--once', stdout=StringIO())
+
+		data = self.client.get(progress_url).json()
+		self.assertEqual(data['status'], PayrollJob.STATUS_DONE)
+		self.assertEqual((data['processed'], data['total'], data['percent']), (5, 5, 100))
+		self.assertEqual(run.payslips.count(), 5)
+
+	def test_failed_job_records_error(self):
+		self.run.locked = True
+		self.run.save(update_fields=['locked'])
+		job = PayrollJob.objects.create(payroll_run=self.run)
+		call_command('payroll_worker', '--once', stdout=StringIO())
+		job.refresh_from_db()
+		self.assertEqual(job.status, PayrollJob.STATUS_FAILED)
+		self.assertIn('locked', job.error)
+		self.assertEqual(self.run.payslips.count(), 0)
+
+	def test_stale_running_job_is_requeued(self):
+		job = PayrollJob.objects.create(
+			payroll_run=self.run,
+			status=PayrollJob.STATUS_RUNNING,
+			heartbeat_at=timezone.now() - timedelta(hours=1),
+		)
+		self.assertEqual(requeue_stale_jobs(), 1)
+		job.refresh_from_db()
+		self.assertEqual(job.status, PayrollJob.STATUS_QUEUED)
+
+
+class PayrollDirtyTrackingTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.locked_run = PayrollRun.objects.create(month=date(2026, 2, 1), locked=True)
+		self.later_run = PayrollRun.objects.create(month=date(2026, 5, 1))
+
+	def _dirty(self, run):
+		return set(PayrollDirtyEmployee.objects.filter(payroll_run=run).values_list('employee_id', flat=True))
+
+	def test_changes_mark_only_affected_unlocked_runs(self):
+		e0, e1, e2 = self.employees[:3]
+		EmployeePayItem.objects.create(employee=e1, item_type=self.transport, amount=Decimal('100.00'), end_date=date(2026, 3, 31))
+		Penalty.objects.create(employee=e2, applies_to_month=date(2026, 5, 1), amount=Decimal('10.00'), reason='Late')
+		structure = SalaryStructure.objects.get(employee=e0)
+		structure.basic_salary = Decimal('1.00')
+		structure.effective_from = self.month
+		structure.save()
+
+		self.assertEqual(self._dirty(self.run), {e0.pk, e1.pk})
+		self.assertEqual(self._dirty(self.later_run), {e0.pk, e2.pk})
+		self.assertEqual(self._dirty(self.locked_run), set())
+
+	def test_moving_a_penalty_dirties_old_and_new_month(self):
+		e0 = self.employees[0]
+		penalty = Penalty.objects.filter(employee=e0, applies_to_month=self.month).first()
+		penalty.applies_to_month = date(2026, 5, 1)
+		penalty.save()
+		self.assertEqual(self._dirty(self.run), {e0.pk})
+		self.assertEqual(self._dirty(self.later_run), {e0.pk})
+
+	def test_recompute_dirty_updates_only_marked_payslips(self):
+		e0, e1 = self.employees[:2]
+		SalaryStructure.objects.filter(employee=e1).update(basic_salary=Decimal('5.00'))
+		item = EmployeePayItem.objects.get(employee=e0, item_type=self.transport)
+		item.amount = Decimal('80000.50')
+		item.save()
+
+		self.assertEqual(recompute_dirty_employees(self.run, created_by=self.admin), 1)
+		self.assertEqual(self._dirty(self.run), set())
+		self.assertEqual(Payslip.objects.get(payroll_run=self.run, employee=e0).allowance_total, Decimal('130000.50'))
+		# e1's structure changed via queryset update (no signal), so it was not recomputed.
+		self.assertNotEqual(Payslip.objects.get(payroll_run=self.run, employee=e1).basic_salary, Decimal('5.00'))
+
+	def test_employee_without_salary_loses_payslip_before_lock(self):
+		e0 = self.employees[0]
+		current = PayrollRun.objects.create(month=timezone.localdate().replace(day=1))
+		compute_payroll_run(current, created_by=self.admin)
+		self.assertTrue(Payslip.objects.filter(payroll_run=current, employee=e0).exists())
+
+		structure = SalaryStructure.objects.get(employee=e0)
+		structure.is_active = False
+		structure.save()
+		self.assertIn(e0.pk, self._dirty(current))
+
+		lock_payroll_run(current, locked_by=self.admin)
+		self.assertFalse(Payslip.objects.filter(payroll_run=current, employee=e0).exists())
+		self.assertFalse(SalaryVoucher.objects.filter(payslip__payroll_run=current, payslip__employee=e0).exists())
+		self.assertNotIn(e0.pk, {row['employee_id'] for row in payslip_rows(current)})
+		# Earlier months still pay the salary that was in force then.
+		self.assertTrue(Payslip.objects.filter(payroll_run=self.run, employee=e0).exists())
+		self.assertEqual(PayrollYearToDate.objects.get(employee=e0, year=current.month.year).payslip_count, 1)
+
+	def test_recompute_view_honours_locked_run(self):
+		PayrollDirtyEmployee.objects.create(payroll_run=self.locked_run, employee=self.employees[0], reason=PayrollDirtyEmployee.REASON_PENALTY)
+		self.client.force_login(self.admin)
+		self.client.post(reverse('payroll:recompute_dirty', args=[self.locked_run.pk]))
+		self.assertEqual(self._dirty(self.locked_run), {self.employees[0].pk})
+		self.assertFalse(Payslip.objects.filter(payroll_run=self.locked_run).exists())
+
+	def test_deleting_employee_does_not_mark_dirty(self):
+		self.employees[0].delete()
+		self.assertEqual(self._dirty(self.run), set())
+
+
+class PayslipPdfTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		media_override = override_settings(MEDIA_ROOT=self.media_root)
+		media_override.enable()
+		self.addCleanup(media_override.disable)
+		super().setUp()
+		compute_payroll_run(self.run, created_by=self.admin)
+
+	def test_render_stores_pdfs_and_skips_unchanged(self):
+		result = render_payroll_run_pdfs(self.run, workers=1)
+		self.assertEqual(result, {'total': 5, 'rendered': 5, 'skipped': 0})
+		payslip = Payslip.objects.get(payroll_run=self.run, employee=self.employees[0])
+		self.assertTrue(payslip.pdf_hash)
+		with payslip.pdf_file.open('rb') as fh:
+			self.assertTrue(fh.read().startswith(b'%PDF'))
+
+		self.assertEqual(render_payroll_run_pdfs(self.run, workers=1)['rendered'], 0)
+
+		Payslip.objects.filter(pk=payslip.pk).update(net_pay=Decimal('1.00'))
+		result = render_payroll_run_pdfs(self.run, workers=1)
+		self.assertEqual((result['rendered'], result['skipped']), (1, 4))
+		self.assertEqual(render_payroll_run_pdfs(self.run, workers=1, force=True)['rendered'], 5)
+
+	def test_single_payslip_render_reads_only_that_payslip(self):
+		payslip = Payslip.objects.get(payroll_run=self.run, employee=self.employees[0])
+		with CaptureQueriesContext(connection) as ctx:
+			result = render_payroll_run_pdfs(self.run, payslip_ids=[payslip.pk], workers=1)
+		self.assertEqual(result, {'total': 1, 'rendered': 1, 'skipped': 0})
+		# Every read of payslips or their lines is limited to the requested id.
+		reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'FROM "payroll_payslip' in q['sql']]
+		self.assertTrue(reads)
+		self.assertTrue(all(' IN (' in sql for sql in reads), reads)
+		row = payslip_rows(self.run, payslip_ids=[payslip.pk])
+		self.assertEqual([r['payslip_id'] for r in row], [payslip.pk])
+		self.assertEqual(len(row[0]['items']), 3)
+
+	def test_render_job_reports_progress(self):
+		job = enqueue_payroll_job(self.run, kind=PayrollJob.KIND_RENDER_PDFS, requested_by=self.admin)
+		job.refresh_from_db()
+		self.assertEqual(job.status, PayrollJob.STATUS_DONE)
+		self.assertEqual((job.processed_count, job.total_count), (5, 5))
+		self.assertEqual(Payslip.objects.filter(payroll_run=self.run).exclude(pdf_hash='').count(), 5)
+
+	def test_zip_download_streams_every_pdf(self):
+		self.client.force_login(self.admin)
+		response = self.client.get(reverse('payroll:payslips_zip', args=[self.run.pk]))
+		self.assertRedirects(response, reverse('payroll:detail', args=[self.run.pk]), fetch_redirect_response=False)
+
+		render_payroll_run_pdfs(self.run, workers=1)
+		response = self.client.get(reverse('payroll:payslips_zip', args=[self.run.pk]))
+		self.assertTrue(response.streaming)
+		archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+		self.assertIsNone(archive.testzip())
+		names = archive.namelist()
+		self.assertEqual(len(names), 5)
+		self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in names))
+
+	def test_single_payslip_pdf_renders_on_demand(self):
+		payslip = Payslip.objects.get(payroll_run=self.run, employee=self.employees[1])
+		self.client.force_login(self.admin)
+		response = self.client.get(reverse('payroll:payslip_pdf', args=[payslip.pk]))
+		self.assertEqual(response['Content-Type'], 'application/pdf')
+		self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+		response.close()
+		payslip.refresh_from_db()
+		self.assertTrue(payslip.pdf_hash)
+
+
+class ClearedExportTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		profile = EmployeeProfile.objects.get(user=self.employees[0])
+		profile.bank_name = 'Stanbic'
+		profile.bank_account_number = '9030001'
+		profile.save()
+		compute_payroll_run(self.run, created_by=self.admin)
+		SalaryVoucher.objects.filter(payslip__payroll_run=self.run).update(status=SalaryVoucher.STATUS_CLEARED)
+		SalaryVoucher.objects.filter(payslip__payroll_run=self.run, payslip__employee=self.employees[1]).update(status=SalaryVoucher.STATUS_ON_HOLD)
+		self.client.force_login(self.admin)
+
+	def _export(self, export_format=None):
+		url = reverse('payroll:export_cleared_csv', args=[self.run.pk])
+		response = self.client.get(url, {'format': export_format} if export_format else {})
+		self.assertTrue(response.streaming)
+		return response, b''.join(response.streaming_content).decode('utf-8')
+
+	def test_csv_streams_cleared_rows_in_one_query(self):
+		with CaptureQueriesContext(connection) as ctx:
+			response, body = self._export()
+		self.assertEqual(response['Content-Type'], 'text/csv')
+		rows = list(csv.reader(StringIO(body)))
+		self.assertEqual(rows[0][0], 'Employee')
+		self.assertEqual(len(rows), 5)
+		self.assertNotIn('Staff1', body)
+		net_pay = Payslip.objects.get(payroll_run=self.run, employee=self.employees[0]).net_pay
+		self.assertEqual(rows[1], ['Staff0', 'EMP-000', 'Stanbic', '9030001', '', str(net_pay), rows[1][6]])
+		export_queries = [q for q in ctx.captured_queries if 'payroll_payslip' in q['sql']]
+		self.assertEqual(len(export_queries), 1)
+
+	def test_tsv_and_fixed_width_formats(self):
+		response, body = self._export('tsv')
+		self.assertEqual(response['Content-Type'], 'text/tab-separated-values')
+		self.assertEqual(body.splitlines()[1].split('\t')[:4], ['Staff0', 'EMP-000', 'Stanbic', '9030001'])
+
+		response, body = self._export('fixed')
+		self.assertIn('.txt', response['Content-Disposition'])
+		lines = body.split('\r\n')[:-1]
+		self.assertEqual(len(lines), 5)
+		self.assertEqual({len(line) for line in lines}, {204})
+
+	def test_unknown_format_is_404(self):
+		response = self.client.get(reverse('payroll:export_cleared_csv', args=[self.run.pk]), {'format': 'xlsx'})
+		self.assertEqual(response.status_code, 404)
+
+
+class TaxTableTests(PayrollFixtureMixin, TestCase):
+	def _table(self, effective_from, **kwargs):
+		table = TaxTable.objects.create(name='PAYE', effective_from=effective_from, **kwargs)
+		for lower, rate in [('0', '0'), ('235000', '0.10'), ('335000', '0.20'), ('410000', '0.30')]:
+			TaxBand.objects.create(table=table, lower_bound=Decimal(lower), rate=Decimal(rate))
+		return table
+
+	def test_progressive_bands_are_marginal(self):
+		compiled = compile_bands([(Decimal('410000'), Decimal('0.30')), (Decimal('0'), Decimal('0')), (Decimal('235000'), Decimal('0.10')), (Decimal('335000'), Decimal('0.20'))])
+		amounts = [Decimal('-5'), Decimal('200000'), Decimal('235000'), Decimal('300000'), Decimal('410000'), Decimal('1000000.55')]
+		self.assertEqual(
+			compiled.paye_many(amounts),
+			[Decimal('0.00'), Decimal('0.00'), Decimal('0.00'), Decimal('6500.00'), Decimal('25000.00'), Decimal('202000.16')],
+		)
+		self.assertEqual(FLAT_TAX_TABLE.paye(Decimal('1234.56')), Decimal('123.46'))
+
+	def test_table_selected_by_effective_date(self):
+		self.assertIs(tax_table_for(self.month), FLAT_TAX_TABLE)
+		table = self._table(date(2026, 1, 1))
+		self._table(date(2026, 4, 1))
+		self.assertEqual(tax_table_for(self.month).table_id, table.pk)
+
+	def test_table_without_bands_is_skipped(self):
+		TaxTable.objects.create(name='Draft', effective_from=date(2026, 2, 1))
+		self.assertIs(tax_table_for(self.month), FLAT_TAX_TABLE)
+		table = self._table(date(2026, 1, 1))
+		self.assertEqual(tax_table_for(self.month).table_id, table.pk)
+
+	def test_bulk_and_per_employee_paths_use_table(self):
+		self._table(date(2026, 1, 1), nssf_employee_rate=Decimal('0.05'), nssf_employer_rate=Decimal('0.10'))
+		compute_payroll_run(self.run, created_by=self.admin)
+		bulk = {ps.employee_id: (ps.tax_amount, ps.nssf_employee, ps.nssf_employer, ps.net_pay) for ps in Payslip.objects.filter(payroll_run=self.run)}
+		self._compute_per_employee()
+		single = {ps.employee_id: (ps.tax_amount, ps.nssf_employee, ps.nssf_employer, ps.net_pay) for ps in Payslip.objects.filter(payroll_run=self.run)}
+		self.assertEqual(bulk, single)
+
+		payslip = Payslip.objects.get(payroll_run=self.run, employee=self.employees[1])
+		taxable = payslip.gross_pay - payslip.deduction_total - payslip.penalty_total
+		self.assertEqual(payslip.tax_amount, (Decimal('25000') + (taxable - Decimal('410000')) * Decimal('0.30')).quantize(Decimal('0.01')))
+		self.assertEqual(payslip.nssf_employee, (payslip.gross_pay * Decimal('0.05')).quantize(Decimal('0.01')))
+		self.assertEqual(payslip.nssf_employer, (payslip.gross_pay * Decimal('0.10')).quantize(Decimal('0.01')))
+		self.assertEqual(payslip.net_pay, taxable - payslip.tax_amount - payslip.nssf_employee)
+
+
+class PayrollSimulationTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		self.sales = Department.objects.create(name='Sales')
+		EmployeeProfile.objects.filter(user__in=self.employees[:3]).update(department=self.sales)
+
+	def test_simulation_reports_deltas_without_writing(self):
+		e0, e1, e2 = self.employees[:3]
+		overrides = {
+			'salary_changes': [{'department_id': self.sales.pk, 'percent': '10'}],
+			'pay_items': [{'employee_id': e1.pk, 'kind': 'ALLOWANCE', 'amount': '1000'}],
+			'penalties': [{'employee_id': self.employees[3].pk, 'amount': '500'}],
+		}
+		with CaptureQueriesContext(connection) as ctx:
+			result = simulate_payroll(self.month, overrides)
+		self.assertFalse([q for q in ctx.captured_queries if not q['sql'].lstrip().upper().startswith('SELECT')])
+		self.assertFalse(Payslip.objects.exists())
+
+		self.assertEqual(result['headcount'], 5)
+		changed = {row['employee_id']: row for row in result['employees']}
+		self.assertEqual(set(changed), {e0.pk, e2.pk, e1.pk, self.employees[3].pk})
+		basic = SalaryStructure.objects.get(employee=e0).basic_salary
+		self.assertEqual(changed[e0.pk]['delta']['gross_pay'], (basic * Decimal('0.10')).quantize(Decimal('0.01')))
+		self.assertEqual(changed[e1.pk]['delta']['gross_pay'], Decimal('1000'))
+		self.assertEqual(changed[self.employees[3].pk]['delta']['gross_pay'], Decimal('0'))
+		self.assertEqual(changed[self.employees[3].pk]['delta']['net_pay'], Decimal('-450.00'))
+
+		departments = {row['department']: row for row in result['departments']}
+		self.assertEqual(departments['Sales']['headcount'], 2)
+		self.assertEqual(departments['Unassigned']['headcount'], 3)
+		total_delta = sum((row['delta']['employer_cost'] for row in result['departments']), Decimal('0'))
+		self.assertEqual(total_delta, result['totals']['delta']['employer_cost'])
+
+	def test_baseline_matches_computed_run(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		result = simulate_payroll(self.month)
+		self.assertEqual(result['employees'], [])
+		self.assertEqual(result['totals']['baseline']['net_pay'], sum(Payslip.objects.values_list('net_pay', flat=True)))
+
+	def test_invalid_override_is_rejected(self):
+		with self.assertRaises(SimulationError):
+			simulate_payroll(self.month, {'pay_items': [{'employee_id': self.employees[5].pk, 'amount': '10'}]})
+		with self.assertRaises(SimulationError):
+			simulate_payroll(self.month, {'penalties': [{'employee_id': self.employees[0].pk, 'amount': 'abc'}]})
+
+	def test_api_and_page(self):
+		self.client.force_login(self.admin)
+		self.assertEqual(self.client.get(reverse('payroll:simulate')).status_code, 200)
+		url = reverse('payroll:simulate_api')
+		response = self.client.post(url, {'month': '2026-03', 'overrides': {'salary_changes': [{'employee_id': self.employees[0].pk, 'basic_salary': '2000000'}]}}, content_type='application/json')
+		data = response.json()
+		self.assertTrue(data['ok'])
+		self.assertEqual(len(data['employees']), 1)
+		response = self.client.post(url, {'month': 'March'}, content_type='application/json')
+		self.assertEqual(response.status_code, 400)
+
+	def test_malformed_overrides_are_a_400(self):
+		self.client.force_login(self.admin)
+		url = reverse('payroll:simulate_api')
+		pk = self.employees[0].pk
+		for overrides in (
+			{'pay_items': ['not-an-object']},
+			{'pay_items': {'employee_id': pk}},
+			{'salary_changes': [5]},
+			{'penalties': [{'employee_id': pk, 'amount': {'nested': 1}}]},
+			{'pay_items': [{'employee_id': [pk], 'amount': '10'}]},
+			{'salary_changes': [{'employee_id': pk, 'percent': '1e30'}]},
+			{'salary_changes': [{'employee_id': pk, 'basic_salary': 'NaN'}]},
+		):
+			response = self.client.post(url, {'month': '2026-03', 'overrides': overrides}, content_type='application/json')
+			self.assertEqual(response.status_code, 400, overrides)
+			self.assertFalse(response.json()['ok'])
+
+
+class PayrollVarianceTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		cache.clear()
+		super().setUp()
+		self.previous = PayrollRun.objects.create(month=date(2026, 2, 1), created_by=self.admin)
+		compute_payroll_run(self.previous, created_by=self.admin)
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.run.refresh_from_db()
+		self.previous.refresh_from_db()
+
+	def test_flags_new_missing_swings_and_penalties(self):
+		e0, e1, e2, e3 = self.employees[:4]
+		Payslip.objects.filter(payroll_run=self.previous, employee=e3).delete()
+		Payslip.objects.filter(payroll_run=self.run, employee=e1).delete()
+		Payslip.objects.filter(payroll_run=self.run, employee=e2).update(net_pay=models.F('net_pay') * 2)
+
+		with self.assertNumQueries(2):
+			result = compare_runs(self.run, self.previous, threshold_percent=10)
+		self.assertEqual([row['employee_id'] for row in result['new_employees']], [e3.pk])
+		self.assertEqual([row['employee_id'] for row in result['missing_employees']], [e1.pk])
+		# e0 has cleared penalties and e2 a pending one this month only.
+		self.assertEqual({row['employee_id'] for row in result['new_penalties']}, {e0.pk, e2.pk})
+		swings = {row['employee_id']: row for row in result['net_swings']}
+		self.assertIn(e2.pk, swings)
+		self.assertEqual(swings[e2.pk]['percent'], Decimal('100.0'))
+		self.assertNotIn(self.employees[4].pk, swings)
+
+	def test_cache_is_invalidated_when_payslips_change(self):
+		first = cached_compare_runs(self.run, self.previous)
+		with self.assertNumQueries(0):
+			self.assertEqual(cached_compare_runs(self.run, self.previous), first)
+
+		revision = self.run.revision
+		_set_basic_salary(self.employees[4], Decimal('1.00'), self.run.month)
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.run.refresh_from_db()
+		self.assertGreater(self.run.revision, revision)
+		second = cached_compare_runs(self.run, self.previous)
+		self.assertIn(self.employees[4].pk, {row['employee_id'] for row in second['net_swings']})
+
+		payslip = Payslip.objects.get(payroll_run=self.previous, employee=self.employees[4])
+		payslip.net_pay = Decimal('1.00')
+		payslip.save()
+		self.previous.refresh_from_db()
+		self.assertNotEqual(cached_compare_runs(self.run, self.previous), second)
+
+	def test_variance_view_defaults_to_previous_run(self):
+		self.client.force_login(self.admin)
+		response = self.client.get(reverse('payroll:variance', args=[self.run.pk]))
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.context['previous'], self.previous)
+		response = self.client.get(reverse('payroll:variance', args=[self.previous.pk]), {'threshold': 'x'})
+		self.assertIsNone(response.context['previous'])
+
+
+class CostCentreRollupTests(PayrollFixtureMixin, TestCase):
+	def test_rollup_aggregates_subtrees_against_budget(self):
+		root = Department.objects.create(name='Head Office', budget_allocation=Decimal('10000000.00'))
+		ops = Department.objects.create(name='Operations', parent=root, budget_allocation=Decimal('1000.00'))
+		field = Department.objects.create(name='Field', parent=ops)
+		EmployeeProfile.objects.filter(user=self.employees[0]).update(department=root)
+		EmployeeProfile.objects.filter(user=self.employees[2]).update(department=field)
+		compute_payroll_run(self.run, created_by=self.admin)
+		payslips = {ps.employee_id: ps for ps in Payslip.objects.filter(payroll_run=self.run)}
+		e0, e2 = payslips[self.employees[0].pk], payslips[self.employees[2].pk]
+
+		with self.assertNumQueries(4):
+			rollup = department_cost_rollup(self.run)
+		rows = {row['department'].name: row for row in rollup['departments']}
+		self.assertEqual([row['department'].name for row in rollup['departments']], ['Head Office', 'Operations', 'Field'])
+		self.assertEqual([row['level'] for row in rollup['departments']], [0, 1, 2])
+		self.assertEqual(rows['Head Office']['subtree']['gross'], e0.gross_pay + e2.gross_pay)
+		self.assertEqual(rows['Head Office']['own']['headcount'], 1)
+		self.assertEqual(rows['Operations']['subtree']['net'], e2.net_pay)
+		self.assertEqual(rows['Operations']['own']['headcount'], 0)
+		self.assertLess(rows['Operations']['variance'], 0)
+		self.assertEqual(rollup['unassigned']['headcount'], 3)
+		self.assertEqual(rollup['totals']['headcount'], 5)
+
+		self.client.force_login(self.admin)
+		self.assertContains(self.client.get(reverse('payroll:cost_centres', args=[self.run.pk])), 'Operations')
+
+
+class PayrollSnapshotTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		media_override = override_settings(MEDIA_ROOT=self.media_root)
+		media_override.enable()
+		self.addCleanup(media_override.disable)
+
+		profile = EmployeeProfile.objects.get(user=self.employees[0])
+		profile.bank_name = 'Stanbic'
+		profile.bank_account_number = '9030001'
+		profile.save()
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.client.force_login(self.admin)
+
+	def _edit_live_data(self):
+		EmployeeProfile.objects.filter(user=self.employees[0]).update(bank_name='Centenary', bank_account_number='111')
+		User.objects.filter(pk=self.employees[0].pk).update(first_name='Renamed')
+
+	def test_lock_view_freezes_rows_with_item_breakdown(self):
+		self.client.post(reverse('payroll:lock', args=[self.run.pk]))
+		self.run.refresh_from_db()
+		self.assertTrue(self.run.locked)
+		self.assertEqual(self.run.snapshot.payslip_count, 5)
+
+		self._edit_live_data()
+		with self.assertNumQueries(1):
+			rows = payslip_rows(self.run)
+		row = next(row for row in rows if row['employee_id'] == self.employees[0].pk)
+		self.assertEqual((row['name'], row['bank_name'], row['bank_account_number']), ('Staff0', 'Stanbic', '9030001'))
+		self.assertEqual(
+			[(name, amount) for _code, name, _kind, amount in row['items']],
+			[('Allowances (salary structure)', Decimal('50000.00')), ('Transport', Decimal('75000.50')), ('Loan', Decimal('30000.00'))],
+		)
+		self.assertEqual(row['net_pay'], Payslip.objects.get(pk=row['payslip_id']).net_pay)
+
+		response = self.client.get(reverse('payroll:detail', args=[self.run.pk]))
+		self.assertContains(response, 'Staff0')
+		self.assertNotContains(response, 'Renamed')
+		self.assertNotContains(response, 'Clear Voucher')
+
+	def test_lock_recomputes_dirty_employees_before_freezing(self):
+		Penalty.objects.create(employee=self.employees[1], applies_to_month=self.month, amount=Decimal('9000.00'), reason='Late', status=Penalty.STATUS_CLEARED)
+		self.assertTrue(PayrollDirtyEmployee.objects.filter(payroll_run=self.run, employee=self.employees[1]).exists())
+		stale = Payslip.objects.get(payroll_run=self.run, employee=self.employees[1])
+
+		self.client.post(reverse('payroll:lock', args=[self.run.pk]))
+		self.run.refresh_from_db()
+		self.assertTrue(self.run.locked)
+		self.assertFalse(PayrollDirtyEmployee.objects.filter(payroll_run=self.run).exists())
+		row = next(row for row in payslip_rows(self.run) if row['employee_id'] == self.employees[1].pk)
+		self.assertEqual(row['penalty_total'], Decimal('9000.00'))
+		self.assertLess(row['net_pay'], stale.net_pay)
+		self.assertEqual(row['net_pay'], Payslip.objects.get(pk=row['payslip_id']).net_pay)
+
+	def test_locked_export_ignores_later_bank_edits(self):
+		lock_payroll_run(self.run, locked_by=self.admin)
+		self._edit_live_data()
+		response = self.client.get(reverse('payroll:export_cleared_csv', args=[self.run.pk]))
+		body = b''.join(response.streaming_content).decode('utf-8')
+		self.assertIn('Stanbic', body)
+		self.assertNotIn('Centenary', body)
+
+	def test_unlocked_run_reads_live_data(self):
+		self._edit_live_data()
+		row = next(row for row in payslip_rows(self.run) if row['employee_id'] == self.employees[0].pk)
+		self.assertEqual(row['bank_name'], 'Centenary')
+
+	def test_locked_pdfs_do_not_rerender_after_live_edits(self):
+		lock_payroll_run(self.run, locked_by=self.admin)
+		self.assertEqual(render_payroll_run_pdfs(self.run, workers=1)['rendered'], 5)
+		self._edit_live_data()
+		self.assertEqual(render_payroll_run_pdfs(self.run, workers=1)['rendered'], 0)
+
+
+class PayslipLineTests(PayrollFixtureMixin, TestCase):
+	def _lines(self, run):
+		lines = PayslipLine.objects.filter(payroll_run=run).values_list('payslip__employee_id', 'item_type_id', 'name', 'kind', 'amount')
+		return sorted(lines, key=lambda line: (line[0], line[1] or 0, line[2]))
+
+	def test_bulk_and_per_employee_paths_write_same_lines(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		bulk = self._lines(self.run)
+		self.assertIn((self.employees[0].pk, self.transport.pk, 'Transport', 'ALLOWANCE', Decimal('75000.50')), bulk)
+		self.assertIn((self.employees[0].pk, None, 'Allowances (salary structure)', 'ALLOWANCE', Decimal('50000.00')), bulk)
+
+		self._compute_per_employee()
+		self.assertEqual(self._lines(self.run), bulk)
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.assertEqual(self._lines(self.run), bulk)
+
+		for payslip in Payslip.objects.filter(payroll_run=self.run).prefetch_related('lines'):
+			allowances = sum((line.amount for line in payslip.lines.all() if line.kind == 'ALLOWANCE'), Decimal('0'))
+			self.assertEqual(allowances, payslip.allowance_total)
+
+	def test_pay_item_totals_group_by_item_and_month(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		april = PayrollRun.objects.create(month=date(2026, 4, 1))
+		compute_payroll_run(april, created_by=self.admin)
+		# Editing the pay item afterwards must not change what was already paid.
+		EmployeePayItem.objects.filter(employee=self.employees[0], item_type=self.transport).update(amount=Decimal('1.00'))
+
+		with self.assertNumQueries(1):
+			rows = pay_item_totals(2026)
+		transport = next(row for row in rows if row['name'] == 'Transport')
+		self.assertEqual(transport['months'][2], Decimal('75000.50'))
+		self.assertEqual(transport['months'][3], Decimal('75000.50'))
+		self.assertEqual(transport['total'], Decimal('150001.00'))
+		self.assertEqual({row['kind'] for row in pay_item_totals(2026, kind='DEDUCTION')}, {'DEDUCTION'})
+
+		self.client.force_login(self.admin)
+		self.assertContains(self.client.get(reverse('payroll:pay_item_analytics'), {'year': 2026}), 'Transport')
+		current = timezone.localdate().year
+		for year in ('0', '10000', '99999999999999999999'):
+			for name in ('payroll:pay_item_analytics', 'payroll:annual_summary'):
+				response = self.client.get(reverse(name), {'year': year})
+				self.assertEqual(response.status_code, 200)
+				self.assertEqual(response.context['year'], current)
+
+
+class PayrollYearToDateTests(PayrollFixtureMixin, TestCase):
+	def _expected(self, year=2026):
+		totals = (
+			Payslip.objects.filter(payroll_run__month__year=year)
+			.values('employee_id')
+			.annotate(payslip_count=models.Count('id'), **{field: models.Sum(field) for field in TOTAL_FIELDS})
+		)
+		return {row.pop('employee_id'): row for row in totals}
+
+	def _accumulated(self, year=2026):
+		return {
+			row.pop('employee_id'): row
+			for row in PayrollYearToDate.objects.filter(year=year).values('employee_id', 'payslip_count', *TOTAL_FIELDS)
+		}
+
+	def test_accumulator_follows_payslip_writes(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		april = PayrollRun.objects.create(month=date(2026, 4, 1))
+		compute_payroll_run(april, created_by=self.admin)
+		self.assertEqual(self._accumulated(), self._expected())
+		self.assertEqual(self._accumulated()[self.employees[0].pk]['payslip_count'], 2)
+
+		# Per-employee recompute goes through the Payslip signals.
+		_set_basic_salary(self.employees[0], Decimal('3000000.00'), april.month)
+		compute_payslip(april, self.employees[0], created_by=self.admin)
+		Payslip.objects.get(payroll_run=self.run, employee=self.employees[1]).delete()
+		self.assertEqual(self._accumulated(), self._expected())
+
+		april.delete()
+		self.assertEqual(self._accumulated(), self._expected())
+		self.assertEqual(self._accumulated()[self.employees[0].pk]['payslip_count'], 1)
+		self.assertNotIn(self.employees[1].pk, self._accumulated())
+
+	def test_rebuild_command_restores_totals(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		expected = self._accumulated()
+		PayrollYearToDate.objects.filter(employee=self.employees[0]).update(gross_pay=Decimal('1.00'))
+		PayrollYearToDate.objects.create(employee=self.employees[5], year=2026, gross_pay=Decimal('9.00'))
+
+		call_command('rebuild_payroll_ytd', stdout=StringIO())
+		self.assertEqual(self._accumulated(), expected)
+
+	def test_annual_summary_exports_read_accumulator(self):
+		compute_payroll_run(self.run, created_by=self.admin)
+		EmployeeProfile.objects.filter(user=self.employees[0]).update(tin='TIN-0')
+
+		with self.assertNumQueries(1):
+			rows = list(annual_summary_rows(2026))
+		self.assertEqual(len(rows), 5)
+		first = next(row for row in rows if row[1] == 'EMP-000')
+		payslip = Payslip.objects.get(payroll_run=self.run, employee=self.employees[0])
+		self.assertEqual(first[2], 'TIN-0')
+		self.assertEqual(first[5], payslip.gross_pay)
+		self.assertEqual(first[-1], payslip.net_pay)
+
+		self.client.force_login(self.admin)
+		response = self.client.get(reverse('payroll:annual_summary_export', args=[2026]), {'format': 'csv'})
+		lines = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+		self.assertEqual(lines[0][0], 'Employee')
+		self.assertEqual(len(lines), 6)
+
+		batches = list(render_annual_summary_pdfs(2026, batch_size=2, workers=1))
+		self.assertEqual([name for name, _pdf in batches], ['annual_summary_2026_001.pdf', 'annual_summary_2026_002.pdf', 'annual_summary_2026_003.pdf'])
+		self.assertTrue(all(pdf.startswith(b'%PDF') for _name, pdf in batches))
+
+		# Web requests render in-process rather than forking a pool.
+		with mock.patch('payroll.views.render_annual_summary_pdfs', wraps=render_annual_summary_pdfs) as render:
+			response = self.client.get(reverse('payroll:annual_summary_export', args=[2026]), {'format': 'pdf'})
+			archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+		render.assert_called_once_with(2026, workers=1)
+		self.assertEqual(archive.namelist(), ['annual_summary_2026_001.pdf'])
+		self.assertEqual(self.client.get(reverse('payroll:annual_summary'), {'year': 2026}).status_code, 200)
+
+
+class SalaryStructureVersionTests(PayrollFixtureMixin, TestCase):
+	def _raise(self, employee, amount, effective_from):
+		structure = SalaryStructure.objects.get(employee=employee)
+		structure.basic_salary = amount
+		structure.effective_from = effective_from
+		structure.save()
+
+	def test_raise_keeps_earlier_months_on_previous_salary(self):
+		e0 = self.employees[0]
+		old_salary = SalaryStructure.objects.get(employee=e0).basic_salary
+		may = PayrollRun.objects.create(month=date(2026, 5, 1))
+		self._raise(e0, Decimal('2500000.00'), date(2026, 5, 1))
+
+		self.assertEqual(SalaryStructureVersion.objects.filter(employee=e0).count(), 2)
+		self.assertEqual(structure_as_of(e0.pk, date(2026, 4, 30)).effective_from, OPEN_START)
+
+		compute_payroll_run(self.run, created_by=self.admin)
+		compute_payroll_run(may, created_by=self.admin)
+		self.assertEqual(Payslip.objects.get(payroll_run=self.run, employee=e0).basic_salary, old_salary)
+		self.assertEqual(Payslip.objects.get(payroll_run=may, employee=e0).basic_salary, Decimal('2500000.00'))
+
+		compute_payslip(self.run, e0, created_by=self.admin)
+		self.assertEqual(Payslip.objects.get(payroll_run=self.run, employee=e0).basic_salary, old_salary)
+
+	def test_only_runs_from_effective_date_are_marked_dirty(self):
+		may = PayrollRun.objects.create(month=date(2026, 5, 1))
+		self._raise(self.employees[0], Decimal('2500000.00'), date(2026, 5, 1))
+		dirty = set(PayrollDirtyEmployee.objects.values_list('payroll_run_id', 'employee_id'))
+		self.assertEqual(dirty, {(may.pk, self.employees[0].pk)})
+
+	def test_month_resolution_is_one_query_and_honours_dates(self):
+		late = User.objects.create_user(username='latehire')
+		SalaryStructure.objects.create(employee=late, basic_salary=Decimal('900000.00'), effective_from=date(2026, 4, 10))
+		structure = SalaryStructure.objects.get(employee=self.employees[1])
+		structure.is_active = False
+		structure.effective_from = date(2026, 4, 1)
+		structure.save()
+
+		with self.assertNumQueries(1):
+			march = {version.employee_id for version in structures_for_month(date(2026, 3, 1))}
+		april = set(structures_for_month(date(2026, 4, 1)).values_list('employee_id', flat=True))
+		self.assertIn(self.employees[1].pk, march)
+		self.assertNotIn(late.pk, march)
+		self.assertIn(late.pk, april)
+		self.assertNotIn(self.employees[1].pk, april)
+
+
+	def test_reassigned_structure_keeps_previous_employee_history(self):
+		e0 = self.employees[0]
+		structure = SalaryStructure.objects.get(employee=e0)
+		old_salary = structure.basic_salary
+		newcomer = User.objects.create_user(username='newcomer')
+		structure.employee = newcomer
+		structure.save()
+
+		versions = list(SalaryStructureVersion.objects.filter(employee=e0).order_by('effective_from').values_list('effective_from', 'is_active'))
+		self.assertEqual(versions, [(OPEN_START, True), (timezone.localdate(), False)])
+		compute_payroll_run(self.run, created_by=self.admin)
+		self.assertEqual(Payslip.objects.get(payroll_run=self.run, employee=e0).basic_salary, old_salary)
+
+	def test_edit_without_new_date_starts_a_version_today(self):
+		e0 = self.employees[0]
+		structure = SalaryStructure.objects.get(employee=e0)
+		old_salary = structure.basic_salary
+		compute_payroll_run(self.run, created_by=self.admin)
+
+		structure.basic_salary = Decimal('3000000.00')
+		structure.save()
+		structure.save()
+		today = timezone.localdate()
+		versions = list(SalaryStructureVersion.objects.filter(employee=e0).order_by('effective_from').values_list('effective_from', 'basic_salary'))
+		self.assertEqual(versions, [(OPEN_START, old_salary), (today, Decimal('3000000.00'))])
+		structure.refresh_from_db()
+		self.assertEqual(structure.effective_from, today)
+
+		compute_payslip(self.run, e0, created_by=self.admin)
+		self.assertEqual(Payslip.objects.get(payroll_run=self.run, employee=e0).basic_salary, old_salary)
+
+		# A second correction the same day amends today's version only.
+		structure.basic_salary = Decimal('3100000.00')
+		structure.save()
+		self.assertEqual(SalaryStructureVersion.objects.filter(employee=e0).count(), 2)
+		self.assertEqual(structure_as_of(e0.pk, today).basic_salary, Decimal('3100000.00'))
+
+	def test_deactivating_or_deleting_keeps_earlier_months(self):
+		e1, e2 = self.employees[1], self.employees[2]
+		structure = SalaryStructure.objects.get(employee=e1)
+		structure.is_active = False
+		structure.save()
+		SalaryStructure.objects.get(employee=e2).delete()
+
+		march = set(structures_for_month(self.month).values_list('employee_id', flat=True))
+		self.assertTrue({e1.pk, e2.pk} <= march)
+		current = set(structures_for_month(timezone.localdate()).values_list('employee_id', flat=True))
+		self.assertFalse({e1.pk, e2.pk} & current)
+		self.assertTrue(SalaryStructureVersion.objects.filter(employee=e2, structure__isnull=True, is_active=False).exists())
+
+
+class PayrollImportTests(PayrollFixtureMixin, TestCase):
+	def _csv(self, text, name='import.csv'):
+		return SimpleUploadedFile(name, text.encode('utf-8'), content_type='text/csv')
+
+	def test_pay_item_import_inserts_in_bulk_and_marks_dirty(self):
+		rows = ''.join(f'EMP-{idx % 6:03d},transport,{idx}.50,2026-03-01,,yes\n' for idx in range(0, 3000, 2))
+		upload = self._csv('\ufeffEmployee_ID,item_code,amount,start_date,end_date,is_recurring\n' + rows)
+		before = EmployeePayItem.objects.count()
+
+		# Profile lookup, item types, then bulk inserts (split further by SQLite's
+		# parameter limit) and dirty marks; never a query per row.
+		with CaptureQueriesContext(connection) as ctx:
+			result = import_pay_items(upload, created_by=self.admin)
+		self.assertTrue(result.ok, result.errors)
+		self.assertEqual(result.created, 1500)
+		self.assertLess(len(ctx.captured_queries), 40)
+		self.assertEqual(EmployeePayItem.objects.count(), before + 1500)
+		self.assertEqual(
+			set(PayrollDirtyEmployee.objects.filter(payroll_run=self.run).values_list('employee_id', flat=True)),
+			{self.employees[0].pk, self.employees[2].pk, self.employees[4].pk},
+		)
+
+	def test_invalid_rows_are_reported_and_nothing_is_saved(self):
+		upload = self._csv(
+			'employee_id,item_code,amount,start_date,end_date\n'
+			'EMP-000,transport,100,,\n'
+			'EMP-999,transport,100,,\n'
+			'EMP-002,nope,100,,\n'
+			'EMP-002,transport,-5,,\n'
+			'EMP-004,transport,10,2026-05-01,2026-04-01\n'
+		)
+		before = EmployeePayItem.objects.count()
+		result = import_pay_items(upload)
+		self.assertEqual(result.rows, 5)
+		self.assertEqual([line for line, _message in result.errors], [3, 4, 5, 6])
+		self.assertEqual(EmployeePayItem.objects.count(), before)
+
+		missing = import_penalties(self._csv('employee_id,amount\nEMP-000,5\n'))
+		self.assertEqual(missing.errors, [(1, 'Missing column(s): month, reason.')])
+
+	def test_penalty_import_view(self):
+		self.client.force_login(self.admin)
+		url = reverse('payroll:penalty_import')
+		body = 'employee_id,month,amount,reason,status\nEMP-000,2026-03,1500,Late,cleared\nEMP-002,2026-03-15,800,Damage,\n'
+
+		response = self.client.post(url, {'file': self._csv(body), 'dry_run': 'on'})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(Penalty.objects.filter(reason__in=['Late', 'Damage'], amount__in=[Decimal('1500'), Decimal('800')]).count(), 0)
+
+		response = self.client.post(url, {'file': self._csv(body)})
+		self.assertRedirects(response, reverse('payroll:penalties'))
+		cleared = Penalty.objects.get(employee=self.employees[0], amount=Decimal('1500.00'))
+		self.assertEqual(cleared.applies_to_month, self.month)
+		self.assertEqual(cleared.status, Penalty.STATUS_CLEARED)
+		self.assertEqual(cleared.cleared_by, self.admin)
+		self.assertEqual(Penalty.objects.get(employee=self.employees[2], amount=Decimal('800.00')).status, Penalty.STATUS_PENDING)
+		self.assertTrue(PayrollDirtyEmployee.objects.filter(payroll_run=self.run, employee=self.employees[2]).exists())
+
+
+	def test_non_utf8_upload_is_a_form_error(self):
+		self.client.force_login(self.admin)
+		body = 'employee_id,month,amount,reason\nEMP-000,2026-03,1500,Caf\xe9 \u2013 late\n'.encode('cp1252')
+		upload = SimpleUploadedFile('penalties.csv', body, content_type='text/csv')
+		before = Penalty.objects.count()
+
+		response = self.client.post(reverse('payroll:penalty_import'), {'file': upload})
+		self.assertEqual(response.status_code, 200)
+		self.assertFormError(response.context['form'], 'file', 'The file must be a UTF-8 encoded CSV. In Excel, save it as "CSV UTF-8".')
+		self.assertEqual(Penalty.objects.count(), before)
+
+		with self.assertRaises(ImportFileError):
+			# Longer than csv.field_size_limit().
+			import_pay_items(self._csv('employee_id,item_code,amount\nEMP-000,transport,' + '9' * 200_000 + '\n'))
+
+
+class VoucherClearanceTests(PayrollFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		e0, e1, e2 = self.employees[:3]
+		# e1 and e2 are held by pending penalties; e1's is then cleared without a recompute.
+		Penalty.objects.create(employee=e1, applies_to_month=self.month, amount=Decimal('3000.00'), reason='Late', status=Penalty.STATUS_PENDING)
+		compute_payroll_run(self.run, created_by=self.admin)
+		Penalty.objects.filter(employee=e1).update(status=Penalty.STATUS_CLEARED)
+
+	def _status(self, employee):
+		return SalaryVoucher.objects.get(payslip__payroll_run=self.run, payslip__employee=employee).status
+
+	def test_bulk_clear_skips_pending_penalties_and_reprices_the_rest(self):
+		e0, e1, e2 = self.employees[:3]
+		with CaptureQueriesContext(connection) as ctx:
+			result = clear_vouchers(self.run, cleared_by=self.admin)
+		self.assertEqual(result, {'cleared': 1, 'blocked_employee_ids': [e2.pk]})
+		self.assertEqual(self._status(e1), SalaryVoucher.STATUS_CLEARED)
+		self.assertEqual(self._status(e2), SalaryVoucher.STATUS_ON_HOLD)
+		self.assertEqual(Payslip.objects.get(payroll_run=self.run, employee=e1).penalty_total, Decimal('3000.00'))
+		updates = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE "payroll_salaryvoucher"')]
+		self.assertEqual(len([sql for sql in updates if 'CASE' not in sql]), 1)
+
+	def test_views_clear_selected_and_single_vouchers(self):
+		e0, e1, e2 = self.employees[:3]
+		self.client.force_login(self.admin)
+		held = Payslip.objects.get(payroll_run=self.run, employee=e2)
+		self.client.post(reverse('payroll:clear_voucher', args=[held.pk]))
+		self.assertEqual(self._status(e2), SalaryVoucher.STATUS_ON_HOLD)
+
+		response = self.client.post(reverse('payroll:clear_vouchers', args=[self.run.pk]), {'payslip_ids': [str(held.pk)]})
+		self.assertRedirects(response, reverse('payroll:detail', args=[self.run.pk]))
+		self.assertEqual(self._status(e1), SalaryVoucher.STATUS_ON_HOLD)
+
+		cleared = Payslip.objects.get(payroll_run=self.run, employee=e1)
+		self.client.post(reverse('payroll:clear_voucher', args=[cleared.pk]))
+		self.assertEqual(self._status(e1), SalaryVoucher.STATUS_CLEARED)
+
+		lock_payroll_run(self.run)
+		with self.assertRaises(ValueError):
+			clear_vouchers(self.run)
+
+
+class PayrollBenchmarkTests(TestCase):
+	def test_synthesize_creates_paid_workforce(self):
+		out = StringIO()
+		call_command('payroll_synthesize', '--employees', '12', '--pay-items', '30', '--penalties', '6', '--month', '2026-03', stdout=out)
+		self.assertIn('Created 12 employee(s)', out.getvalue())
+		self.assertEqual(EmployeeProfile.objects.filter(employee_id__startswith='SYNT-').count(), 12)
+		self.assertEqual(len(structures_for_month(date(2026, 3, 1))), 12)
+		self.assertEqual(EmployeePayItem.objects.filter(item_type__code__startswith='synth-').count(), 30)
+		self.assertEqual(Penalty.objects.filter(applies_to_month=date(2026, 3, 1)).count(), 6)
+
+		# Repeated runs add more staff after the existing ones.
+		call_command('payroll_synthesize', '--employees', '3', '--pay-items', '0', '--penalties', '0', stdout=StringIO())
+		self.assertTrue(User.objects.filter(username='synth-000015').exists())
+
+		call_command('payroll_synthesize', '--purge', stdout=StringIO())
+		self.assertFalse(User.objects.filter(username__startswith='synth-').exists())
+
+	def test_benchmark_reports_json_and_rolls_back(self):
+		out = StringIO()
+		call_command(
+			'payroll_benchmark', '--employees', '10', '--pay-items', '20', '--penalties', '4', '--month', '2026-03', '--sample', '3',
+			stdout=out,
+		)
+		report = json.loads(out.getvalue())
+		self.assertEqual(
+			set(report['steps']),
+			{'create_run_view', 'compute_payslip', 'compute_payroll_run', 'export_cleared_csv', 'clear_vouchers_view'},
+		)
+		self.assertEqual(report['steps']['create_run_view']['payslips'], 10)
+		self.assertEqual(report['steps']['compute_payslip']['employees'], 3)
+		self.assertGreater(report['steps']['export_cleared_csv']['queries'], 0)
+		self.assertFalse(User.objects.filter(username__startswith='synth-').exists())
+		self.assertFalse(PayrollRun.objects.exists())
@@ -0,0 +1,58 @@
+"""Change tracking for unlocked payroll runs.
+
+Signals mark employees "dirty" in every unlocked run whose month is affected
+by an edit, and ``recompute_dirty_employees`` reprices only those payslips.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+
+from .engine import compute_payroll_run
+from .models import PayrollDirtyEmployee, PayrollRun
+
+
+def affected_runs(*, month=None, start_date=None, end_date=None):
+	"""Unlocked runs touched by a change, optionally limited to a month or date range."""
+	runs = PayrollRun.objects.filter(locked=False)
+	if month is not None:
+		return runs.filter(month=month.replace(day=1))
+	if start_date is not None:
+		runs = runs.filter(month__gte=start_date.replace(day=1))
+	if end_date is not None:
+		runs = runs.filter(month__lte=end_date)
+	return runs
+
+
+def mark_employees_dirty(employee_ids, runs, *, reason):
+	"""Flag ``employee_ids`` as needing recomputation in each of ``runs``."""
+	employee_ids = {employee_id for employee_id in employee_ids if employee_id}
+	if not employee_ids:
+		return 0
+	run_ids = list(runs.values_list('id', flat=True))
+	if not run_ids:
+		return 0
+	rows = [
+		PayrollDirtyEmployee(payroll_run_id=run_id, employee_id=employee_id, reason=reason)
+		for run_id in run_ids
+		for employee_id in employee_ids
+	]
+	PayrollDirtyEmployee.objects.bulk_create(rows, ignore_conflicts=True, batch_size=500)
+	return len(rows)
+
+
+def recompute_dirty_employees(run, *, created_by=None):
+	"""Recompute payslips only for employees marked dirty in ``run``.
+
+	Returns the number of employees recomputed. Locked runs are never touched.
+	"""
+	if run.locked:
+		raise ValueError('Payroll run is locked.')
+	with transaction.atomic():
+		dirty = list(PayrollDirtyEmployee.objects.filter(payroll_run=run).values_list('id', 'employee_id'))
+		if not dirty:
+			return 0
+		employee_ids = {employee_id for _pk, employee_id in dirty}
+		compute_payroll_run(run, created_by=created_by, employee_ids=employee_ids)
+		# Only clear the marks we acted on; edits made meanwhile stay dirty.
+		PayrollDirtyEmployee.objects.filter(id__in=[pk for pk, _employee_id in dirty]).delete()
+	return len(employee_ids)
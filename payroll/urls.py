@@ -3,18 +3,34 @@ from django.urls import path
 from .views import (
     ClearSalaryVoucherView,
     EmployeePayItemCreateView,
+    EmployeePayItemImportView,
     EmployeePayItemListView,
     EmployeePayItemUpdateView,
+    PayItemAnalyticsView,
     PayItemTypeCreateView,
     PayItemTypeListView,
     PayItemTypeUpdateView,
+    PayrollAnnualSummaryExportView,
+    PayrollAnnualSummaryView,
+    PayrollRunClearVouchersView,
+    PayrollRunCostCentreView,
     PayrollRunCreateView,
     PayrollRunDetailView,
     PayrollRunExportCSVView,
     PayrollRunListView,
+    PayrollRunLockView,
+    PayrollRunPayslipZipView,
+    PayrollRunProgressView,
+    PayrollRunRecomputeDirtyView,
+    PayrollRunRenderPdfsView,
+    PayrollSimulateAPIView,
+    PayrollSimulatorView,
+    PayrollRunVarianceView,
     PenaltyCreateView,
+    PenaltyImportView,
     PenaltyListView,
     PenaltyUpdateView,
+    PayslipPdfView,
     SalaryStructureCreateView,
     SalaryStructureListView,
     SalaryStructureUpdateView,
@@ -26,18 +42,34 @@ urlpatterns = [
     path('', PayrollRunListView.as_view(), name='list'),
     path('create/', PayrollRunCreateView.as_view(), name='create'),
     path('<int:pk>/', PayrollRunDetailView.as_view(), name='detail'),
+    path('<int:pk>/lock/', PayrollRunLockView.as_view(), name='lock'),
+    path('<int:pk>/progress/', PayrollRunProgressView.as_view(), name='run_progress'),
+    path('<int:pk>/cost-centres/', PayrollRunCostCentreView.as_view(), name='cost_centres'),
+    path('<int:pk>/variance/', PayrollRunVarianceView.as_view(), name='variance'),
+    path('<int:pk>/clear-vouchers/', PayrollRunClearVouchersView.as_view(), name='clear_vouchers'),
+    path('<int:pk>/recompute-dirty/', PayrollRunRecomputeDirtyView.as_view(), name='recompute_dirty'),
+    path('<int:pk>/payslip-pdfs/', PayrollRunRenderPdfsView.as_view(), name='render_pdfs'),
+    path('<int:pk>/payslips.zip', PayrollRunPayslipZipView.as_view(), name='payslips_zip'),
     path('<int:pk>/export-cleared.csv', PayrollRunExportCSVView.as_view(), name='export_cleared_csv'),
+    path('annual-summary/', PayrollAnnualSummaryView.as_view(), name='annual_summary'),
+    path('annual-summary/<int:year>/export/', PayrollAnnualSummaryExportView.as_view(), name='annual_summary_export'),
+    path('simulate/', PayrollSimulatorView.as_view(), name='simulate'),
+    path('simulate/api/', PayrollSimulateAPIView.as_view(), name='simulate_api'),
     path('structures/', SalaryStructureListView.as_view(), name='structures'),
     path('structures/create/', SalaryStructureCreateView.as_view(), name='structure_create'),
     path('structures/<int:pk>/edit/', SalaryStructureUpdateView.as_view(), name='structure_edit'),
     path('pay-item-types/', PayItemTypeListView.as_view(), name='pay_item_types'),
     path('pay-item-types/create/', PayItemTypeCreateView.as_view(), name='pay_item_type_create'),
     path('pay-item-types/<int:pk>/edit/', PayItemTypeUpdateView.as_view(), name='pay_item_type_edit'),
+    path('pay-item-analytics/', PayItemAnalyticsView.as_view(), name='pay_item_analytics'),
     path('employee-pay-items/', EmployeePayItemListView.as_view(), name='employee_pay_items'),
     path('employee-pay-items/create/', EmployeePayItemCreateView.as_view(), name='employee_pay_item_create'),
+    path('employee-pay-items/import/', EmployeePayItemImportView.as_view(), name='employee_pay_item_import'),
     path('employee-pay-items/<int:pk>/edit/', EmployeePayItemUpdateView.as_view(), name='employee_pay_item_edit'),
     path('penalties/', PenaltyListView.as_view(), name='penalties'),
     path('penalties/create/', PenaltyCreateView.as_view(), name='penalty_create'),
+    path('penalties/import/', PenaltyImportView.as_view(), name='penalty_import'),
     path('penalties/<int:pk>/edit/', PenaltyUpdateView.as_view(), name='penalty_edit'),
+    path('payslips/<int:pk>/pdf/', PayslipPdfView.as_view(), name='payslip_pdf'),
     path('payslips/<int:pk>/clear-voucher/', ClearSalaryVoucherView.as_view(), name='clear_voucher'),
 ]
@@ -0,0 +1,139 @@
+"""Month-over-month variance between two payroll runs.
+
+Each side is read with a single query over its payslips; the comparison is
+cached per pair of runs under a key that includes both runs' ``revision``, so
+any payslip change in either run naturally invalidates it.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import PayrollRun, Payslip
+
+
+ZERO = Decimal('0.00')
+HUNDRED = Decimal('100')
+CACHE_TIMEOUT = 60 * 60 * 24
+
+_FIELDS = (
+	'employee_id',
+	'employee__username',
+	'employee__first_name',
+	'employee__last_name',
+	'gross_pay',
+	'penalty_total',
+	'net_pay',
+	'is_held',
+)
+
+
+def default_threshold_percent() -> Decimal:
+	return Decimal(str(getattr(settings, 'PAYROLL_VARIANCE_THRESHOLD_PERCENT', 10)))
+
+
+def previous_run(run):
+	return PayrollRun.objects.filter(month__lt=run.month).order_by('-month').first()
+
+
+def _load_side(run) -> dict:
+	rows = {}
+	for employee_id, username, first_name, last_name, gross, penalty, net, is_held in (
+		Payslip.objects.filter(payroll_run=run).values_list(*_FIELDS)
+	):
+		rows[employee_id] = {
+			'name': f'{first_name} {last_name}'.strip() or username,
+			'gross_pay': gross,
+			'penalty_total': penalty,
+			'net_pay': net,
+			'is_held': is_held,
+		}
+	return rows
+
+
+def compare_runs(current, previous, *, threshold_percent=None) -> dict:
+	"""Compare ``current`` against ``previous`` employee by employee.
+
+	Flags employees who are new or missing, whose net pay moved by at least
+	``threshold_percent`` of last month's net, or who picked up a new penalty
+	(a higher penalty total or a newly held voucher).
+	"""
+	threshold = default_threshold_percent() if threshold_percent is None else Decimal(str(threshold_percent))
+	now_rows = _load_side(current)
+	before_rows = _load_side(previous) if previous is not None else {}
+
+	new_employees = []
+	missing_employees = []
+	swings = []
+	new_penalties = []
+	for employee_id, row in now_rows.items():
+		before = before_rows.get(employee_id)
+		if before is None:
+			new_employees.append({'employee_id': employee_id, 'name': row['name'], 'net_pay': row['net_pay']})
+			continue
+
+		delta = row['net_pay'] - before['net_pay']
+		base = abs(before['net_pay'])
+		percent = (delta * HUNDRED / base).quantize(Decimal('0.1')) if base else None
+		if delta and (percent is None or abs(percent) >= threshold):
+			swings.append({
+				'employee_id': employee_id,
+				'name': row['name'],
+				'previous_net': before['net_pay'],
+				'current_net': row['net_pay'],
+				'delta': delta,
+				'percent': percent,
+			})
+
+		if row['penalty_total'] > before['penalty_total'] or (row['is_held'] and not before['is_held']):
+			new_penalties.append({
+				'employee_id': employee_id,
+				'name': row['name'],
+				'previous_penalty': before['penalty_total'],
+				'current_penalty': row['penalty_total'],
+				'is_held': row['is_held'],
+			})
+
+	for employee_id, before in before_rows.items():
+		if employee_id not in now_rows:
+			missing_employees.append({'employee_id': employee_id, 'name': before['name'], 'net_pay': before['net_pay']})
+
+	def total(rows, field):
+		return sum((row[field] for row in rows.values()), ZERO)
+
+	swings.sort(key=lambda row: abs(row['delta']), reverse=True)
+	return {
+		'current_run_id': current.pk,
+		'previous_run_id': previous.pk if previous is not None else None,
+		'threshold_percent': threshold,
+		'totals': {
+			'current_headcount': len(now_rows),
+			'previous_headcount': len(before_rows),
+			'current_gross': total(now_rows, 'gross_pay'),
+			'previous_gross': total(before_rows, 'gross_pay'),
+			'current_net': total(now_rows, 'net_pay'),
+			'previous_net': total(before_rows, 'net_pay'),
+			'net_delta': total(now_rows, 'net_pay') - total(before_rows, 'net_pay'),
+		},
+		'new_employees': sorted(new_employees, key=lambda row: row['name']),
+		'missing_employees': sorted(missing_employees, key=lambda row: row['name']),
+		'net_swings': swings,
+		'new_penalties': sorted(new_penalties, key=lambda row: row['name']),
+	}
+
+
+def _cache_key(current, previous, threshold) -> str:
+	previous_part = f'{previous.pk}.{previous.revision}' if previous is not None else 'none'
+	return f'payroll:variance:{current.pk}.{current.revision}:{previous_part}:{threshold}'
+
+
+def cached_compare_runs(current, previous, *, threshold_percent=None) -> dict:
+	threshold = default_threshold_percent() if threshold_percent is None else Decimal(str(threshold_percent))
+	key = _cache_key(current, previous, threshold)
+	result = cache.get(key)
+	if result is None:
+		result = compare_runs(current, previous, threshold_percent=threshold)
+		cache.set(key, result, CACHE_TIMEOUT)
+	return result
@@ -1,109 +1,42 @@
-from decimal import Decimal
-import csv
-from datetime import timedelta
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import models, transaction
-from django.http import HttpResponse
+from django.db.models import Sum
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views import View
-from django.views.generic import CreateView, ListView, UpdateView, DetailView
+from django.views.generic import CreateView, FormView, ListView, TemplateView, UpdateView, DetailView
 
 from core.permissions import HRAdminRequiredMixin
-
-from employees.models import EmployeeProfile
-
-from .forms import EmployeePayItemForm, PayrollRunForm, PayItemTypeForm, PenaltyForm, SalaryStructureForm
-from .models import EmployeePayItem, PayItemType, PayrollRun, Payslip, Penalty, SalaryStructure, SalaryVoucher
-
-
-def _month_bounds(month_start):
-	month_start = month_start.replace(day=1)
-	if month_start.month == 12:
-		next_month = month_start.replace(year=month_start.year + 1, month=1, day=1)
-	else:
-		next_month = month_start.replace(month=month_start.month + 1, day=1)
-	month_end = next_month - timedelta(days=1)
-	return month_start, month_end
-
-
-def _employee_identifier(user):
-	try:
-		profile = user.employee_profile
-		if profile.employee_id:
-			return profile.employee_id
-	except Exception:
-		pass
-	return user.username
-
-
-def compute_payslip(run, employee, *, created_by=None):
-	month_start, month_end = _month_bounds(run.month)
-
-	structure = getattr(employee, 'salary_structure', None)
-	if not structure or not structure.is_active:
-		return None
-
-	base_salary = structure.basic_salary
-	legacy_allowances = structure.allowances
-	legacy_deductions = structure.deductions
-
-	items = EmployeePayItem.objects.select_related('item_type').filter(employee=employee, is_active=True, item_type__is_active=True)
-	items = items.filter(
-		models.Q(start_date__isnull=True) | models.Q(start_date__lte=month_end),
-		models.Q(end_date__isnull=True) | models.Q(end_date__gte=month_start),
-	)
-
-	allowance_total = Decimal('0.00')
-	deduction_total = Decimal('0.00')
-	for item in items:
-		if item.item_type.kind == item.item_type.KIND_ALLOWANCE:
-			allowance_total += item.amount
-		else:
-			deduction_total += item.amount
-
-	penalties = Penalty.objects.filter(employee=employee, applies_to_month=run.month)
-	penalty_total = penalties.filter(status=Penalty.STATUS_CLEARED).aggregate(models.Sum('amount')).get('amount__sum') or Decimal('0.00')
-	penalties_pending = penalties.filter(status=Penalty.STATUS_PENDING).exists()
-
-	gross = base_salary + legacy_allowances + allowance_total
-	deductions = legacy_deductions + deduction_total + penalty_total
-	taxable = max(gross - deductions, Decimal('0.00'))
-	tax = (taxable * Decimal('0.10')).quantize(Decimal('0.01'))
-	net = gross - deductions - tax
-
-	payslip, _created = Payslip.objects.update_or_create(
-		payroll_run=run,
-		employee=employee,
-		defaults={
-			'basic_salary': base_salary,
-			'allowance_total': legacy_allowances + allowance_total,
-			'deduction_total': legacy_deductions + deduction_total,
-			'penalty_total': penalty_total,
-			'gross_pay': gross,
-			'tax_amount': tax,
-			'net_pay': net,
-			'is_held': penalties_pending,
-		},
-	)
-
-	voucher_number = f"SV-{run.month:%Y%m}-{_employee_identifier(employee)}"
-	voucher_defaults = {
-		'voucher_number': voucher_number,
-		'status': SalaryVoucher.STATUS_ON_HOLD if payslip.is_held else SalaryVoucher.STATUS_CLEARED,
-	}
-	voucher, _voucher_created = SalaryVoucher.objects.update_or_create(payslip=payslip, defaults=voucher_defaults)
-	if voucher.status == SalaryVoucher.STATUS_CLEARED and not voucher.cleared_at:
-		voucher.cleared_by = created_by
-		voucher.cleared_at = timezone.now()
-		voucher.save(update_fields=['cleared_by', 'cleared_at'])
-	if voucher.status == SalaryVoucher.STATUS_ON_HOLD:
-		SalaryVoucher.objects.filter(pk=voucher.pk).update(cleared_by=None, cleared_at=None)
-
-	return payslip
+from employees.models import Department
+
+from .analytics import pay_item_totals
+from .costing import department_cost_rollup
+from .documents import iter_payslip_zip, payslip_zip_entries, render_annual_summary_pdfs, render_payroll_run_pdfs
+from .exports import EXPORT_FORMATS, cleared_payslip_rows, stream_csv
+from .imports import (
+	PAY_ITEM_COLUMNS,
+	PAY_ITEM_OPTIONAL_COLUMNS,
+	PENALTY_COLUMNS,
+	PENALTY_OPTIONAL_COLUMNS,
+	ImportFileError,
+	import_pay_items,
+	import_penalties,
+)
+from .jobs import enqueue_payroll_job
+from .simulation import SimulationError, simulate_payroll
+from .snapshots import get_snapshot, lock_payroll_run, payslip_rows
+from .tracking import recompute_dirty_employees
+from .variance import cached_compare_runs, previous_run
+from .vouchers import clear_vouchers
+from .year_to_date import SUMMARY_HEADER, TOTAL_FIELDS, annual_summary_rows
+from .forms import CsvImportForm, EmployeePayItemForm, PayrollRunForm, PayItemTypeForm, PenaltyForm, SalaryStructureForm
+from .models import EmployeePayItem, PayItemType, PayrollJob, PayrollRun, PayrollYearToDate, Payslip, Penalty, SalaryStructure
 
 
 class PayrollRunListView(LoginRequiredMixin, HRAdminRequiredMixin, ListView):
@@ -117,17 +50,21 @@ class PayrollRunCreateView(LoginRequiredMixin, HRAdminRequiredMixin, CreateView)
 	model = PayrollRun
 	form_class = PayrollRunForm
 	template_name = 'common/form.html'
-	success_url = reverse_lazy('payroll:list')
+
+	def get_success_url(self):
+		return reverse('payroll:detail', kwargs={'pk': self.object.pk})
 
 	def form_valid(self, form):
 		form.instance.created_by = self.request.user
 		form.instance.month = form.cleaned_data['month'].replace(day=1)
 		response = super().form_valid(form)
-		run = self.object
-		with transaction.atomic():
-			for structure in SalaryStructure.objects.select_related('employee').filter(is_active=True):
-				compute_payslip(run, structure.employee, created_by=self.request.user)
-		messages.success(self.request, 'Payroll run created and payslips generated.')
+		job = enqueue_payroll_job(self.object, requested_by=self.request.user)
+		if job.status == PayrollJob.STATUS_DONE:
+			messages.success(self.request, 'Payroll run created and payslips generated.')
+		elif job.status == PayrollJob.STATUS_FAILED:
+			messages.error(self.request, f'Payroll run created but payslip generation failed: {job.error}')
+		else:
+			messages.success(self.request, 'Payroll run created. Payslips are being generated in the background.')
 		return response
 
 
@@ -138,41 +75,275 @@ class PayrollRunDetailView(LoginRequiredMixin, HRAdminRequiredMixin, DetailView)
 
 	def get_context_data(self, **kwargs):
 		context = super().get_context_data(**kwargs)
-		context['payslips'] = self.object.payslips.select_related('employee').order_by('employee__username')
+		context['snapshot'] = get_snapshot(self.object)
+		context['payslips'] = payslip_rows(self.object, with_items=False)
+		context['job'] = self.object.jobs.first()
+		context['dirty_count'] = 0 if self.object.locked else self.object.dirty_employees.count()
+		return context
+
+
+class PayrollRunVarianceView(LoginRequiredMixin, HRAdminRequiredMixin, DetailView):
+	"""Compare a run with another (default: the previous month) before locking it."""
+	model = PayrollRun
+	template_name = 'payroll/payroll_run_variance.html'
+	context_object_name = 'run'
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		other_runs = PayrollRun.objects.exclude(pk=self.object.pk).order_by('-month')
+		against = self.request.GET.get('against')
+		previous = None
+		if against:
+			previous = other_runs.filter(pk=against).first() if against.isdigit() else None
+		if previous is None:
+			previous = previous_run(self.object)
+
+		threshold = None
+		try:
+			threshold = Decimal(self.request.GET.get('threshold') or '')
+		except InvalidOperation:
+			pass
+		if threshold is not None and (not threshold.is_finite() or threshold < 0):
+			threshold = None
+
+		context['previous'] = previous
+		context['other_runs'] = other_runs
+		context['variance'] = cached_compare_runs(self.object, previous, threshold_percent=threshold)
+		return context
+
+
+class PayrollRunCostCentreView(LoginRequiredMixin, HRAdminRequiredMixin, DetailView):
+	"""Payroll cost per department subtree against each department's budget."""
+	model = PayrollRun
+	template_name = 'payroll/payroll_run_cost_centres.html'
+	context_object_name = 'run'
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		context['rollup'] = department_cost_rollup(self.object)
 		return context
 
 
+class PayrollRunLockView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Lock a run and freeze its payslips into an immutable snapshot."""
+	def post(self, request, pk):
+		run = get_object_or_404(PayrollRun, pk=pk)
+		if run.locked:
+			messages.info(request, 'Payroll run is already locked.')
+			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+		if PayrollJob.objects.filter(payroll_run=run, status__in=PayrollJob.ACTIVE_STATUSES).exists():
+			messages.error(request, 'Wait for the running payroll job to finish before locking.')
+			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+		snapshot = lock_payroll_run(run, locked_by=request.user)
+		messages.success(request, f'Payroll run locked with {snapshot.payslip_count} payslip(s) frozen.')
+		return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+
+class PayrollRunRecomputeDirtyView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Recompute payslips only for employees whose inputs changed since the last computation."""
+	def post(self, request, pk):
+		run = get_object_or_404(PayrollRun, pk=pk)
+		if run.locked:
+			messages.error(request, 'Payroll run is locked.')
+			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+		count = recompute_dirty_employees(run, created_by=request.user)
+		if count:
+			messages.success(request, f'Recomputed {count} payslip(s).')
+		else:
+			messages.info(request, 'No payslips needed recomputation.')
+		return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+
+class PayrollRunProgressView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Lightweight JSON progress for the latest job of a payroll run."""
+	def get(self, request, pk):
+		job = PayrollJob.objects.filter(payroll_run_id=pk).only(
+			'status', 'processed_count', 'total_count', 'error', 'finished_at',
+		).first()
+		if job is None:
+			if not PayrollRun.objects.filter(pk=pk).exists():
+				return JsonResponse({'ok': False, 'error': 'not_found'}, status=404)
+			return JsonResponse({'ok': True, 'status': None, 'processed': 0, 'total': 0, 'percent': 100, 'error': ''})
+		return JsonResponse({
+			'ok': True,
+			'status': job.status,
+			'processed': job.processed_count,
+			'total': job.total_count,
+			'percent': job.percent,
+			'error': job.error,
+		})
+
+
+class PayrollRunRenderPdfsView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Queue rendering of payslip PDFs for every payslip in the run."""
+	def post(self, request, pk):
+		run = get_object_or_404(PayrollRun, pk=pk)
+		if PayrollJob.objects.filter(payroll_run=run, status__in=PayrollJob.ACTIVE_STATUSES).exists():
+			messages.info(request, 'A payroll job for this run is already in progress.')
+			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+		job = enqueue_payroll_job(run, kind=PayrollJob.KIND_RENDER_PDFS, requested_by=request.user)
+		if job.status == PayrollJob.STATUS_DONE:
+			messages.success(request, 'Payslip PDFs generated.')
+		elif job.status == PayrollJob.STATUS_FAILED:
+			messages.error(request, f'Payslip PDF generation failed: {job.error}')
+		else:
+			messages.success(request, 'Payslip PDFs are being generated in the background.')
+		return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+
+class PayrollRunPayslipZipView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Stream a ZIP of all stored payslip PDFs in the run."""
+	def get(self, request, pk):
+		run = get_object_or_404(PayrollRun, pk=pk)
+		entries = payslip_zip_entries(run)
+		if not entries:
+			messages.error(request, 'No payslip PDFs have been generated for this run yet.')
+			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+		response = StreamingHttpResponse(iter_payslip_zip(entries), content_type='application/zip')
+		response['Content-Disposition'] = f'attachment; filename="payslips_{run.month:%Y_%m}.zip"'
+		return response
+
+
+class PayslipPdfView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Download one payslip PDF, rendering it first if it is missing or stale."""
+	def get(self, request, pk):
+		payslip = get_object_or_404(Payslip.objects.select_related('payroll_run'), pk=pk)
+		render_payroll_run_pdfs(payslip.payroll_run, payslip_ids=[payslip.pk], workers=1)
+		payslip.refresh_from_db(fields=['pdf_file', 'pdf_hash'])
+		if not payslip.pdf_file:
+			raise Http404
+		response = FileResponse(payslip.pdf_file.open('rb'), content_type='application/pdf')
+		response['Content-Disposition'] = f'inline; filename="{payslip.pdf_file.name.rsplit("/", 1)[-1]}"'
+		return response
+
+
 class PayrollRunExportCSVView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Stream the cleared bank-transfer file (``?format=csv|tsv|fixed``)."""
 	def get(self, request, pk):
 		run = get_object_or_404(PayrollRun, pk=pk)
-		response = HttpResponse(content_type='text/csv')
-		response['Content-Disposition'] = f'attachment; filename="payroll_{run.month:%Y_%m}_cleared.csv"'
-		writer = csv.writer(response)
-		writer.writerow(['Employee', 'Employee ID', 'Bank Name', 'Account Number', 'Branch', 'Net Pay', 'Voucher Number'])
-
-		payslips = (
-			Payslip.objects.select_related('employee', 'salary_voucher')
-			.filter(payroll_run=run, salary_voucher__status=SalaryVoucher.STATUS_CLEARED)
+		export_format = request.GET.get('format') or 'csv'
+		if export_format not in EXPORT_FORMATS:
+			raise Http404('Unknown export format.')
+		streamer, content_type, extension = EXPORT_FORMATS[export_format]
+
+		response = StreamingHttpResponse(streamer(cleared_payslip_rows(run)), content_type=content_type)
+		response['Content-Disposition'] = f'attachment; filename="payroll_{run.month:%Y_%m}_cleared.{extension}"'
+		return response
+
+
+# Years accepted in ?year=; anything else falls back to the current year.
+MIN_PAYROLL_YEAR = 2000
+
+
+def _requested_year(request):
+	current = timezone.localdate().year
+	year = request.GET.get('year') or ''
+	if not year.isdigit():
+		return current
+	year = int(year)
+	return year if MIN_PAYROLL_YEAR <= year <= current + 1 else current
+
+
+class PayrollAnnualSummaryView(LoginRequiredMixin, HRAdminRequiredMixin, ListView):
+	"""Year-to-date payroll totals per employee, read from the accumulator table."""
+	template_name = 'payroll/payroll_annual_summary.html'
+	context_object_name = 'rows'
+	paginate_by = 50
+
+	def get_queryset(self):
+		self.year = _requested_year(self.request)
+		return (
+			PayrollYearToDate.objects.filter(year=self.year)
+			.select_related('employee', 'employee__employee_profile')
 			.order_by('employee__username')
 		)
-		profiles = {p.user_id: p for p in EmployeeProfile.objects.filter(user__in=[ps.employee for ps in payslips])}
-
-		for ps in payslips:
-			profile = profiles.get(ps.employee_id)
-			employee_id = getattr(profile, 'employee_id', '') if profile else ''
-			bank_name = getattr(profile, 'bank_name', '') if profile else ''
-			account_number = getattr(profile, 'bank_account_number', '') if profile else ''
-			branch = getattr(profile, 'bank_branch', '') if profile else ''
-			writer.writerow([
-				ps.employee.get_full_name() or ps.employee.username,
-				employee_id,
-				bank_name,
-				account_number,
-				branch,
-				str(ps.net_pay),
-				ps.salary_voucher.voucher_number,
-			])
-		return response
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		context['year'] = self.year
+		context['totals'] = PayrollYearToDate.objects.filter(year=self.year).aggregate(**{field: Sum(field) for field in TOTAL_FIELDS})
+		return context
+
+
+class PayrollAnnualSummaryExportView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Bulk annual summaries for ``year``: ``?format=csv`` or a ZIP of batched PDFs (``pdf``)."""
+	def get(self, request, year):
+		export_format = request.GET.get('format') or 'csv'
+		if export_format == 'csv':
+			response = StreamingHttpResponse(stream_csv(annual_summary_rows(year), header=SUMMARY_HEADER), content_type='text/csv')
+			response['Content-Disposition'] = f'attachment; filename="payroll_annual_summary_{year}.csv"'
+			return response
+		if export_format == 'pdf':
+			# Render in this process: forking a pool inside a web worker copies
+			# its DB connection and threads, and holds every batch in memory.
+			response = StreamingHttpResponse(iter_payslip_zip(render_annual_summary_pdfs(year, workers=1)), content_type='application/zip')
+			response['Content-Disposition'] = f'attachment; filename="payroll_annual_summary_{year}.zip"'
+			return response
+		raise Http404('Unknown export format.')
+
+
+class PayrollSimulatorView(LoginRequiredMixin, HRAdminRequiredMixin, TemplateView):
+	"""What-if page: edits are priced in memory by ``PayrollSimulateAPIView``."""
+	template_name = 'payroll/payroll_simulator.html'
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		context['month'] = timezone.localdate().replace(day=1)
+		context['structures'] = SalaryStructure.objects.filter(is_active=True).select_related('employee').order_by('employee__username')
+		context['departments'] = Department.objects.order_by('name')
+		context['penalty_statuses'] = [Penalty.STATUS_CLEARED, Penalty.STATUS_PENDING]
+		context['pay_item_kinds'] = PayItemType.KIND_CHOICES
+		return context
+
+
+class PayrollSimulateAPIView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Dry-run a month's payroll against JSON overrides; nothing is written."""
+	def post(self, request):
+		request.skip_audit_log = True
+		try:
+			payload = json.loads(request.body.decode('utf-8') or '{}')
+		except (UnicodeDecodeError, ValueError):
+			return JsonResponse({'ok': False, 'error': 'invalid_json'}, status=400)
+		if not isinstance(payload, dict):
+			return JsonResponse({'ok': False, 'error': 'invalid_payload'}, status=400)
+
+		month = timezone.localdate().replace(day=1)
+		if payload.get('month'):
+			try:
+				month = datetime.strptime(str(payload['month'])[:7], '%Y-%m').date()
+			except ValueError:
+				return JsonResponse({'ok': False, 'error': 'invalid_month'}, status=400)
+
+		try:
+			result = simulate_payroll(month, payload.get('overrides') or {})
+		except SimulationError as exc:
+			return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+		return JsonResponse({'ok': True, **result})
+
+
+class PayItemAnalyticsView(LoginRequiredMixin, HRAdminRequiredMixin, TemplateView):
+	"""Amounts paid per pay item for each month of a year, from stored payslip lines."""
+	template_name = 'payroll/pay_item_analytics.html'
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		year = _requested_year(self.request)
+		kind = self.request.GET.get('kind') or ''
+		if kind not in dict(PayItemType.KIND_CHOICES):
+			kind = ''
+		rows = pay_item_totals(year, kind=kind or None)
+		context.update({
+			'year': year,
+			'kind': kind,
+			'kind_choices': PayItemType.KIND_CHOICES,
+			'rows': rows,
+			'month_labels': [date(year, month, 1) for month in range(1, 13)],
+		})
+		return context
 
 
 class SalaryStructureListView(LoginRequiredMixin, HRAdminRequiredMixin, ListView):
@@ -245,6 +416,58 @@ class EmployeePayItemUpdateView(LoginRequiredMixin, HRAdminRequiredMixin, Update
 	success_url = reverse_lazy('payroll:employee_pay_items')
 
 
+class _CsvImportView(LoginRequiredMixin, HRAdminRequiredMixin, FormView):
+	"""Upload a CSV, validate every row and insert it in bulk; row errors are listed on the page."""
+	form_class = CsvImportForm
+	template_name = 'payroll/csv_import.html'
+	title = ''
+	columns = ()
+	optional_columns = ()
+	importer = None
+	success_url = None
+
+	def get_context_data(self, **kwargs):
+		context = super().get_context_data(**kwargs)
+		context.update({
+			'title': self.title,
+			'columns': self.columns,
+			'optional_columns': self.optional_columns,
+			'back_url': self.success_url,
+		})
+		return context
+
+	def form_valid(self, form):
+		try:
+			result = type(self).importer(form.cleaned_data['file'], created_by=self.request.user, dry_run=form.cleaned_data['dry_run'])
+		except ImportFileError as exc:
+			form.add_error('file', str(exc))
+			return self.form_invalid(form)
+		if not result.ok:
+			messages.error(self.request, f'{len(result.errors)} problem(s) found in {result.rows} row(s); nothing was imported.')
+			return self.render_to_response(self.get_context_data(form=form, result=result))
+		if form.cleaned_data['dry_run']:
+			messages.success(self.request, f'All {result.rows} row(s) are valid. Untick "Validate only" to import them.')
+			return self.render_to_response(self.get_context_data(form=form, result=result))
+		messages.success(self.request, f'Imported {result.created} row(s).')
+		return redirect(self.get_success_url())
+
+
+class EmployeePayItemImportView(_CsvImportView):
+	title = 'Import Employee Pay Items'
+	columns = PAY_ITEM_COLUMNS
+	optional_columns = PAY_ITEM_OPTIONAL_COLUMNS
+	importer = import_pay_items
+	success_url = reverse_lazy('payroll:employee_pay_items')
+
+
+class PenaltyImportView(_CsvImportView):
+	title = 'Import Penalties'
+	columns = PENALTY_COLUMNS
+	optional_columns = PENALTY_OPTIONAL_COLUMNS
+	importer = import_penalties
+	success_url = reverse_lazy('payroll:penalties')
+
+
 class PenaltyListView(LoginRequiredMixin, HRAdminRequiredMixin, ListView):
 	model = Penalty
 	template_name = 'payroll/penalty_list.html'
@@ -289,19 +512,35 @@ class PenaltyUpdateView(LoginRequiredMixin, HRAdminRequiredMixin, UpdateView):
 
 class ClearSalaryVoucherView(LoginRequiredMixin, HRAdminRequiredMixin, View):
 	def post(self, request, pk):
-		payslip = get_object_or_404(Payslip.objects.select_related('payroll_run', 'employee'), pk=pk)
+		payslip = get_object_or_404(Payslip.objects.select_related('payroll_run'), pk=pk)
 		run = payslip.payroll_run
 		if run.locked:
 			messages.error(request, 'Payroll run is locked.')
 			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
 
-		pending_penalties = Penalty.objects.filter(employee=payslip.employee, applies_to_month=run.month, status=Penalty.STATUS_PENDING).exists()
-		if pending_penalties:
+		result = clear_vouchers(run, payslip_ids=[payslip.pk], cleared_by=request.user)
+		if result['blocked_employee_ids']:
 			messages.error(request, 'Cannot clear salary voucher: employee has pending penalties for this month.')
+		else:
+			messages.success(request, 'Salary voucher cleared.')
+		return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
+
+
+class PayrollRunClearVouchersView(LoginRequiredMixin, HRAdminRequiredMixin, View):
+	"""Clear the selected on-hold vouchers of a run (all of them when none are selected)."""
+	def post(self, request, pk):
+		run = get_object_or_404(PayrollRun, pk=pk)
+		if run.locked:
+			messages.error(request, 'Payroll run is locked.')
 			return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
 
-		with transaction.atomic():
-			compute_payslip(run, payslip.employee, created_by=request.user)
-			SalaryVoucher.objects.filter(payslip=payslip).update(status=SalaryVoucher.STATUS_CLEARED, cleared_by=request.user, cleared_at=timezone.now())
-		messages.success(request, 'Salary voucher cleared.')
+		payslip_ids = [value for value in request.POST.getlist('payslip_ids') if value.isdigit()]
+		result = clear_vouchers(run, payslip_ids=payslip_ids or None, cleared_by=request.user)
+		if result['cleared']:
+			messages.success(request, f"Cleared {result['cleared']} salary voucher(s).")
+		blocked = len(result['blocked_employee_ids'])
+		if blocked:
+			messages.warning(request, f'{blocked} voucher(s) left on hold: pending penalties for this month.')
+		if not result['cleared'] and not blocked:
+			messages.info(request, 'No vouchers were on hold.')
 		return redirect(reverse('payroll:detail', kwargs={'pk': run.pk}))
@@ -0,0 +1,45 @@
+"""Salary voucher clearance for one payslip or a whole payroll run."""
+from __future__ import annotations
+
+from django.db import transaction
+from django.utils import timezone
+
+from .engine import compute_payroll_run
+from .models import Payslip, Penalty, SalaryVoucher
+
+
+def clear_vouchers(run, *, payslip_ids=None, cleared_by=None) -> dict:
+	"""Clear the on-hold vouchers of ``run`` (or just ``payslip_ids``).
+
+	Employees with pending penalties for the month are found with one query
+	and left on hold. The rest are repriced through the bulk engine, so
+	penalties cleared since the last computation are deducted, and their
+	vouchers are cleared with a single UPDATE.
+
+	Returns ``{'cleared': count, 'blocked_employee_ids': [...]}``.
+	"""
+	if run.locked:
+		raise ValueError('Payroll run is locked.')
+
+	on_hold = Payslip.objects.filter(payroll_run=run, salary_voucher__status=SalaryVoucher.STATUS_ON_HOLD)
+	if payslip_ids is not None:
+		on_hold = on_hold.filter(pk__in=list(payslip_ids))
+
+	with transaction.atomic():
+		selected = list(on_hold.values_list('employee_id', flat=True))
+		blocked = set(
+			Penalty.objects.filter(
+				applies_to_month=run.month,
+				status=Penalty.STATUS_PENDING,
+				employee_id__in=on_hold.values('employee_id'),
+			).values_list('employee_id', flat=True).distinct()
+		)
+		clearable = [employee_id for employee_id in selected if employee_id not in blocked]
+		if clearable:
+			compute_payroll_run(run, created_by=cleared_by, employee_ids=clearable)
+			SalaryVoucher.objects.filter(
+				payslip__payroll_run=run,
+				payslip__employee_id__in=clearable,
+			).update(status=SalaryVoucher.STATUS_CLEARED, cleared_by=cleared_by, cleared_at=timezone.now())
+
+	return {'cleared': len(clearable), 'blocked_employee_ids': sorted(blocked)}
@@ -0,0 +1,113 @@
+"""Per-employee, per-year payroll accumulator (``PayrollYearToDate``).
+
+Rows are refreshed for just the employees whose payslips were written, by
+re-aggregating that employee's payslips for the year and upserting the
+result, so year-end summaries never have to scan every payslip.
+"""
+from __future__ import annotations
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import PayrollYearToDate, Payslip
+
+
+BULK_BATCH_SIZE = 500
+
+TOTAL_FIELDS = (
+	'gross_pay',
+	'tax_amount',
+	'nssf_employee',
+	'nssf_employer',
+	'penalty_total',
+	'net_pay',
+)
+
+SUMMARY_HEADER = [
+	'Employee',
+	'Employee ID',
+	'TIN',
+	'NSSF Number',
+	'Payslips',
+	'Gross Pay',
+	'PAYE',
+	'NSSF (Employee)',
+	'NSSF (Employer)',
+	'Penalties',
+	'Net Pay',
+]
+
+_SUMMARY_FIELDS = (
+	'employee__first_name',
+	'employee__last_name',
+	'employee__username',
+	'employee__employee_profile__employee_id',
+	'employee__employee_profile__tin',
+	'employee__employee_profile__nssf_number',
+	'payslip_count',
+) + TOTAL_FIELDS
+
+
+def refresh_year_to_date(year, employee_ids=None) -> int:
+	"""Recalculate the accumulator rows of ``year`` from payslips.
+
+	``employee_ids`` (ids or a values queryset) limits the refresh to those
+	employees; rows of employees left without payslips that year are removed.
+	Returns the number of rows written.
+	"""
+	payslips = Payslip.objects.filter(payroll_run__month__year=year)
+	stale = PayrollYearToDate.objects.filter(year=year)
+	if employee_ids is not None:
+		payslips = payslips.filter(employee_id__in=employee_ids)
+		stale = stale.filter(employee_id__in=employee_ids)
+
+	totals = payslips.values('employee_id').annotate(payslip_count=Count('id'), **{field: Sum(field) for field in TOTAL_FIELDS}).order_by()
+	rows = [PayrollYearToDate(year=year, **row) for row in totals]
+
+	with transaction.atomic():
+		stale.exclude(employee_id__in=payslips.values('employee_id')).delete()
+		PayrollYearToDate.objects.bulk_create(
+			rows,
+			batch_size=BULK_BATCH_SIZE,
+			update_conflicts=True,
+			# MySQL upserts on any unique key and rejects an explicit conflict target.
+			unique_fields=['employee', 'year'] if connection.features.supports_update_conflicts_with_target else None,
+			update_fields=['payslip_count', *TOTAL_FIELDS, 'updated_at'],
+		)
+	return len(rows)
+
+
+def refresh_run_year_to_date(run, employee_ids=None) -> int:
+	"""Refresh the accumulator for employees of ``run`` (or just ``employee_ids``)."""
+	if employee_ids is None:
+		employee_ids = Payslip.objects.filter(payroll_run=run).values('employee_id')
+	return refresh_year_to_date(run.month.year, employee_ids)
+
+
+def rebuild_year_to_date(years=None) -> int:
+	"""Rebuild the accumulator for ``years`` (default: every year with payslips)."""
+	if years is None:
+		years = sorted(
+			{month.year for month in Payslip.objects.values_list('payroll_run__month', flat=True).distinct()}
+			| set(PayrollYearToDate.objects.values_list('year', flat=True).distinct())
+		)
+	return sum(refresh_year_to_date(year) for year in years)
+
+
+def annual_summary_rows(year):
+	"""Yield one summary row (matching ``SUMMARY_HEADER``) per employee, from accumulator rows only."""
+	rows = (
+		PayrollYearToDate.objects.filter(year=year)
+		.order_by('employee__username')
+		.values_list(*_SUMMARY_FIELDS)
+		.iterator(chunk_size=2000)
+	)
+	for first_name, last_name, username, employee_code, tin, nssf_number, payslip_count, *totals in rows:
+		yield [
+			f'{first_name} {last_name}'.strip() or username,
+			employee_code or '',
+			tin or '',
+			nssf_number or '',
+			payslip_count,
+			*totals,
+		]
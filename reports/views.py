@@ -10,49 +10,30 @@ from django.urls import reverse, reverse_lazy
 from django.utils.html import format_html
 from django.views.generic import CreateView, DetailView, ListView, View
 
-from core.permissions import SupervisorPlusRequiredMixin
+from core.pagination import KeysetPaginationMixin
+from core.permissions import SupervisorPlusRequiredMixin, user_is_hr_admin, user_is_supervisor_plus
 
 from employees.models import EmployeeProfile
-from employees.models import EmployeeDepartmentRole
 
 from .forms import ReportRequestForm, WeeklyReportForm
 from .models import ReportRequest, WeeklyReport
 
 
-def _is_hr_admin(user):
-	if not user.is_authenticated:
-		return False
-	if user.is_superuser or user.role in {'SUPER_ADMIN', 'HR_MANAGER'}:
-		return True
-	if user.groups.filter(name__in={'Super Admin', 'HR Manager'}).exists():
-		return True
-	return EmployeeDepartmentRole.objects.filter(employee=user, is_active=True, role__code__in={'super-admin', 'hr-manager'}).exists()
-
-
-def _is_supervisor_plus(user):
-	if not user.is_authenticated:
-		return False
-	if user.is_superuser or user.role in {'SUPER_ADMIN', 'HR_MANAGER', 'SUPERVISOR'}:
-		return True
-	if user.groups.filter(name__in={'Super Admin', 'HR Manager', 'Supervisor'}).exists():
-		return True
-	return EmployeeDepartmentRole.objects.filter(employee=user, is_active=True, role__code__in={'super-admin', 'hr-manager', 'supervisor'}).exists()
-
-
-class WeeklyReportListView(ListView):
+class WeeklyReportListView(KeysetPaginationMixin, ListView):
 	model = WeeklyReport
 	template_name = 'reports/weekly_report_list.html'
 	context_object_name = 'weekly_reports'
 	paginate_by = 30
+	keyset_ordering = ('-week_start', '-submitted_at', '-id')
 
 	def get_queryset(self):
 		qs = WeeklyReport.objects.select_related('employee').order_by('-week_start', '-submitted_at')
 		user = self.request.user
 		if not user.is_authenticated:
 			return qs
-		if _is_hr_admin(user):
+		if user_is_hr_admin(user):
 			return qs
-		if _is_supervisor_plus(user) and not (user.role == 'STAFF'):
+		if user_is_supervisor_plus(user) and not (user.role == 'STAFF'):
 			try:
 				profile = user.employee_profile
 			except EmployeeProfile.DoesNotExist:
@@ -75,9 +56,9 @@ class WeeklyReportDetailView(DetailView):
 		user = self.request.user
 		if not user.is_authenticated:
 			return qs
-		if _is_hr_admin(user):
+		if user_is_hr_admin(user):
 			return qs
-		if _is_supervisor_plus(user) and not (user.role == 'STAFF'):
+		if user_is_supervisor_plus(user) and not (user.role == 'STAFF'):
 			try:
 				profile = user.employee_profile
 			except EmployeeProfile.DoesNotExist:
@@ -4,16 +4,14 @@ from django.db.models import Avg, Count, Q
 from django.db import models
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
 from core.permissions import SupervisorPlusRequiredMixin
-from audit.models import AuditLog
-from audit.models import Notification
-from django.contrib.auth import get_user_model
-from django.db.models import Q
+from audit.notifications import notify_admins
+from audit.writer import record_audit
 
 from .forms import TaskForm
 from .models import Task
@@ -48,11 +46,6 @@ def _user_can_access_task(user, task: Task) -> bool:
 	return (task.visible_to_id == user.id) or (task.assigned_to_id == user.id) or (task.created_by_id == user.id)
 
 
-def _admin_recipients():
-	User = get_user_model()
-	return list(User.objects.filter(Q(is_superuser=True) | Q(role__in={'SUPER_ADMIN', 'HR_MANAGER'})).only('id'))
-
-
 class TaskBoardView(ListView):
 	model = Task
 	template_name = 'tasks/task_board.html'
@@ -173,7 +166,7 @@ def move_task(request, pk):
 	task.position = new_position
 	task.save(update_fields=['status', 'position'])
 
-	AuditLog.objects.create(
+	record_audit(
 		user=request.user,
 		action=f'TASK MOVE: "{task.title}" (#{task.pk}) {old_status} -> {new_status}',
 		path=request.path,
@@ -181,21 +174,13 @@ def move_task(request, pk):
 		status_code=200,
 	)
 
-	admins = _admin_recipients()
-	if admins:
-		Notification.objects.bulk_create(
-			[
-				Notification(
-					recipient=a,
-					actor=request.user,
-					message=f'Task moved: "{task.title}" ({old_status} → {new_status})',
-					path=request.path,
-					level=Notification.LEVEL_INFO,
-				)
-				for a in admins
-				if a.id != request.user.id
-			]
-		)
+	notify_admins(
+		actor=request.user,
+		message=f'Task moved: "{task.title}" ({old_status} → {new_status})',
+		path=reverse('tasks:board'),
+		coalesce_key='task-move',
+		summary='{count} tasks moved by {actor}',
+	)
 	return JsonResponse({'ok': True, 'status': task.status, 'position': task.position})
 
 
@@ -245,7 +230,7 @@ def reorder_tasks(request):
 
 	Task.objects.bulk_update(tasks, ['position'])
 
-	AuditLog.objects.create(
+	record_audit(
 		user=request.user,
 		action=f'TASK REORDER: {status} ({len(ordered_ids_int)} cards)',
 		path=request.path,
@@ -253,19 +238,11 @@ def reorder_tasks(request):
 		status_code=200,
 	)
 
-	admins = _admin_recipients()
-	if admins:
-		Notification.objects.bulk_create(
-			[
-				Notification(
-					recipient=a,
-					actor=request.user,
-					message=f'Tasks reordered: {status} ({len(ordered_ids_int)} cards)',
-					path=request.path,
-					level=Notification.LEVEL_INFO,
-				)
-				for a in admins
-				if a.id != request.user.id
-			]
-		)
+	notify_admins(
+		actor=request.user,
+		message=f'Tasks reordered: {status} ({len(ordered_ids_int)} cards)',
+		path=reverse('tasks:board'),
+		coalesce_key='task-reorder',
+		summary='{count} task reorders by {actor}',
+	)
 	return JsonResponse({'ok': True})